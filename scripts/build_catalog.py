@@ -1,6 +1,10 @@
 # scripts/build_catalog.py
 import os
 import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 # --- PATH CONFIGURATION ---
 # The root of the 'isometric_room_editor' project
@@ -13,13 +17,106 @@ FINAL_DATA_DIR = os.path.join(PIPELINE_PROJECT_ROOT, "assets", "4_final_furni_da
 # Input and Output files for this script
 CATEGORIES_INPUT_FILE = os.path.join(PROJECT_ROOT, "assets", "categories.txt")
 CATALOG_OUTPUT_FILE = os.path.join(PROJECT_ROOT, "assets", "catalog.json")
+FURNI_INDEX_OUTPUT_FILE = os.path.join(PROJECT_ROOT, "assets", "furni_index.json")
+FURNI_INDEX_VERSION = 1
 
-def build_catalog_from_assets():
+# Remembers mtime, size, hash and parse result of every data.json, so reruns only re-parse what changed
+MANIFEST_FILE = os.path.join(PROJECT_ROOT, "assets", "catalog_manifest.json")
+MANIFEST_VERSION = 1
+
+# Below this many changed files a process pool costs more to start than it saves
+MIN_ITEMS_FOR_POOL = 64
+
+def build_index_entry(furni_data):
+    """
+    Reduces a furni data.json to the fields the editor needs at runtime:
+    name, category, footprint dimensions and, per variant, its icon, render paths,
+    render offsets and the list of available rotations.
+    """
+    variants = {}
+    for variant_id, variant_data in furni_data.get("variants", {}).items():
+        renders = {}
+        for rotation, render_info in variant_data.get("renders", {}).items():
+            if not render_info.get("path"): continue
+            offset = render_info.get("offset", {})
+            renders[rotation] = {"path": render_info["path"], "offset": {"x": offset.get("x", 0), "y": offset.get("y", 0)}}
+        variant_entry = {key: variant_data[key] for key in ("id", "name", "icon_path") if key in variant_data}
+        variant_entry["renders"] = renders
+        variant_entry["rotations"] = sorted(renders)
+        variants[variant_id] = variant_entry
+    # Optional keys are only copied when present, so lookups like data.get("name", base_id) keep working.
+    entry = {key: furni_data[key] for key in ("name", "category", "dimensions") if key in furni_data}
+    entry["variants"] = variants
+    return entry
+
+def process_furni_data_file(task):
+    """
+    Parses one data.json. Runs inside the worker processes, so it only takes and
+    returns plain picklable data: (base_id, sha1, result), where 'result' holds the
+    category key, the catalog items, the skipped count and the furni index entry,
+    or an 'error' message if the file could not be processed.
+    """
+    base_id, data_json_path = task
+    try:
+        with open(data_json_path, 'rb') as f:
+            raw = f.read()
+    except OSError as e:
+        return base_id, None, {"error": str(e)}
+    sha1 = hashlib.sha1(raw).hexdigest()
+
+    try:
+        furni_data = json.loads(raw.decode('utf-8'))
+        items, items_skipped = [], 0
+        # Iterate through all color/state variants of the item
+        for variant_id, variant_data in furni_data.get("variants", {}).items():
+            # We need an icon to show it in the editor
+            if not variant_data.get("icon_path"):
+                items_skipped += 1
+                continue
+            # Construct the item object for the catalog
+            items.append({
+                "id": variant_data.get("id", f"{base_id}_{variant_id}"),
+                "name": variant_data.get("name", base_id),
+                "base_id": base_id,
+                "variant_id": variant_id,
+                "icon_path": variant_data.get("icon_path")
+            })
+        result = {
+            "category": furni_data.get("category", "other").lower(),
+            "items": items,
+            "skipped": items_skipped,
+            "index": build_index_entry(furni_data)
+        }
+    except (json.JSONDecodeError, UnicodeDecodeError, KeyError, AttributeError) as e:
+        result = {"error": str(e)}
+    return base_id, sha1, result
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_FILE): return {}
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("data_dir") != os.path.abspath(FINAL_DATA_DIR):
+            return {}
+        return manifest.get("entries", {})
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: Could not read build manifest, doing a full rebuild. Error: {e}")
+        return {}
+
+def save_manifest(entries):
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "data_dir": os.path.abspath(FINAL_DATA_DIR), "entries": entries}, f, separators=(',', ':'))
+
+def build_catalog_from_assets(full_rebuild=False, max_workers=None):
     """
     Builds the final catalog.json directly from the asset pipeline's final data.
     It reads a list of categories and then scans all furni data.json files,
     assigning each item to its respective category.
+    Only data.json files whose size or mtime changed since the last run are parsed
+    again (in a process pool); everything else is taken from the build manifest.
     """
+    start_time = time.perf_counter()
+
     # 1. Validate that all necessary files and directories exist
     if not os.path.exists(FINAL_DATA_DIR):
         print(f"Error: The final data directory '{FINAL_DATA_DIR}' does not exist.")
@@ -59,64 +156,76 @@ def build_catalog_from_assets():
     }
     final_catalog["categories"].append(uncategorized_obj)
 
-
-    # 3. Scan the final assets directory and populate the catalog
+    # 3. Scan the final assets directory and find out which data.json files changed
     print(f"Scanning asset data in '{FINAL_DATA_DIR}'...")
-    items_processed = 0
-    items_skipped = 0
-    
+    old_manifest = {} if full_rebuild else load_manifest()
+    new_manifest = {}
+    tasks = []
+
     # Each subdirectory is a base_id
-    for base_id in os.listdir(FINAL_DATA_DIR):
-        furni_dir_path = os.path.join(FINAL_DATA_DIR, base_id)
-        if not os.path.isdir(furni_dir_path):
+    for entry in os.scandir(FINAL_DATA_DIR):
+        if not entry.is_dir():
             continue
-
-        data_json_path = os.path.join(furni_dir_path, "data.json")
-        if not os.path.exists(data_json_path):
+        base_id = entry.name
+        data_json_path = os.path.join(entry.path, "data.json")
+        try:
+            stat = os.stat(data_json_path)
+        except FileNotFoundError:
             continue
 
-        try:
-            with open(data_json_path, 'r', encoding='utf-8') as f:
-                furni_data = json.load(f)
-
-            item_category_key = furni_data.get("category", "other").lower()
-
-            # Iterate through all color/state variants of the item
-            for variant_id, variant_data in furni_data.get("variants", {}).items():
-                
-                # We need an icon to show it in the editor
-                if not variant_data.get("icon_path"):
-                    items_skipped += 1
-                    continue
-
-                # Construct the item object for the catalog
-                catalog_item = {
-                    "id": variant_data.get("id", f"{base_id}_{variant_id}"),
-                    "name": variant_data.get("name", base_id),
-                    "base_id": base_id,
-                    "variant_id": variant_id,
-                    "icon_path": variant_data.get("icon_path")
-                }
-                
-                # Add the item to the correct category
-                if item_category_key in category_map:
-                    category_map[item_category_key]["items"].append(catalog_item)
-                else:
-                    # If the category from data.json isn't in our list, put it in "Uncategorized"
-                    uncategorized_obj["items"].append(catalog_item)
-                
-                items_processed += 1
-
-        except (json.JSONDecodeError, KeyError) as e:
-            print(f"Warning: Could not process {data_json_path}. Error: {e}")
+        cached = old_manifest.get(base_id)
+        if cached and cached["mtime"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            new_manifest[base_id] = cached
+        else:
+            new_manifest[base_id] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "sha1": None, "result": None}
+            tasks.append((base_id, data_json_path))
+
+    items_reused = len(new_manifest) - len(tasks)
+    items_removed = len(set(old_manifest) - set(new_manifest))
+    items_unchanged_content = 0
+
+    # 4. Parse the changed files, in parallel when there are enough of them
+    parse_start = time.perf_counter()
+    if len(tasks) >= MIN_ITEMS_FOR_POOL and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(process_furni_data_file, tasks, chunksize=32))
+    else:
+        results = [process_furni_data_file(task) for task in tasks]
+    parse_time = time.perf_counter() - parse_start
+
+    for base_id, sha1, result in results:
+        cached = old_manifest.get(base_id)
+        if cached and sha1 and cached.get("sha1") == sha1: items_unchanged_content += 1 # Touched, but identical content
+        new_manifest[base_id]["sha1"] = sha1
+        new_manifest[base_id]["result"] = result
+
+    # 5. Populate the catalog and the furni index from the (cached or fresh) results
+    items_processed = 0
+    items_skipped = 0
+    furni_index = {}
+
+    for base_id in sorted(new_manifest):
+        result = new_manifest[base_id]["result"]
+        if "error" in result:
+            print(f"Warning: Could not process {os.path.join(FINAL_DATA_DIR, base_id, 'data.json')}. Error: {result['error']}")
             items_skipped += 1
             continue
-    
-    # 4. Clean up and save the final catalog
-    
+
+        furni_index[base_id] = result["index"]
+        items_skipped += result["skipped"]
+        # Add the items to the correct category.
+        # If the category from data.json isn't in our list, put them in "Uncategorized"
+        if result["category"] in category_map:
+            category_map[result["category"]]["items"].extend(result["items"])
+        else:
+            uncategorized_obj["items"].extend(result["items"])
+        items_processed += len(result["items"])
+
+    # 6. Clean up and save the final catalog
+
     # Remove categories that have no items, except for the "Uncategorized" one if it's also empty
     final_catalog["categories"] = [cat for cat in final_catalog["categories"] if cat["items"]]
-    
+
     # Sort items within each category alphabetically by name
     for category in final_catalog["categories"]:
         category["items"].sort(key=lambda x: x['name'])
@@ -124,10 +233,26 @@ def build_catalog_from_assets():
     with open(CATALOG_OUTPUT_FILE, 'w', encoding='utf-8') as f:
         json.dump(final_catalog, f, indent=2)
 
+    # The index is written without whitespace: the editor loads it once at startup.
+    with open(FURNI_INDEX_OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"version": FURNI_INDEX_VERSION, "items": furni_index}, f, separators=(',', ':'))
+
+    save_manifest(new_manifest)
+    total_time = time.perf_counter() - start_time
+    throughput = len(tasks) / parse_time if parse_time > 0 else 0
+
     print(f"\nCatalog built successfully! Saved to {CATALOG_OUTPUT_FILE}")
+    print(f"Furni metadata index for {len(furni_index)} items saved to {FURNI_INDEX_OUTPUT_FILE}")
     print(f"  - Items added to catalog: {items_processed}")
     print(f"  - Items skipped (missing data or icon): {items_skipped}")
+    print(f"  - Furni folders: {len(new_manifest)} total, {len(tasks)} parsed ({items_unchanged_content} with unchanged content), {items_reused} reused, {items_removed} removed")
+    print(f"  - Parsing: {parse_time:.2f}s ({throughput:.0f} files/s)")
+    print(f"  - Total time: {total_time:.2f}s")
 
 
 if __name__ == "__main__":
-    build_catalog_from_assets()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Builds catalog.json and furni_index.json from the pipeline's final furni data.")
+    parser.add_argument("--full", action="store_true", help="Ignore the build manifest and re-parse every data.json.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count).")
+    args = parser.parse_args()
+    build_catalog_from_assets(full_rebuild=args.full, max_workers=args.workers)
@@ -0,0 +1,100 @@
+# scripts/build_sprite_cache.py
+import os
+import sys
+import json
+import time
+import argparse
+
+# --- PATH CONFIGURATION ---
+# The root of the 'isometric_room_editor' project
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+import pygame
+from common.constants import ZOOM_LEVELS
+from sprite_cache import SpriteDiskCache
+
+# Path to the sibling pipeline project
+PIPELINE_PROJECT_ROOT = os.path.join(PROJECT_ROOT, "..", "habbo-furni-asset-pipeline")
+FINAL_DATA_DIR = os.path.join(PIPELINE_PROJECT_ROOT, "assets", "4_final_furni_data")
+
+# Input and Output of this script
+FURNI_INDEX_FILE = os.path.join(PROJECT_ROOT, "assets", "furni_index.json")
+SPRITE_CACHE_DIR = os.path.join(PROJECT_ROOT, "assets", "sprite_cache")
+
+def iter_render_paths():
+    """Yields (base_id, relative_path) for every furni render, from the furni index or the data.json files."""
+    if os.path.exists(FURNI_INDEX_FILE):
+        with open(FURNI_INDEX_FILE, 'r', encoding='utf-8') as f:
+            furni_items = json.load(f).get("items", {})
+    else:
+        print(f"Warning: '{FURNI_INDEX_FILE}' not found, reading every data.json instead. Run build_catalog.py first to speed this up.")
+        furni_items = {}
+        for base_id in os.listdir(FINAL_DATA_DIR):
+            data_json_path = os.path.join(FINAL_DATA_DIR, base_id, "data.json")
+            if not os.path.exists(data_json_path): continue
+            try:
+                with open(data_json_path, 'r', encoding='utf-8') as f:
+                    furni_items[base_id] = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Warning: Could not process {data_json_path}. Error: {e}")
+
+    for base_id, furni_data in furni_items.items():
+        paths = set()
+        for variant_data in furni_data.get("variants", {}).values():
+            for render_info in variant_data.get("renders", {}).values():
+                if render_info.get("path"): paths.add(render_info["path"])
+        for relative_path in sorted(paths):
+            yield base_id, relative_path
+
+def build_sprite_cache(rebuild=False):
+    """
+    Decodes every furni render once and writes it, scaled to each zoom level of the
+    editor, into the sprite cache. Entries that are still valid are skipped.
+    """
+    start_time = time.perf_counter()
+    if not os.path.exists(FINAL_DATA_DIR):
+        print(f"Error: The final data directory '{FINAL_DATA_DIR}' does not exist.")
+        return
+
+    pygame.init()
+    cache = SpriteDiskCache(SPRITE_CACHE_DIR)
+    if rebuild:
+        cache.clear()
+
+    written, reused, failed = 0, 0, 0
+    for base_id, relative_path in iter_render_paths():
+        source_path = os.path.join(FINAL_DATA_DIR, base_id, relative_path)
+        missing_zooms = [zoom for zoom in ZOOM_LEVELS if cache.get(base_id, relative_path, zoom, source_path) is None]
+        reused += len(ZOOM_LEVELS) - len(missing_zooms)
+        if not missing_zooms: continue
+        try:
+            image = pygame.image.load(source_path)
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Warning: Could not load {source_path}. Error: {e}")
+            failed += 1
+            continue
+        img_w, img_h = image.get_size()
+        for zoom in missing_zooms:
+            scaled_size = (int(img_w * zoom), int(img_h * zoom))
+            if scaled_size[0] <= 0 or scaled_size[1] <= 0: continue
+            scaled_image = image if scaled_size == (img_w, img_h) else pygame.transform.scale(image, scaled_size)
+            cache.put(base_id, relative_path, zoom, source_path, scaled_image)
+            written += 1
+
+    cache.save_index()
+    reclaimed = cache.compact() if cache.dead_bytes else 0
+    total_time = time.perf_counter() - start_time
+    print(f"\nSprite cache built in {SPRITE_CACHE_DIR}")
+    print(f"  - Entries written: {written}")
+    print(f"  - Entries still valid: {reused}")
+    print(f"  - Renders that could not be loaded: {failed}")
+    print(f"  - Space reclaimed from stale entries: {reclaimed / (1024 * 1024):.1f} MB")
+    print(f"  - Total time: {total_time:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-scales every furni render to all editor zoom levels and stores the raw pixels on disk.")
+    parser.add_argument("--rebuild", action="store_true", help="Delete the existing cache first instead of updating it.")
+    args = parser.parse_args()
+    build_sprite_cache(rebuild=args.rebuild)
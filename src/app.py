@@ -5,6 +5,8 @@ import json
 import sys
 import os
 import re 
+import copy
+import hashlib
 from common.constants import *
 from common.ui import Button, TextInputBox, ToggleSwitch
 from common.utils import grid_to_screen
@@ -12,6 +14,9 @@ from common.utils import grid_to_screen
 from camera import Camera
 from renderer import RoomRenderer
 from room import Room
+from asset_export import EXPORT_MODE_REFERENCED
+from edit_journal import EditJournal
+from undo_history import UndoHistory
 
 class App:
     def __init__(self, project_root, assets_root):
@@ -33,6 +38,14 @@ class App:
         self.renderer = RoomRenderer(self.data_manager)
         self.current_room = None
         self.save_confirmation_timer = 0
+        self.active_save = None # BackgroundTask of the save in progress, if any
+        self.active_save_revisions = None # Room revisions captured by that save
+        self.decoration_loader = None # DecorationSetReader still streaming the current room's decorations, if any
+        self.decoration_batches = None
+        self.num_overlapping_loaded = 0 # Overlapping decorations found so far by that load
+        self.journal = None # EditJournal of the current room
+        self.last_autosave_ticks = 0
+        self.history = UndoHistory(UNDO_MEMORY_LIMIT_BYTES)
         
         self.main_mode = EDITOR_MODE_STRUCTURE
         self.structure_editor = StructureEditor(self)
@@ -83,22 +96,90 @@ class App:
             self.set_new_room_data(s_data, d_data)
         else: self.create_new_room()
 
-    def set_new_room_data(self, structure_data, decoration_set_data):
-        self.current_room = Room(structure_data, decoration_set_data)
+    def set_new_room_data(self, structure_data, decoration_set_data, decoration_stream=None):
+        """Shows a room. With a decoration_stream (DecorationSetReader), its decorations are streamed in over the next frames."""
+        self.cancel_decoration_loading()
+        self.close_edit_journal()
+        room = self.current_room = Room(structure_data, decoration_set_data, self.data_manager.get_footprint)
+        self.data_manager.reset_save_state()
+        self.open_edit_journal()
+        if decoration_stream:
+            # A recovered journal snapshot already holds every decoration.
+            if self.current_room is room: self.start_decoration_loading(decoration_stream)
+            else: decoration_stream.close()
+        self.history.clear()
+        self.current_room.op_listeners.append(self.history.record)
+        self.renderer.clear_atlases()
+        self.check_loaded_decorations()
+        self.current_room.set_decoration_bounds_provider(self.renderer.get_decoration_world_rect)
         self.center_camera_on_room()
         self.update_anchor_offset_inputs()
-        set_name = decoration_set_data.get("decoration_set_name", "Untitled Decoration Set")
+        set_name = self.current_room.decoration_set_data.get("decoration_set_name", "Untitled Decoration Set")
         pygame.display.set_caption(f"Editor - {set_name}")
 
+    def check_loaded_decorations(self):
+        room = self.current_room
+        if invalid_decos := self.data_manager.find_invalid_rotations(room.decorations):
+            print(f"[WARN] {len(invalid_decos)} decoration(s) use a rotation that has no render, e.g. '{invalid_decos[0].get('base_id')}' at {invalid_decos[0].get('grid_pos')}.")
+        self.renderer.build_room_atlas(room, self.camera.zoom)
+        if self.camera.zoom != 1.0: self.renderer.build_room_atlas(room, 1.0) # Used by the preview
+
+    # --- Streamed decoration loading ---
+    # Large decoration sets are parsed and indexed a batch at a time between frames, so the room can be
+    # viewed while they arrive. Editing and saving wait until the whole set is in.
+    def start_decoration_loading(self, reader):
+        self.decoration_loader = reader
+        self.decoration_batches = reader.iter_batches(DECORATION_LOAD_BATCH)
+        self.num_overlapping_loaded = 0
+        print(f"[LOG] Streaming decorations from {reader.filepath}...")
+
+    def poll_decoration_loading(self):
+        """Loads streamed decorations for up to DECORATION_LOAD_FRAME_BUDGET_MS."""
+        if not self.decoration_loader: return
+        deadline = pygame.time.get_ticks() + DECORATION_LOAD_FRAME_BUDGET_MS
+        try:
+            while pygame.time.get_ticks() < deadline:
+                batch = next(self.decoration_batches, None)
+                if batch is None: self.finish_decoration_loading(); return
+                self.num_overlapping_loaded += self.current_room.append_loaded_decorations(batch)
+        except ValueError as e:
+            num_loaded = self.decoration_loader.num_read
+            print(f"Error loading decorations: {e}")
+            self.finish_decoration_loading()
+            from tkinter import messagebox
+            self.data_manager._init_tk_root()
+            messagebox.showerror("Load Error", f"The decoration set could not be read completely:\n{e}\n\nOnly the first {num_loaded} decorations were loaded. Saving now would write only those.")
+
+    def finish_decoration_loading(self):
+        reader = self.decoration_loader
+        self.cancel_decoration_loading()
+        room = self.current_room
+        room.decoration_set_data.update(reader.header) # Keys stored after the decorations array
+        room.warn_overlapping_decorations(self.num_overlapping_loaded)
+        self.check_loaded_decorations()
+        # The journal snapshot was taken before the decorations arrived.
+        if self.journal: self.compact_edit_journal(unsaved=bool(room.get_dirty_parts()))
+        print(f"[LOG] Loaded {len(room.decorations)} decorations.")
+
+    def cancel_decoration_loading(self):
+        if not self.decoration_loader: return
+        self.decoration_loader.close()
+        self.decoration_loader = None; self.decoration_batches = None
+
     def handle_events(self):
         mouse_pos = pygame.mouse.get_pos(); keys = pygame.key.get_pressed()
         local_mouse_pos = (mouse_pos[0] - self.editor_rect.x, mouse_pos[1] - self.editor_rect.y)
         for btn in list(self.main_buttons.values()) + list(self.file_buttons.values()): btn.check_hover(mouse_pos)
-        for event in pygame.event.get():
+        for event in self.coalesce_motion_events(pygame.event.get()):
             if event.type == pygame.QUIT: return False
+            # Everything a mouse press changes in the room until the button is released is one undo step.
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 3) and self.editor_rect.collidepoint(event.pos): self.history.begin_gesture()
+            if event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_CTRL and not self.is_text_input_active() and not self.decoration_loader:
+                if event.key == pygame.K_z and event.mod & pygame.KMOD_SHIFT or event.key == pygame.K_y: self.redo(); continue
+                if event.key == pygame.K_z: self.undo(); continue
             if event.type == pygame.VIDEORESIZE: self.win_width, self.win_height = event.size; self.screen = pygame.display.set_mode((self.win_width, self.win_height), pygame.RESIZABLE); self.update_layout()
             self.camera.handle_event(event, mouse_pos)
-            if self.main_mode == EDITOR_MODE_STRUCTURE:
+            if self.main_mode == EDITOR_MODE_STRUCTURE and not self.decoration_loader:
                 for box in self.input_boxes:
                     if box.handle_event(event) is not None: self.apply_anchor_offset(); box.active = False
             if self.main_buttons['structure'].is_clicked(event): self.main_mode = EDITOR_MODE_STRUCTURE; self.active_editor = self.structure_editor
@@ -107,9 +188,38 @@ class App:
             if self.file_buttons['new'].is_clicked(event): self.create_new_room()
             if self.file_buttons['load'].is_clicked(event): self.load_file_for_current_mode()
             if self.file_buttons['save_all'].is_clicked(event): self.save_all()
-            self.active_editor.handle_events(event, mouse_pos, local_mouse_pos, keys)
+            if not self.decoration_loader: self.active_editor.handle_events(event, mouse_pos, local_mouse_pos, keys)
+            if event.type == pygame.MOUSEBUTTONUP and event.button in (1, 3): self.history.end_gesture()
         return True
 
+    @staticmethod
+    def coalesce_motion_events(events):
+        """
+        Collapses each run of consecutive MOUSEMOTION events into one, with the last position and
+        the summed movement. Editors fill in the cells skipped in between (see StructureEditor.apply_stroke).
+        """
+        coalesced = []
+        for event in events:
+            if event.type == pygame.MOUSEMOTION and coalesced and coalesced[-1].type == pygame.MOUSEMOTION:
+                rel = (coalesced[-1].rel[0] + event.rel[0], coalesced[-1].rel[1] + event.rel[1])
+                coalesced[-1] = pygame.event.Event(pygame.MOUSEMOTION, pos=event.pos, rel=rel, buttons=event.buttons)
+            else: coalesced.append(event)
+        return coalesced
+
+    def is_text_input_active(self):
+        return any(box.active for box in self.input_boxes) or (self.decoration_editor.search_input is not None and self.decoration_editor.search_input.active)
+
+    def undo(self):
+        if (ops := self.history.undo(self.current_room)) is not None: self.on_history_applied(ops, "Undo")
+
+    def redo(self):
+        if (ops := self.history.redo(self.current_room)) is not None: self.on_history_applied(ops, "Redo")
+
+    def on_history_applied(self, ops, action):
+        """Refreshes only what depends on the parts of the room the undone/redone operations touched."""
+        if any(op["op"] not in ("deco_add", "deco_del") for op in ops): self.update_anchor_offset_inputs()
+        print(f"[LOG] {action}: {len(ops)} change(s)")
+
     def draw(self):
         self.screen.fill(COLOR_BG)
         pygame.draw.rect(self.screen, COLOR_TOP_BAR, self.top_bar_rect)
@@ -162,6 +272,8 @@ class App:
             for box in self.input_boxes: box.update(); box.draw(self.screen)
         
         self.active_editor.draw_ui_on_panel(self.screen)
+        self.draw_save_progress()
+        self.draw_load_progress()
         self.draw_save_confirmation()
         pygame.display.flip()
 
@@ -195,9 +307,61 @@ class App:
     def run(self):
         running = True
         try:
-            while running: running = self.handle_events(); self.draw(); self.clock.tick(60)
+            while running: running = self.handle_events(); self.poll_decoration_loading(); self.poll_background_save(); self.autosave_edit_journal(); self.draw(); self.clock.tick(60)
         except KeyboardInterrupt: print("\nEditor closed with Ctrl+C.")
-        finally: pygame.quit()
+        finally:
+            if self.active_save: print("Waiting for the save in progress to finish..."); self.active_save.wait(); self.poll_background_save()
+            self.cancel_decoration_loading(); self.close_edit_journal(); self.data_manager.close(); pygame.quit()
+
+    # --- Edit journal (autosave) ---
+    def open_edit_journal(self):
+        """Offers to replay the edits left in the room's journal by a crash or an unsaved exit, then starts a fresh journal."""
+        journal_path = self.data_manager.get_journal_path()
+        recovered = False
+        if EditJournal.has_unsaved_edits(journal_path) and self.data_manager.ask_recover_journal(journal_path):
+            snapshot, ops = EditJournal.read(journal_path)
+            self.current_room = Room(snapshot["structure"], snapshot["decorations"], self.data_manager.get_footprint)
+            for op in ops: self.current_room.apply_op(op)
+            for part in ROOM_PARTS: self.current_room.mark_changed(part) # Recovered edits are not in the project files
+            recovered = True
+            print(f"[LOG] Recovered {len(ops)} edit(s) from {journal_path}")
+        self.journal = EditJournal(journal_path)
+        self.compact_edit_journal(unsaved=recovered)
+        self.current_room.op_listeners.append(self.record_edit)
+        self.last_autosave_ticks = pygame.time.get_ticks()
+
+    def record_edit(self, op):
+        if self.journal: self.journal.append(op)
+
+    def compact_edit_journal(self, unsaved):
+        """Rewrites the journal as a snapshot of the current room, dropping the recorded operations."""
+        room = self.current_room
+        room.update_structure_data_from_internal(); room.update_decoration_set_data_from_internal()
+        try:
+            self.journal.start(room.structure_data, room.decoration_set_data, unsaved=unsaved)
+        except OSError as e:
+            print(f"Error writing edit journal '{self.journal.journal_path}': {e}")
+
+    def autosave_edit_journal(self):
+        if not self.journal: return
+        now = pygame.time.get_ticks()
+        if now - self.last_autosave_ticks < AUTOSAVE_INTERVAL_MS: return
+        self.last_autosave_ticks = now
+        try:
+            if self.journal.num_ops >= JOURNAL_COMPACT_OPS: self.compact_edit_journal(unsaved=bool(self.current_room.get_dirty_parts()))
+            else: self.journal.sync()
+        except OSError as e:
+            print(f"Error writing edit journal '{self.journal.journal_path}': {e}")
+
+    def close_edit_journal(self):
+        """Keeps the journal of a room with unsaved edits so they can be recovered next time; deletes it otherwise."""
+        if not self.journal: return
+        try:
+            if self.current_room and self.current_room.get_dirty_parts(): self.journal.close()
+            else: self.journal.discard()
+        except OSError as e:
+            print(f"Error closing edit journal '{self.journal.journal_path}': {e}")
+        self.journal = None
     
     def create_new_room(self):
         new_structure = {"name": "New Structure", "id": "new_structure", "dimensions": {"width": 0, "depth": 0, "origin_x": 0, "origin_y": 0}, "renderAnchor": {"x": 0, "y": 0}, "tiles": [], "walkable": [], "layers": [], "walls": []}
@@ -207,8 +371,8 @@ class App:
 
     def load_file_for_current_mode(self):
         start_dir = os.path.join(self.project_root, "rooms")
-        s_data, d_data = self.data_manager.load_decoration_set_and_structure(initial_dir=start_dir)
-        if s_data and d_data: self.set_new_room_data(s_data, d_data)
+        s_data, d_data, d_stream = self.data_manager.load_decoration_set_and_structure(initial_dir=start_dir)
+        if s_data and d_data: self.set_new_room_data(s_data, d_data, d_stream)
 
     def take_screenshot(self):
         from tkinter import filedialog, messagebox
@@ -230,20 +394,62 @@ class App:
 
     def save_all(self):
         if not self.current_room: return
-        self.current_room.update_structure_data_from_internal(); self.current_room.update_decoration_set_data_from_internal()
-        ok, new_name, target_folder = self.data_manager.save_project_to_folder(self.current_room.structure_data, self.current_room.decoration_set_data)
-        if ok:
-            # Also save a screenshot in the project folder
-            screenshot_path = os.path.join(target_folder, "RoomScreenshot.png")
-            try:
-                pygame.image.save(self.preview_surface, screenshot_path)
-                print(f"Screenshot automatically saved to {screenshot_path}")
-            except Exception as e:
-                print(f"Error automatically saving screenshot: {e}")
+        if self.active_save: print("[WARN] A save is already in progress."); return
+        if self.decoration_loader: print("[WARN] Decorations are still loading; save once they are all in."); return
+        target_folder = self.data_manager.ask_project_folder()
+        if not target_folder: return # User cancelled
+        room = self.current_room
+        # Saving again into the same folder only writes the parts that changed since the last save.
+        dirty_parts = room.get_dirty_parts() if target_folder == self.data_manager.last_saved_folder else set(ROOM_PARTS)
+        self.active_save_revisions = dict(room.revisions)
+        # A referenced export depends on the variants and rotations used, not just the set of furni, so it runs on
+        # every save; its size/mtime check skips the files already exported.
+        export_assets = PART_ASSETS in dirty_parts or self.data_manager.asset_export_mode == EXPORT_MODE_REFERENCED
+        if PART_STRUCTURE in dirty_parts: room.update_structure_data_from_internal()
+        room.update_decoration_set_data_from_internal()
+        self.data_manager.apply_project_identity(room.structure_data, room.decoration_set_data, target_folder)
+        # The worker gets its own copy of the room data, so editing can continue while it writes.
+        structure_snapshot = copy.deepcopy(room.structure_data) if PART_STRUCTURE in dirty_parts else None
+        needs_decorations = PART_DECORATIONS in dirty_parts or export_assets
+        decorations_snapshot = copy.deepcopy(room.decoration_set_data) if needs_decorations else None
+        # The screenshot is only re-encoded when the preview actually looks different.
+        screenshot_hash = hashlib.sha1(pygame.image.tostring(self.preview_surface, "RGB")).hexdigest()
+        screenshot_path = os.path.join(target_folder, "RoomScreenshot.png")
+        screenshot_changed = self.data_manager.saved_hashes.get(screenshot_path) != screenshot_hash or not os.path.exists(screenshot_path)
+        # The static background is baked here, since only the main thread draws with the renderer's atlases.
+        draw_list_missing = not os.path.exists(os.path.join(target_folder, DRAW_LIST_FILENAME))
+        baked_scene = self.renderer.bake_static_scene(room, BAKE_STATIC_DECORATIONS) if dirty_parts & {PART_STRUCTURE, PART_DECORATIONS} or draw_list_missing else None
+        # Deleting exported furni folders is destructive, so it is only done when the user confirms it for this save.
+        prune_assets = export_assets and self.data_manager.confirm_prune_assets(target_folder, room.decoration_set_data)
+        self.active_save = self.data_manager.start_project_save(
+            target_folder, structure_snapshot, decorations_snapshot,
+            self.preview_surface.copy() if screenshot_changed else None,
+            export_assets=export_assets, screenshot_hash=screenshot_hash, baked_scene=baked_scene, prune_assets=prune_assets)
 
-            self.save_confirmation_timer = 120
-            new_caption = new_name.replace('_', ' ').title() if new_name else "Project"
-            pygame.display.set_caption(f"Editor - {new_caption}")
+    def poll_background_save(self):
+        if not self.active_save: return
+        for kind, payload in self.active_save.poll():
+            if kind == "done":
+                self.current_room.mark_saved(self.active_save_revisions)
+                self.data_manager.finish_project_save(payload)
+                self.restart_edit_journal_after_save()
+                self.save_confirmation_timer = 120
+                new_name = payload["base_name"]
+                new_caption = new_name.replace('_', ' ').title() if new_name else "Project"
+                pygame.display.set_caption(f"Editor - {new_caption}")
+            elif kind == "error":
+                self.data_manager.report_save_error(payload)
+        if self.active_save.is_done: self.active_save = None
+
+    def restart_edit_journal_after_save(self):
+        """The saved files now hold the room, so the journal starts over (next to the new project files if it moved)."""
+        if not self.journal: return
+        journal_path = self.data_manager.get_journal_path()
+        if journal_path != self.journal.journal_path:
+            try: self.journal.discard()
+            except OSError as e: print(f"Error deleting edit journal '{self.journal.journal_path}': {e}")
+            self.journal = EditJournal(journal_path)
+        self.compact_edit_journal(unsaved=bool(self.current_room.get_dirty_parts()))
 
     def center_camera_on_room(self):
         if not self.current_room or not self.editor_rect.w or not self.editor_rect.h: return
@@ -251,7 +457,7 @@ class App:
 
     def draw_info_box(self, mode_specific_lines):
         margin, padding, line_height = 15, 8, 15
-        base_lines = ["Controls:", "[Middle Mouse] Pan View", "[Ctrl+Wheel] Zoom"]
+        base_lines = ["Controls:", "[Middle Mouse] Pan View", "[Ctrl+Wheel] Zoom", "[Ctrl+Z/Y] Undo/Redo"]
         if self.main_mode == EDITOR_MODE_STRUCTURE: base_lines.append("[Shift+Click] Set Anchor")
         info_lines = base_lines[:1] + mode_specific_lines + base_lines[1:]
         rendered_lines = [self.font_info.render(line, True, COLOR_INFO_TEXT) for line in info_lines]
@@ -260,6 +466,23 @@ class App:
         pygame.draw.rect(self.screen, COLOR_EDITOR_BG, box_rect, border_radius=5); pygame.draw.rect(self.screen, COLOR_BORDER, box_rect, 1, border_radius=5)
         for i, line_surf in enumerate(rendered_lines): self.screen.blit(line_surf, (box_rect.left + padding, box_rect.top + padding + i * line_height))
     
+    def draw_save_progress(self):
+        if not self.active_save: return
+        text = "Saving..."
+        if self.active_save.progress:
+            step, total, message = self.active_save.progress
+            text = f"Saving ({step}/{total}): {message}..."
+        text_surf = self.font_ui.render(text, True, COLOR_TEXT)
+        text_rect = text_surf.get_rect(midright=(self.file_buttons['screenshot'].rect.left - 15, self.top_bar_rect.centery))
+        self.screen.blit(text_surf, text_rect)
+
+    def draw_load_progress(self):
+        if not self.decoration_loader: return
+        text = f"Loading decorations ({self.decoration_loader.num_read}, {self.decoration_loader.get_progress():.0%})..."
+        text_surf = self.font_ui.render(text, True, COLOR_TEXT)
+        text_rect = text_surf.get_rect(midright=(self.file_buttons['screenshot'].rect.left - 15, self.top_bar_rect.centery))
+        self.screen.blit(text_surf, text_rect)
+
     def draw_save_confirmation(self):
         if self.save_confirmation_timer > 0:
             self.save_confirmation_timer -= 1
@@ -279,7 +502,7 @@ class App:
         try:
             offset_x = float(self.anchor_offset_input_x.text); offset_y = float(self.anchor_offset_input_y.text)
             center_wx, center_wy = self.current_room.calculate_center_world_coords()
-            self.current_room.structure_data['renderAnchor']['x'] = center_wx + offset_x; self.current_room.structure_data['renderAnchor']['y'] = center_wy + offset_y
+            self.current_room.set_render_anchor(center_wx + offset_x, center_wy + offset_y)
         except (ValueError, KeyError): self.update_anchor_offset_inputs()
 
     def calculate_preview_offset(self, surface_size):
@@ -0,0 +1,217 @@
+# src/asset_export.py
+import os
+import sys
+import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+EXPORT_WORKERS = 8
+EXPORT_MODE_FULL = "full" # Whole furni folders: every variant and rotation
+EXPORT_MODE_REFERENCED = "referenced" # Only the renders and icons the decorations use, plus a trimmed data.json
+# Some filesystems (FAT, many network shares) store mtimes with a 1-2 second resolution.
+MTIME_TOLERANCE_NS = 2_000_000_000
+FICLONE = 0x40049409 # Linux ioctl that makes a copy-on-write clone (reflink) of a file
+
+def is_up_to_date(src_stat, dest_path):
+    """A destination file is considered unchanged if it has the same size and (roughly) the same mtime."""
+    try:
+        dest_stat = os.stat(dest_path)
+    except OSError:
+        return False
+    if (dest_stat.st_dev, dest_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino): return True # Hardlinked
+    return dest_stat.st_size == src_stat.st_size and abs(dest_stat.st_mtime_ns - src_stat.st_mtime_ns) <= MTIME_TOLERANCE_NS
+
+def _try_reflink(src_path, dest_path):
+    if not sys.platform.startswith("linux"): return False
+    import fcntl
+    try:
+        with open(src_path, 'rb') as src, open(dest_path, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(src_path, dest_path)
+        return True
+    except OSError:
+        if os.path.exists(dest_path): os.remove(dest_path)
+        return False
+
+def link_or_copy(src_path, dest_path, same_device):
+    """
+    Puts a copy of src_path at dest_path: a hardlink when both are on the same
+    filesystem, else a reflink when the filesystem supports it, else a regular copy.
+    Returns which method was used.
+    """
+    # Never write into an existing destination: it may be a hardlink to the source asset.
+    if os.path.lexists(dest_path): os.remove(dest_path)
+    if same_device:
+        try:
+            os.link(src_path, dest_path)
+            return "linked"
+        except OSError:
+            pass
+    if _try_reflink(src_path, dest_path): return "reflinked"
+    shutil.copy2(src_path, dest_path)
+    return "copied"
+
+def export_furni_folders(base_ids, source_root, export_dir, prune=False, max_workers=EXPORT_WORKERS, file_filter=None, keep_files=frozenset()):
+    """
+    Synchronises the asset folders of the given furni into export_dir. Only files that are
+    missing or changed (by size/mtime) are transferred, using a thread pool.
+    'file_filter', if given, maps each base_id to the set of relative paths to export; other
+    files of that folder are skipped, and removed from export_dir if a previous export left them.
+    'keep_files' are relative paths the caller writes itself: never transferred, never removed.
+    With 'prune', folders of furni that are not in base_ids are deleted from export_dir.
+    Returns a dict with statistics about the export.
+    """
+    stats = {"folders": 0, "missing": [], "copied": 0, "linked": 0, "reflinked": 0, "unchanged": 0, "pruned": 0, "errors": 0, "removed_files": 0}
+    os.makedirs(export_dir, exist_ok=True)
+    same_device = os.stat(source_root).st_dev == os.stat(export_dir).st_dev if os.path.isdir(source_root) else False
+
+    transfers = []
+    for base_id in sorted(base_ids):
+        source_dir = os.path.join(source_root, base_id)
+        if not os.path.isdir(source_dir):
+            stats["missing"].append(base_id)
+            continue
+        dest_dir = os.path.join(export_dir, base_id)
+        wanted_files = file_filter.get(base_id, set()) if file_filter is not None else None
+        if wanted_files is not None: stats["removed_files"] += _remove_unwanted_files(dest_dir, wanted_files | keep_files)
+        for dirpath, _, filenames in os.walk(source_dir):
+            rel_dir = os.path.relpath(dirpath, source_dir)
+            for filename in filenames:
+                rel_path = os.path.normpath(os.path.join(rel_dir, filename))
+                if wanted_files is not None and rel_path not in wanted_files or rel_path in keep_files: continue
+                src_path = os.path.join(dirpath, filename)
+                dest_path = os.path.join(dest_dir, rel_path)
+                if is_up_to_date(os.stat(src_path), dest_path): stats["unchanged"] += 1
+                else: transfers.append((src_path, dest_path))
+        stats["folders"] += 1
+
+    def transfer(task):
+        src_path, dest_path = task
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        return link_or_copy(src_path, dest_path, same_device)
+
+    if transfers:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(transfer, task) for task in transfers]
+            for task, future in zip(transfers, futures):
+                try:
+                    stats[future.result()] += 1
+                except Exception as e:
+                    print(f"Error exporting '{task[0]}': {e}")
+                    stats["errors"] += 1
+
+    if prune:
+        for entry in os.scandir(export_dir):
+            if entry.is_dir() and entry.name not in base_ids:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                stats["pruned"] += 1
+    return stats
+
+def _remove_unwanted_files(dest_dir, wanted_files):
+    removed = 0
+    if not os.path.isdir(dest_dir): return removed
+    for dirpath, _, filenames in os.walk(dest_dir):
+        for filename in filenames:
+            file_path = os.path.join(dirpath, filename)
+            if os.path.normpath(os.path.relpath(file_path, dest_dir)) not in wanted_files:
+                os.remove(file_path); removed += 1
+    return removed
+
+def resolve_referenced_files(decorations, get_furni_data):
+    """
+    Works out exactly which files each furni needs for the given decorations.
+    Returns {base_id: {variant_id: set of rotations}} and {base_id: set of relative file paths},
+    the latter holding the used render images and the icons of the used variants.
+    """
+    used_renders, used_files = {}, {}
+    for deco in decorations:
+        base_id, variant_id, rotation = deco.get("base_id"), str(deco.get("variant_id", "0")), str(deco.get("rotation", 0))
+        used_renders.setdefault(base_id, {}).setdefault(variant_id, set()).add(rotation)
+        files = used_files.setdefault(base_id, set())
+        furni_data = get_furni_data(base_id)
+        variant = (furni_data or {}).get("variants", {}).get(variant_id)
+        if not variant:
+            print(f"[WARN] Variant {variant_id} of '{base_id}' not found, nothing to export for it.")
+            continue
+        if render_path := variant.get("renders", {}).get(rotation, {}).get("path"): files.add(os.path.normpath(render_path))
+        else: print(f"[WARN] '{base_id}' variant {variant_id} has no render for rotation {rotation}.")
+        if variant.get("icon_path"): files.add(os.path.normpath(variant["icon_path"]))
+    return used_renders, used_files
+
+def trim_furni_data(furni_data, used_variants):
+    """Returns a copy of a data.json dict that only keeps the used variants and, in them, the used rotations."""
+    trimmed = {key: value for key, value in furni_data.items() if key != "variants"}
+    trimmed["variants"] = {}
+    for variant_id, rotations in used_variants.items():
+        variant = furni_data.get("variants", {}).get(variant_id)
+        if variant is None: continue
+        trimmed_variant = dict(variant)
+        trimmed_variant["renders"] = {rot: info for rot, info in variant.get("renders", {}).items() if rot in rotations}
+        if "rotations" in variant: trimmed_variant["rotations"] = [rot for rot in variant["rotations"] if str(rot) in rotations]
+        trimmed["variants"][variant_id] = trimmed_variant
+    return trimmed
+
+def load_source_furni_data(source_root, base_ids):
+    """
+    Reads the data.json of each furni from source_root. Returns {base_id: data, or None if it is missing or invalid}.
+    The export works from these files, not from the editor's furni index, which only keeps what the editor needs.
+    """
+    furni_data = {}
+    for base_id in base_ids:
+        data_path = os.path.join(source_root, base_id, "data.json")
+        try:
+            with open(data_path, 'r', encoding='utf-8') as f: furni_data[base_id] = json.load(f)
+        except FileNotFoundError: furni_data[base_id] = None
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading data.json for '{base_id}': {e}")
+            furni_data[base_id] = None
+    return furni_data
+
+def list_furni_files(furni_data):
+    """Relative paths of every render and icon a data.json refers to."""
+    files = set()
+    for variant in (furni_data or {}).get("variants", {}).values():
+        files.update(os.path.normpath(info["path"]) for info in variant.get("renders", {}).values() if info.get("path"))
+        if variant.get("icon_path"): files.add(os.path.normpath(variant["icon_path"]))
+    return files
+
+def write_bytes_if_changed(path, data):
+    """Writes data unless the file already holds exactly these bytes. Returns True if written."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data: return False
+    except OSError: pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first: the destination may be a hardlink to a source asset.
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f: f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+def export_referenced_files(decorations, source_root, export_dir, prune=False, max_workers=EXPORT_WORKERS):
+    """
+    Exports only the render images and icons referenced by the decorations, and writes a
+    trimmed copy of each furni's source data.json (only when its content changed). Returns the export
+    statistics, including 'bytes_saved': the size of the renders and icons of the used furni that were left out.
+    """
+    source_data = load_source_furni_data(source_root, {deco.get("base_id") for deco in decorations})
+    used_renders, used_files = resolve_referenced_files(decorations, source_data.get)
+    stats = export_furni_folders(set(used_files), source_root, export_dir, prune=prune, max_workers=max_workers,
+                                 file_filter=used_files, keep_files=frozenset({"data.json"}))
+    stats["data_files_written"] = 0
+    bytes_saved = 0
+    for base_id, files in used_files.items():
+        furni_data = source_data.get(base_id)
+        if not furni_data or base_id in stats["missing"]: continue
+        try:
+            trimmed_text = json.dumps(trim_furni_data(furni_data, used_renders[base_id]), indent=2)
+            if write_bytes_if_changed(os.path.join(export_dir, base_id, "data.json"), trimmed_text.encode('utf-8')): stats["data_files_written"] += 1
+        except OSError as e:
+            print(f"Error writing trimmed data.json for '{base_id}': {e}")
+            stats["errors"] += 1
+            continue
+        for rel_path in list_furni_files(furni_data) - files:
+            try: bytes_saved += os.path.getsize(os.path.join(source_root, base_id, rel_path))
+            except OSError: pass
+    stats["bytes_saved"] = bytes_saved
+    return stats
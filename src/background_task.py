@@ -0,0 +1,43 @@
+# src/background_task.py
+import queue
+import threading
+import traceback
+
+class BackgroundTask:
+    """
+    Runs a function on a worker thread so the editor keeps responding.
+    The function receives a 'report(step, total, message)' callback as first argument;
+    progress, the result and errors are queued and picked up by the main loop with poll().
+    """
+    def __init__(self, func, *args, **kwargs):
+        self.events = queue.Queue()
+        self.progress = None # Last reported (step, total, message)
+        self.is_done = False
+        # Not a daemon thread: a save that is in progress must be allowed to finish when the editor closes.
+        self.thread = threading.Thread(target=self._run, args=(func, args, kwargs), name=getattr(func, "__name__", "task"))
+        self.thread.start()
+
+    def _run(self, func, args, kwargs):
+        try:
+            result = func(self.report, *args, **kwargs)
+            self.events.put(("done", result))
+        except Exception as e:
+            traceback.print_exc()
+            self.events.put(("error", e))
+
+    def report(self, step, total, message):
+        self.events.put(("progress", (step, total, message)))
+
+    def poll(self):
+        """Returns the events queued since the last call, as a list of (kind, payload). Call from the main thread."""
+        events = []
+        while True:
+            try: kind, payload = self.events.get_nowait()
+            except queue.Empty: break
+            if kind == "progress": self.progress = payload
+            else: self.is_done = True
+            events.append((kind, payload))
+        return events
+
+    def wait(self):
+        self.thread.join()
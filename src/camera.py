@@ -1,6 +1,7 @@
 # src/camera.py
 
 import pygame
+from common.constants import ZOOM_LEVELS
 
 class Camera:
     def __init__(self, editor_rect=pygame.Rect(0,0,1,1)):
@@ -10,7 +11,7 @@ class Camera:
         self.pan_start_pos = (0, 0)
         
         # Switched to snapped zoom levels for pixel-perfect rendering
-        self.zoom_levels = [0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0]
+        self.zoom_levels = list(ZOOM_LEVELS)
         try:
             # Start at 100% zoom
             self.current_zoom_index = self.zoom_levels.index(1.0)
@@ -12,6 +12,10 @@ TILE_WIDTH, TILE_HEIGHT = 64, 32
 TILE_WIDTH_HALF, TILE_HEIGHT_HALF = TILE_WIDTH // 2, TILE_HEIGHT // 2
 WALL_HEIGHT = 96
 
+# --- Camera ---
+# Snapped zoom levels for pixel-perfect rendering. Sprites are pre-scaled (and cached on disk) for each of them.
+ZOOM_LEVELS = [0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0]
+
 # --- Colors ---
 COLOR_BG = (20, 30, 40)
 COLOR_TOP_BAR = (30, 40, 50)
@@ -48,6 +52,8 @@ COLOR_TOGGLE_ON_HOVER = (70, 180, 70)
 # --- Walkable Overlay Colors ---
 COLOR_WALKABLE_OVERLAY = (50, 200, 50, 128)
 COLOR_NON_WALKABLE_OVERLAY = (200, 50, 50, 128)
+COLOR_UNREACHABLE_OVERLAY = (230, 160, 30, 160) # Walkable, but not reachable from the door
+COLOR_DOOR = (80, 200, 255)
 
 # --- Tile Types ---
 TILE_TYPE_FULL = 1
@@ -63,6 +69,15 @@ MODE_WALLS = 1
 MODE_WALKABLE = 2
 MODE_LAYERS = 3
 
+# --- Structure Tools ---
+# Apply to tiles, walkable flags and layers. Left click paints, right click erases/resets.
+TOOL_BRUSH = 0
+TOOL_LINE = 1
+TOOL_RECT = 2
+TOOL_FILL = 3
+TOOL_NAMES = {TOOL_BRUSH: "Brush", TOOL_LINE: "Line", TOOL_RECT: "Rectangle", TOOL_FILL: "Flood Fill"}
+FLOOD_FILL_MAX_CELLS = 250_000
+
 # --- Layer System ---
 # Defines the rendering order for decorations. Lower IDs are rendered first.
 # "Tile Layers" can be painted on the grid (Structure Editor) and saved in structure.json as a default.
@@ -113,4 +128,53 @@ EDITOR_MODE_STRUCTURE = 0
 EDITOR_MODE_DECORATIONS = 1
 
 # --- Decoration ---
-DECO_ROTATION_MAP = [2, 4, 6, 0]
\ No newline at end of file
+DECO_ROTATION_MAP = [2, 4, 6, 0] # Furni direction shown by each decoration rotation (0-3)
+# A furni's footprint is dimensions x by y tiles (from its data.json) facing directions 2 and 6, and y by x facing these.
+FOOTPRINT_SWAPPED_DIRECTIONS = (0, 4)
+
+# --- Navigation Export ---
+# Bits of the open sides mask of each node in the saved navigation graph.
+NAV_SIDE_BITS = {EDGE_NE: 1, EDGE_SE: 2, EDGE_SW: 4, EDGE_NW: 8}
+
+# --- Structure File Format ---
+STRUCTURE_FORMAT_DENSE = "dense" # One string per row of the bounding box (files without a "format" key)
+STRUCTURE_FORMAT_CHUNKED = "chunked" # Only the chunks holding tiles, with run-length-encoded rows, see structure_format.py
+STRUCTURE_CHUNK_SIZE = 16
+# Format structure.json is saved in. Set it to STRUCTURE_FORMAT_CHUNKED for large rooms that are mostly empty space;
+# game code that only reads dense files must be updated first. The editor loads both formats either way.
+STRUCTURE_SAVE_FORMAT = STRUCTURE_FORMAT_DENSE
+
+# --- Decoration Loading ---
+STREAM_DECORATIONS_MIN_BYTES = 1024 * 1024 # Decoration set files this large are streamed in while the editor runs
+DECORATION_LOAD_BATCH = 500 # Decorations parsed and indexed per step of a streamed load
+DECORATION_LOAD_FRAME_BUDGET_MS = 12 # Time per frame given to a streamed load
+
+# --- Runtime Export ---
+ROOM_BUNDLE_FILENAME = "room.bundle" # Binary room for game clients, see room_bundle.py
+BAKED_BACKGROUND_FILENAME = "room_background.png" # Tiles, walls and static decorations pre-rendered in one image
+DRAW_LIST_FILENAME = "room_drawlist.json" # The decorations left to draw over the baked background
+# Decorations up to this layer are baked into the background. They render before every other layer, so the
+# background stays a prefix of the render order. Set BAKE_STATIC_DECORATIONS to False to bake tiles and walls only.
+BAKED_DECORATION_MAX_LAYER = LAYER_BACKGROUND
+BAKE_STATIC_DECORATIONS = True
+
+# --- Asset Export ---
+# How saving exports the furni the room uses into its 'furnis' folder: "full" copies each furni folder whole,
+# "referenced" only the renders and icons the decorations use, with a trimmed data.json (see asset_export.py).
+ASSET_EXPORT_MODE = "full"
+# When True, saving offers to delete the furni folders in 'furnis' that the room no longer uses. It always asks first.
+PRUNE_UNUSED_ASSETS = False
+
+# --- Room Data Parts ---
+# Tracked separately so saving only rewrites what changed.
+PART_STRUCTURE = "structure"
+PART_DECORATIONS = "decorations"
+PART_ASSETS = "assets" # The set of furni used by the decorations
+ROOM_PARTS = [PART_STRUCTURE, PART_DECORATIONS, PART_ASSETS]
+
+# --- Edit Journal ---
+AUTOSAVE_INTERVAL_MS = 5000 # How often recorded edits are flushed to the journal file
+JOURNAL_COMPACT_OPS = 5000 # Operations after which the journal is rewritten as a single snapshot
+
+# --- Undo/Redo ---
+UNDO_MEMORY_LIMIT_BYTES = 16 * 1024 * 1024 # Oldest undo steps are dropped once their operations use more than this
\ No newline at end of file
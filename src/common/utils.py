@@ -19,4 +19,38 @@ def screen_to_grid(screen_x, screen_y, offset, zoom=1.0):
     # Inverse transformation
     gx = round((wx / scaled_twh + wy / scaled_thh) / 2)
     gy = round((wy / scaled_thh - wx / scaled_twh) / 2)
-    return int(gx), int(gy)
\ No newline at end of file
+    return int(gx), int(gy)
+
+def grid_line(start, end):
+    """Returns the grid cells on the line from start to end, both included (Bresenham's line algorithm)."""
+    x0, y0 = start; x1, y1 = end
+    dx = abs(x1 - x0); dy = -abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1; sy = 1 if y0 < y1 else -1
+    err = dx + dy
+    cells = [(x0, y0)]
+    while (x0, y0) != (x1, y1):
+        e2 = 2 * err
+        if e2 >= dy: err += dy; x0 += sx
+        if e2 <= dx: err += dx; y0 += sy
+        cells.append((x0, y0))
+    return cells
+
+def grid_rect(corner_a, corner_b):
+    """Returns every grid cell of the rectangle spanned by two opposite corners."""
+    min_x, max_x = sorted((corner_a[0], corner_b[0])); min_y, max_y = sorted((corner_a[1], corner_b[1]))
+    return [(x, y) for y in range(min_y, max_y + 1) for x in range(min_x, max_x + 1)]
+
+def flood_fill(start, is_inside, max_cells):
+    """
+    Returns the 4-connected cells reachable from start for which is_inside(cell) is True,
+    or None if there are more than max_cells of them (e.g. an open region).
+    """
+    if not is_inside(start): return []
+    region = {start}; stack = [start]
+    while stack:
+        x, y = stack.pop()
+        for neighbor in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if neighbor not in region and is_inside(neighbor):
+                region.add(neighbor); stack.append(neighbor)
+                if len(region) > max_cells: return None
+    return list(region)
@@ -1,9 +1,16 @@
 # src/data_manager.py
 import json
 import os
+import hashlib
 from tkinter import filedialog, Tk, messagebox
 import pygame
-import shutil
+from sprite_cache import SpriteDiskCache
+from background_task import BackgroundTask
+from asset_export import export_furni_folders, export_referenced_files, EXPORT_MODE_FULL, EXPORT_MODE_REFERENCED
+from common.constants import DECO_ROTATION_MAP, FOOTPRINT_SWAPPED_DIRECTIONS, ROOM_BUNDLE_FILENAME, BAKED_BACKGROUND_FILENAME, DRAW_LIST_FILENAME, STREAM_DECORATIONS_MIN_BYTES, ASSET_EXPORT_MODE, PRUNE_UNUSED_ASSETS, STRUCTURE_FORMAT_CHUNKED
+from room import Room
+from room_bundle import write_room_bundle
+from decoration_stream import DecorationSetReader
 
 class DataManager:
     def __init__(self, project_root, assets_root):
@@ -14,39 +21,50 @@ class DataManager:
         self.current_structure_path = None
         self.image_cache = {}
         self.furni_data_cache = {}
+        self.furni_index = self.load_furni_index()
+        self.rotation_table = {} # Key: (base_id, variant_id), Value: frozenset of rotations that have a render
+        self.build_rotation_table()
+        self.footprint_table = {} # Key: (base_id, rotation), Value: (width, depth) in tiles along the grid x and y axes
+        self.sprite_cache = SpriteDiskCache(os.path.join(self.project_root, "assets", "sprite_cache"))
+        self.prune_unused_assets = PRUNE_UNUSED_ASSETS # If True, saving offers to delete exported furni folders the room no longer uses
+        self.asset_export_mode = ASSET_EXPORT_MODE # EXPORT_MODE_REFERENCED exports only the files the decorations use
+        if self.asset_export_mode not in (EXPORT_MODE_FULL, EXPORT_MODE_REFERENCED):
+            print(f"[WARN] Unknown ASSET_EXPORT_MODE '{self.asset_export_mode}', exporting whole furni folders.")
+            self.asset_export_mode = EXPORT_MODE_FULL
+        self.last_saved_folder = None # Folder of the last save in this session; saves to it only write what changed
+        self.saved_hashes = {} # Key: file path, Value: SHA-1 of the content written there by the last save
 
     def _init_tk_root(self):
         if self.root is None:
             self.root = Tk()
             self.root.withdraw()
 
-    def _export_used_assets(self, decoration_set_data, export_dir):
-        """Copies the asset folders of the furniture to a destination directory."""
-        if not decoration_set_data.get("decorations"): return 0
-        
-        used_base_ids = {deco['base_id'] for deco in decoration_set_data["decorations"]}
-        if not used_base_ids: return 0
+    def _export_used_assets(self, decoration_set_data, export_dir, prune=False):
+        """
+        Synchronises the asset folders of the used furniture into a destination directory.
+        Files that are already present and unchanged are skipped; the rest are hardlinked,
+        reflinked or copied in parallel. In EXPORT_MODE_REFERENCED only the renders and icons
+        the decorations reference are exported, with a trimmed data.json per furni.
+        With 'prune' (confirmed by the user, see confirm_prune_assets) unused furni folders are deleted.
+        """
+        used_base_ids = {deco['base_id'] for deco in decoration_set_data.get("decorations", [])}
+        if not used_base_ids and not prune: return 0
 
         print(f"Exporting assets for {len(used_base_ids)} items to: {export_dir}")
-        exported_count = 0
-        for base_id in used_base_ids:
-            source_path = os.path.join(self.assets_root, "4_final_furni_data", base_id)
-            dest_path = os.path.join(export_dir, base_id)
-            if os.path.isdir(source_path):
-                try:
-                    shutil.copytree(source_path, dest_path, dirs_exist_ok=True)
-                    exported_count += 1
-                except Exception as e:
-                    print(f"Error exporting assets for '{base_id}': {e}")
-            else:
-                print(f"Warning: Source asset directory not found for '{base_id}' at {source_path}")
-        return exported_count
+        source_root = os.path.join(self.assets_root, "4_final_furni_data")
+        if self.asset_export_mode == EXPORT_MODE_REFERENCED:
+            stats = export_referenced_files(decoration_set_data.get("decorations", []), source_root, export_dir, prune=prune)
+        else:
+            stats = export_furni_folders(used_base_ids, source_root, export_dir, prune=prune)
+        for base_id in stats["missing"]:
+            print(f"Warning: Source asset directory not found for '{base_id}' at {os.path.join(source_root, base_id)}")
+        print(f"  - Files: {stats['unchanged']} unchanged, {stats['linked']} hardlinked, {stats['reflinked']} reflinked, {stats['copied']} copied, {stats['errors']} failed")
+        if stats["pruned"]: print(f"  - Removed {stats['pruned']} folders of furni no longer used")
+        if "bytes_saved" in stats: print(f"  - Referenced-only export: {stats['data_files_written']} trimmed data.json rewritten, {stats['bytes_saved'] / 1024:.1f} KB of unused renders and icons left out")
+        return stats["folders"]
 
-    def save_project_to_folder(self, structure_data, decoration_set_data):
-        """
-        Asks the user for a folder and saves the structure, decorations, and
-        assets of the used furniture in it.
-        """
+    def ask_project_folder(self):
+        """Asks the user for the folder to save the entire room project in. Returns None if cancelled."""
         self._init_tk_root()
         initial_dir = os.path.join(self.project_root, "rooms")
         target_folder = filedialog.askdirectory(
@@ -55,51 +73,205 @@ class DataManager:
             title="Select a folder to save the entire room project"
         )
         self.root.update()
+        return target_folder or None
 
-        if not target_folder:
-            return False, None, None # User cancelled
+    def confirm_prune_assets(self, target_folder, decoration_set_data):
+        """
+        With prune_unused_assets on, asks whether to delete the exported furni folders in target_folder
+        that the decorations no longer use. Returns True only if there are some and the user agreed.
+        """
+        if not self.prune_unused_assets: return False
+        furnis_folder_path = os.path.join(target_folder, "furnis")
+        if not os.path.isdir(furnis_folder_path): return False
+        used_base_ids = {deco['base_id'] for deco in decoration_set_data.get("decorations", [])}
+        unused = sorted(entry.name for entry in os.scandir(furnis_folder_path) if entry.is_dir() and entry.name not in used_base_ids)
+        if not unused: return False
+        listed = ", ".join(unused[:10]) + (f" and {len(unused) - 10} more" if len(unused) > 10 else "")
+        self._init_tk_root()
+        answer = messagebox.askyesno(
+            "Delete Unused Assets",
+            f"{len(unused)} furni folders in '{furnis_folder_path}' are no longer used by this room:\n{listed}\n\n"
+            "Do you want to delete them? This cannot be undone."
+        )
+        self.root.update()
+        return answer
 
-        try:
-            base_name = os.path.basename(target_folder)
-            structure_filename = "structure.json"
-            decorations_filename = "decorations.json"
-            furnis_folder_path = os.path.join(target_folder, "furnis")
+    def apply_project_identity(self, structure_data, decoration_set_data, target_folder):
+        """Names the structure and decoration set after the project folder. Returns the folder's base name."""
+        base_name = os.path.basename(target_folder)
+        structure_data['id'] = base_name
+        decoration_set_data['structure_id'] = base_name
+        decoration_set_data['decoration_set_name'] = f"{base_name.replace('_', ' ').title()} Decorations"
+        return base_name
+
+    def get_journal_path(self):
+        """The edit journal lives next to the project's structure file; unsaved rooms use an autosave folder."""
+        if self.current_structure_path:
+            folder, filename = os.path.split(self.current_structure_path)
+            return os.path.join(folder, f"{os.path.splitext(filename)[0]}.journal")
+        return os.path.join(self.project_root, "rooms", "autosave", "untitled.journal")
+
+    def ask_recover_journal(self, journal_path):
+        self._init_tk_root()
+        answer = messagebox.askyesno(
+            "Recover Unsaved Edits",
+            f"This room has edits that were not saved (found in '{os.path.basename(journal_path)}').\n\n"
+            "Do you want to recover them?"
+        )
+        self.root.update()
+        return answer
+
+    def reset_save_state(self):
+        """Forgets what the last save wrote, e.g. after another room is loaded. The next save writes everything."""
+        self.last_saved_folder = None
+        self.saved_hashes.clear()
+
+    @staticmethod
+    def _atomic_write_text(filepath, text):
+        """Writes to a temporary file next to the target and swaps it in, so a crash never leaves a half-written file."""
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
 
-            structure_filepath = os.path.join(target_folder, structure_filename)
-            decorations_filepath = os.path.join(target_folder, decorations_filename)
+    def _write_json_if_changed(self, filepath, data, written_hashes):
+        """Serialises 'data' and writes it unless the file already holds exactly that content. Returns True if written."""
+        text = json.dumps(data, indent=2)
+        content_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        written_hashes[filepath] = content_hash
+        if self.saved_hashes.get(filepath) == content_hash and os.path.exists(filepath): return False
+        self._atomic_write_text(filepath, text)
+        return True
 
-            structure_data['id'] = base_name
-            decoration_set_data['structure_id'] = base_name
-            decoration_set_data['decoration_set_name'] = f"{base_name.replace('_', ' ').title()} Decorations"
+    def _write_bytes_if_changed(self, filepath, data, written_hashes):
+        """Binary counterpart of _write_json_if_changed."""
+        content_hash = hashlib.sha1(data).hexdigest()
+        written_hashes[filepath] = content_hash
+        if self.saved_hashes.get(filepath) == content_hash and os.path.exists(filepath): return False
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+        return True
 
-            with open(structure_filepath, 'w') as f:
-                json.dump(structure_data, f, indent=2)
+    @staticmethod
+    def _read_json(filepath):
+        with open(filepath, 'r', encoding='utf-8') as f: return json.load(f)
+
+    @staticmethod
+    def _atomic_save_image(surface, filepath):
+        # pygame picks the image format from the extension, so the temporary name must keep it.
+        root, ext = os.path.splitext(filepath)
+        tmp_path = f"{root}.tmp{ext}"
+        pygame.image.save(surface, tmp_path)
+        os.replace(tmp_path, filepath)
+
+    def start_project_save(self, target_folder, structure_data, decoration_set_data, screenshot_surface=None, export_assets=True, screenshot_hash=None, baked_scene=None, prune_assets=False):
+        """
+        Saves the project on a worker thread. The data passed in must be a snapshot that the
+        editor no longer mutates; parts passed as None are left as they are on disk.
+        Returns the BackgroundTask; hand its 'done' result to finish_project_save.
+        """
+        return BackgroundTask(self.write_project_files, target_folder, structure_data, decoration_set_data, screenshot_surface, export_assets, screenshot_hash, baked_scene, prune_assets)
+
+    def write_project_files(self, report, target_folder, structure_data, decoration_set_data, screenshot_surface=None, export_assets=True, screenshot_hash=None, baked_scene=None, prune_assets=False):
+        """
+        Writes the structure, decorations, runtime bundle, baked background and draw list (baked_scene,
+        from RoomRenderer.bake_static_scene), assets of the used furniture and the preview
+        screenshot into target_folder. Runs on the save worker thread.
+        'prune_assets' deletes unused furni folders; only pass True once confirm_prune_assets agreed.
+        Files whose content hash matches what the last save wrote are not rewritten.
+        The furni data caches belong to the main thread: the asset export reads the source data.json files itself.
+        """
+        base_name = os.path.basename(target_folder)
+        structure_filename = "structure.json"
+        decorations_filename = "decorations.json"
+        furnis_folder_path = os.path.join(target_folder, "furnis")
+
+        structure_filepath = os.path.join(target_folder, structure_filename)
+        decorations_filepath = os.path.join(target_folder, decorations_filename)
+        bundle_filepath = os.path.join(target_folder, ROOM_BUNDLE_FILENAME)
+        total_steps = 6
+        written_hashes = {}
+
+        report(1, total_steps, "Writing structure")
+        if structure_data is not None and self._write_json_if_changed(structure_filepath, structure_data, written_hashes):
             print(f"Saved structure to {structure_filepath}")
+            if structure_data.get("format") == STRUCTURE_FORMAT_CHUNKED: print(f"[LOG] Structure saved in the chunked format ({len(structure_data['chunks'])} chunks of {structure_data['chunk_size']}x{structure_data['chunk_size']}), as set by STRUCTURE_SAVE_FORMAT.")
+        else: print("Structure unchanged, not rewritten.")
 
-            with open(decorations_filepath, 'w') as f:
-                json.dump(decoration_set_data, f, indent=2)
+        report(2, total_steps, "Writing decorations")
+        if decoration_set_data is not None and self._write_json_if_changed(decorations_filepath, decoration_set_data, written_hashes):
             print(f"Saved decorations to {decorations_filepath}")
+        else: print("Decorations unchanged, not rewritten.")
+
+        if structure_data is not None or decoration_set_data is not None or not os.path.exists(bundle_filepath):
+            report(3, total_steps, "Writing runtime bundle")
+            # A part that did not change is taken from the file the previous save wrote.
+            bundle_structure = structure_data if structure_data is not None else self._read_json(structure_filepath)
+            bundle_decorations = decoration_set_data if decoration_set_data is not None else self._read_json(decorations_filepath)
+            bundle = write_room_bundle(bundle_structure, bundle_decorations, sort_key=Room.render_sort_key)
+            if self._write_bytes_if_changed(bundle_filepath, bundle, written_hashes): print(f"Saved runtime bundle to {bundle_filepath} ({len(bundle)} bytes)")
+
+        if baked_scene is not None:
+            report(4, total_steps, "Writing baked background")
+            background_surface, draw_list = baked_scene
+            background_filepath = os.path.join(target_folder, BAKED_BACKGROUND_FILENAME)
+            if background_surface is not None:
+                background_hash = hashlib.sha1(pygame.image.tostring(background_surface, "RGBA")).hexdigest()
+                written_hashes[background_filepath] = background_hash
+                if self.saved_hashes.get(background_filepath) != background_hash or not os.path.exists(background_filepath):
+                    self._atomic_save_image(background_surface, background_filepath)
+                    print(f"Saved baked background to {background_filepath} ({background_surface.get_width()}x{background_surface.get_height()})")
+            elif os.path.exists(background_filepath): os.remove(background_filepath)
+            if self._write_json_if_changed(os.path.join(target_folder, DRAW_LIST_FILENAME), draw_list, written_hashes):
+                print(f"Saved draw list with {len(draw_list['sprites'])} sprites to {DRAW_LIST_FILENAME}")
 
+        num_exported = None
+        if export_assets and decoration_set_data is not None:
+            report(5, total_steps, "Exporting assets")
             os.makedirs(furnis_folder_path, exist_ok=True)
-            num_exported = self._export_used_assets(decoration_set_data, furnis_folder_path)
+            num_exported = self._export_used_assets(decoration_set_data, furnis_folder_path, prune=prune_assets)
             print(f"Exported {num_exported} asset folders.")
+        else: print("Set of used furniture unchanged, assets not re-exported.")
 
-            self.current_structure_path = structure_filepath
-            self.current_decoration_set_path = decorations_filepath
+        if screenshot_surface is not None:
+            report(6, total_steps, "Saving screenshot")
+            screenshot_path = os.path.join(target_folder, "RoomScreenshot.png")
+            try:
+                self._atomic_save_image(screenshot_surface, screenshot_path)
+                if screenshot_hash: written_hashes[screenshot_path] = screenshot_hash
+                print(f"Screenshot automatically saved to {screenshot_path}")
+            except Exception as e:
+                print(f"Error automatically saving screenshot: {e}")
 
-            messagebox.showinfo(
-                "Save Complete",
-                f"Project '{base_name}' saved successfully!\n\n"
-                f"- Structure: {structure_filename}\n"
-                f"- Decorations: {decorations_filename}\n"
-                f"- Exported {num_exported} furniture assets to 'furnis' folder."
-            )
-            return True, base_name, target_folder
+        return {"base_name": base_name, "target_folder": target_folder, "num_exported": num_exported, "written_hashes": written_hashes,
+                "structure_filepath": structure_filepath, "decorations_filepath": decorations_filepath}
 
-        except Exception as e:
-            print(f"Error during project save: {e}")
-            messagebox.showerror("Save Error", f"An error occurred while saving the project: {e}")
-            return False, None, None
+    def finish_project_save(self, result):
+        """Called on the main thread once the save worker is done."""
+        self.current_structure_path = result["structure_filepath"]
+        self.current_decoration_set_path = result["decorations_filepath"]
+        if self.last_saved_folder != result["target_folder"]: self.saved_hashes.clear()
+        self.last_saved_folder = result["target_folder"]
+        self.saved_hashes.update(result["written_hashes"])
+        assets_line = f"- Exported {result['num_exported']} furniture assets to 'furnis' folder." if result["num_exported"] is not None else "- Furniture assets already up to date."
+        self._init_tk_root()
+        messagebox.showinfo(
+            "Save Complete",
+            f"Project '{result['base_name']}' saved successfully!\n\n"
+            f"- Structure: {os.path.basename(result['structure_filepath'])}\n"
+            f"- Decorations: {os.path.basename(result['decorations_filepath'])}\n"
+            f"- Runtime bundle: {ROOM_BUNDLE_FILENAME}, {BAKED_BACKGROUND_FILENAME} + {DRAW_LIST_FILENAME}\n"
+            f"{assets_line}"
+        )
+
+    def report_save_error(self, error):
+        print(f"Error during project save: {error}")
+        self._init_tk_root()
+        messagebox.showerror("Save Error", f"An error occurred while saving the project: {error}")
 
     def load_catalog(self):
         catalog_path = os.path.join(self.project_root, "assets", "catalog.json")
@@ -113,7 +285,26 @@ class DataManager:
             print(f"Error loading catalog: {e}")
             return {}
 
+    def load_furni_index(self):
+        """
+        Loads the consolidated furni metadata index written by build_catalog.py, so
+        furni data can be served without opening a data.json per item while editing.
+        """
+        index_path = os.path.join(self.project_root, "assets", "furni_index.json")
+        if not os.path.exists(index_path):
+            print("Warning: furni_index.json not found. Furni data will be read per item. Run build_catalog.py to create it.")
+            return {}
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("items", {})
+        except Exception as e:
+            print(f"Error loading furni index: {e}")
+            return {}
+
     def get_furni_data(self, base_id):
+        """Index entry (or data.json) of a furni, cached. Main thread only: the cache is not shared with the save worker."""
+        if base_id in self.furni_index:
+            return self.furni_index[base_id]
         if base_id in self.furni_data_cache:
             return self.furni_data_cache[base_id]
         data_path = os.path.join(self.assets_root, "4_final_furni_data", base_id, "data.json")
@@ -130,6 +321,48 @@ class DataManager:
             self.furni_data_cache[base_id] = None
             return None
 
+    def build_rotation_table(self):
+        """Precomputes the valid rotations of every variant in the furni index, without touching any image."""
+        for base_id, furni_data in self.furni_index.items():
+            for variant_id in furni_data.get("variants", {}):
+                self.get_valid_rotations(base_id, variant_id)
+
+    def get_valid_rotations(self, base_id, variant_id):
+        """Returns the set of rotations that have a render for a furni variant (from the 'renders' keys)."""
+        key = (base_id, str(variant_id))
+        rotations = self.rotation_table.get(key)
+        if rotations is None:
+            rotations = set()
+            furni_data = self.get_furni_data(base_id)
+            if furni_data:
+                variant = furni_data.get("variants", {}).get(str(variant_id), {})
+                for rotation in variant.get("renders", {}):
+                    try: rotations.add(int(rotation))
+                    except ValueError: print(f"[WARN] Ignoring invalid rotation key '{rotation}' in '{base_id}' variant {variant_id}.")
+            rotations = self.rotation_table[key] = frozenset(rotations)
+        return rotations
+
+    def get_footprint(self, base_id, rotation):
+        """Returns the (width, depth) in tiles a furni covers at a rotation, from its data.json 'dimensions' (1x1 if missing)."""
+        key = (base_id, rotation)
+        footprint = self.footprint_table.get(key)
+        if footprint is None:
+            dims = (self.get_furni_data(base_id) or {}).get("dimensions") or {}
+            try: width, depth = max(1, int(dims.get("x", 1))), max(1, int(dims.get("y", 1)))
+            except (TypeError, ValueError):
+                print(f"[WARN] Invalid dimensions {dims} in '{base_id}', using a 1x1 footprint.")
+                width, depth = 1, 1
+            is_swapped = DECO_ROTATION_MAP[rotation % len(DECO_ROTATION_MAP)] in FOOTPRINT_SWAPPED_DIRECTIONS
+            footprint = self.footprint_table[key] = (depth, width) if is_swapped else (width, depth)
+        return footprint
+
+    def is_valid_rotation(self, base_id, variant_id, rotation):
+        return rotation in self.get_valid_rotations(base_id, variant_id)
+
+    def find_invalid_rotations(self, decorations):
+        """Returns the decorations whose rotation has no render for their furni variant."""
+        return [d for d in decorations if not self.is_valid_rotation(d.get("base_id"), d.get("variant_id", "0"), d.get("rotation", 0))]
+
     def get_image(self, base_id, relative_path):
         cache_key = f"{base_id}/{relative_path}"
         if cache_key in self.image_cache:
@@ -145,6 +378,34 @@ class DataManager:
             print(f"Error loading image {full_path}: {e}")
             return None
 
+    def get_scaled_image(self, base_id, relative_path, zoom):
+        """
+        Returns a furni image scaled to 'zoom'. Served from the on-disk sprite cache when
+        possible; otherwise the PNG is decoded and scaled once and the result is cached.
+        """
+        full_path = os.path.join(self.assets_root, "4_final_furni_data", base_id, relative_path)
+        if cached := self.sprite_cache.get(base_id, relative_path, zoom, full_path):
+            return cached
+        image = self.get_image(base_id, relative_path)
+        if not image: return None
+        img_w, img_h = image.get_size()
+        scaled_size = (int(img_w * zoom), int(img_h * zoom))
+        if scaled_size[0] <= 0 or scaled_size[1] <= 0: return None
+        scaled_image = image if scaled_size == (img_w, img_h) else pygame.transform.scale(image, scaled_size)
+        try:
+            self.sprite_cache.put(base_id, relative_path, zoom, full_path, scaled_image)
+        except OSError as e:
+            print(f"Warning: Could not write sprite cache entry for {full_path}: {e}")
+        return scaled_image
+
+    def close(self):
+        """Persists caches that are written lazily during the session."""
+        try:
+            self.sprite_cache.save_index()
+            self.sprite_cache.compact_if_needed()
+        except OSError as e:
+            print(f"Error saving sprite cache index: {e}")
+
     def load_structure_only(self):
         self._init_tk_root()
         initial_dir = os.path.join(self.project_root, "rooms", "structures")
@@ -158,7 +419,28 @@ class DataManager:
             return structure_data
         except Exception as e: print(f"Error loading structure file: {e}"); return None
 
+    @staticmethod
+    def open_decoration_set(filepath):
+        """
+        Starts reading a decoration set file. Returns (decoration set without its decorations, reader to stream
+        them from), or (the whole set, None) when the file is small or its identifying keys come after the array.
+        """
+        reader = DecorationSetReader(filepath)
+        try:
+            header = reader.read_header()
+            if not reader.in_decorations or "structure_id" not in header or reader.file_size < STREAM_DECORATIONS_MIN_BYTES:
+                data = reader.read_all(); reader.close()
+                return data, None
+        except Exception:
+            reader.close(); raise
+        return dict(header, decorations=[]), reader
+
     def load_decoration_set_and_structure(self, initial_dir=None):
+        """
+        Asks for a project file and returns (structure_data, decoration_set_data, decoration_stream).
+        Large decoration sets come without their decorations and a DecorationSetReader to stream them from
+        (see open_decoration_set); decoration_stream is None otherwise.
+        """
         self._init_tk_root()
         if initial_dir is None:
             initial_dir = os.path.join(self.project_root, "rooms")
@@ -171,11 +453,12 @@ class DataManager:
             filetypes=(("JSON files", "*.json"), ("All files", "*.*"))
         )
         self.root.update()
-        if not fp: return None, None
+        if not fp: return None, None, None
         
+        decoration_stream = None
         try:
-            with open(fp, 'r', encoding='utf-8') as f:
-                file_data = json.load(f)
+            # Decoration set files are streamed; a structure file has no "decorations" key, so this reads all of it.
+            file_data, decoration_stream = self.open_decoration_set(fp)
 
             if "structure_id" in file_data:
                 print("Loading project from decorations file...")
@@ -205,9 +488,9 @@ class DataManager:
                     self.current_structure_path = None
                 
                 self.current_decoration_set_path = fp
-                return structure_data, decoration_set_data
+                return structure_data, decoration_set_data, decoration_stream
 
-            elif "tiles" in file_data and "dimensions" in file_data:
+            elif ("tiles" in file_data or "chunks" in file_data) and "dimensions" in file_data:
                 print("Loading project from structure file...")
                 structure_data = file_data
                 structure_id = structure_data.get('id', 'unknown')
@@ -222,8 +505,7 @@ class DataManager:
                     print(f"Found associated decorations file: {decorations_fp}")
 
                 if decorations_fp:
-                    with open(decorations_fp, 'r', encoding='utf-8') as f:
-                        decoration_set_data = json.load(f)
+                    decoration_set_data, decoration_stream = self.open_decoration_set(decorations_fp)
                     self.current_decoration_set_path = decorations_fp
                 else:
                     print("No associated decorations file found. Creating a new empty set.")
@@ -231,13 +513,15 @@ class DataManager:
                     self.current_decoration_set_path = None
                 
                 self.current_structure_path = fp
-                return structure_data, decoration_set_data
+                return structure_data, decoration_set_data, decoration_stream
             
             else:
+                if decoration_stream: decoration_stream.close()
                 messagebox.showerror("Invalid File", "The selected JSON file is not a valid structure or decoration set file.")
-                return None, None
+                return None, None, None
                 
         except Exception as e:
+            if decoration_stream: decoration_stream.close()
             messagebox.showerror("Load Error", f"An error occurred while loading the project: {e}")
             print(f"Error loading project file: {e}")
-            return None, None
\ No newline at end of file
+            return None, None, None
\ No newline at end of file
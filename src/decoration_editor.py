@@ -41,6 +41,8 @@ class DecorationEditor:
         self.room_objects_content_height = 0
         self.scrolling_with_objects_thumb = False
         self.selected_room_object_uid = None
+        self.marquee_start, self.marquee_end = None, None # Editor-local corners of the selection rectangle being dragged
+        self.marquee_selection = [] # Decorations selected with the rectangle; moved, rotated and deleted together
         self.walkable_group_open = True; self.non_walkable_group_open = True
         self.scroll_to_y_target = None; self.needs_to_scroll_to_selection = False
         self.walkable_only_view = False; self.walkable_only_toggle = None
@@ -101,7 +103,7 @@ class DecorationEditor:
              else: self.hover_grid_pos = None
 
     def handle_item_placement_events(self, event, mouse_pos, local_mouse_pos, keys):
-        alt_pressed = keys[pygame.K_LALT] or keys[pygame.K_RALT]
+        alt_pressed = keys[pygame.K_LALT] or keys[pygame.K_RALT]; shift_pressed = keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]
         if self.search_input.handle_event(event) is not None: self.perform_search(); self.search_input.active = False
         if self.search_button.is_clicked(event): self.perform_search(); self.search_input.active = False
         if self.walkable_only_toggle.handle_event(event): self.walkable_only_view = self.walkable_only_toggle.state
@@ -123,12 +125,16 @@ class DecorationEditor:
                 elif self.app.editor_rect.collidepoint(mouse_pos):
                     if alt_pressed: self.handle_editor_area_click(local_mouse_pos, alt_pressed=True)
                     elif self.selected_deco_item: self.place_decoration(self.ghost_pos)
-                    else: self.handle_editor_area_click(local_mouse_pos)
+                    elif shift_pressed: self.marquee_start = self.marquee_end = local_mouse_pos
+                    else: self.marquee_selection = []; self.handle_editor_area_click(local_mouse_pos)
             if event.button == 3 and self.app.editor_rect.collidepoint(mouse_pos):
                 grid_pos = screen_to_grid(local_mouse_pos[0], local_mouse_pos[1], self.app.camera.offset, self.app.camera.zoom)
                 self.delete_decoration_at(grid_pos)
-        if event.type == pygame.MOUSEBUTTONUP and event.button == 1: self.scrolling_with_catalog_thumb = False; self.scrolling_with_objects_thumb = False
+        if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.scrolling_with_catalog_thumb = False; self.scrolling_with_objects_thumb = False
+            if self.marquee_start: self.finish_marquee_selection()
         if event.type == pygame.MOUSEMOTION:
+            if self.marquee_start: self.marquee_end = local_mouse_pos
             if self.scrolling_with_catalog_thumb:
                 delta_y = mouse_pos[1] - self.scroll_start_y; track, thumb = self.catalog_scrollbar_track_rect, self.catalog_scrollbar_thumb_rect
                 scrollable_px = track.height - thumb.height; scrollable_content = self.catalog_content_height - (self.catalog_panel_rect.height - self.search_input.rect.bottom)
@@ -141,9 +147,13 @@ class DecorationEditor:
                 self.hover_grid_pos = screen_to_grid(local_mouse_pos[0], local_mouse_pos[1], self.app.camera.offset, self.app.camera.zoom)
                 if self.selected_deco_item: self.ghost_pos = self.hover_grid_pos
             else: self.hover_grid_pos = None
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_ESCAPE: self.selected_deco_item = None; self.selected_room_object_uid = None
-            elif event.key == pygame.K_r and self.selected_deco_item: self.rotate_ghost_to_next_valid()
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: self.selected_deco_item = None; self.selected_room_object_uid = None; self.marquee_selection = []
+        elif event.type == pygame.KEYDOWN and not event.mod & pygame.KMOD_CTRL and not self.app.is_text_input_active():
+            move_keys = {pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1), pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0)}
+            if event.key == pygame.K_r and self.selected_deco_item: self.rotate_ghost_to_next_valid()
+            elif event.key == pygame.K_r: self.rotate_selection()
+            elif event.key in (pygame.K_DELETE, pygame.K_BACKSPACE): self.delete_selection()
+            elif event.key in move_keys: self.move_selection(*move_keys[event.key])
 
     def place_decoration(self, grid_pos):
         if self.selected_deco_item and self.app.current_room:
@@ -154,6 +164,39 @@ class DecorationEditor:
     def delete_decoration_at(self, grid_pos):
         if self.app.current_room and self.selected_layer is not None:
             self.app.current_room.remove_decoration_at(grid_pos, self.selected_layer)
+
+    # --- Multi-selection ---
+    def finish_marquee_selection(self):
+        (x1, y1), (x2, y2) = self.marquee_start, self.marquee_end
+        self.marquee_start = self.marquee_end = None
+        if not self.app.current_room: return
+        camera = self.app.camera
+        world_rect = ((min(x1, x2) - camera.offset[0]) / camera.zoom, (min(y1, y2) - camera.offset[1]) / camera.zoom, abs(x2 - x1) / camera.zoom, abs(y2 - y1) / camera.zoom)
+        self.marquee_selection = self.app.current_room.get_decorations_in_rect(world_rect, self.selected_layer)
+        self.selected_room_object_uid = None
+        print(f"[LOG] Selected {len(self.marquee_selection)} decoration(s).")
+
+    def get_selected_decorations(self):
+        """The marquee selection, or else the single selected object. Decorations removed from the room since are dropped."""
+        room = self.app.current_room
+        if not room: return []
+        if self.selected_room_object_uid and not self.marquee_selection:
+            return [d for d in room.decorations if id(d) == self.selected_room_object_uid][:1]
+        self.marquee_selection = [d for d in self.marquee_selection if room.get_decoration_at(d["grid_pos"], d.get("layer", DEFAULT_LAYER)) is d]
+        return self.marquee_selection
+
+    def move_selection(self, dx, dy):
+        if decos := self.get_selected_decorations(): self.app.current_room.move_decorations(decos, dx, dy)
+
+    def rotate_selection(self):
+        if decos := self.get_selected_decorations():
+            rotations = [self.get_next_valid_rotation(d.get("base_id"), d.get("variant_id", "0"), d.get("rotation", 0)) for d in decos]
+            self.app.current_room.rotate_decorations(decos, rotations)
+
+    def delete_selection(self):
+        if decos := self.get_selected_decorations():
+            self.app.current_room.remove_decorations(decos)
+            self.marquee_selection = []; self.selected_room_object_uid = None
     
     # UNCHANGED METHODS
     def find_item_in_catalog(self, base_id, variant_id):
@@ -163,41 +206,40 @@ class DecorationEditor:
         return None
     def handle_editor_area_click(self, local_mouse_pos, alt_pressed=False):
         if not self.app.current_room: return False
-        decos_to_search = self.app.current_room.get_decorations_sorted_for_render()
+        # Only the decorations the spatial index has under the cursor are tested, front to back.
+        camera = self.app.camera
+        world_pos = ((local_mouse_pos[0] - camera.offset[0]) / camera.zoom, (local_mouse_pos[1] - camera.offset[1]) / camera.zoom)
+        decos_to_search = self.app.current_room.decoration_index.query_point(world_pos)
         if not alt_pressed:
             decos_to_search = [d for d in decos_to_search if d.get('layer', DEFAULT_LAYER) == self.selected_layer]
-        decos_to_search.reverse()
+        decos_to_search.sort(key=self.app.current_room.render_sort_key, reverse=True)
         for deco in decos_to_search:
-            render_details = self.app.renderer.get_decoration_render_details(deco, self.app.camera.offset, self.app.camera.zoom)
-            if render_details and render_details[0]:
-                image, pos = render_details
-                if pygame.Rect(pos, image.get_size()).collidepoint(local_mouse_pos):
-                    try:
-                        mask = pygame.mask.from_surface(image)
-                        if mask.get_at((local_mouse_pos[0] - pos[0], local_mouse_pos[1] - pos[1])):
-                            if alt_pressed:
-                                catalog_item = self.find_item_in_catalog(deco.get('base_id'), deco.get('variant_id', '0'))
-                                if catalog_item:
-                                    self.selected_deco_item = catalog_item
-                                    self.ghost_rotation = deco.get('rotation', 0)
-                                    self.selected_room_object_uid = None
-                                    print(f"Cloned item '{catalog_item['name']}'")
-                                else:
-                                    print(f"[WARN] Could not find item {deco.get('base_id')} in catalog to clone.")
-                            else:
-                                clicked_uid = id(deco)
-                                if self.selected_room_object_uid == clicked_uid: self.selected_room_object_uid = None
-                                else:
-                                    self.selected_room_object_uid = clicked_uid
-                                    self._ensure_selected_object_group_is_open()
-                                    self.needs_to_scroll_to_selection = True
-                            return True
-                    except IndexError: continue
+            if self.app.renderer.decoration_hit_test(deco, local_mouse_pos, camera.offset, camera.zoom):
+                if alt_pressed:
+                    catalog_item = self.find_item_in_catalog(deco.get('base_id'), deco.get('variant_id', '0'))
+                    if catalog_item:
+                        self.selected_deco_item = catalog_item
+                        self.ghost_rotation = deco.get('rotation', 0)
+                        self.selected_room_object_uid = None
+                        print(f"Cloned item '{catalog_item['name']}'")
+                    else:
+                        print(f"[WARN] Could not find item {deco.get('base_id')} in catalog to clone.")
+                else:
+                    clicked_uid = id(deco)
+                    if self.selected_room_object_uid == clicked_uid: self.selected_room_object_uid = None
+                    else:
+                        self.selected_room_object_uid = clicked_uid
+                        self._ensure_selected_object_group_is_open()
+                        self.needs_to_scroll_to_selection = True
+                return True
         return False
     def get_info_lines(self):
         if self.current_step == self.STEP_LAYER_SELECT: return ["[Hover] Preview Layer", "[Click] Select Layer"]
         else:
-            lines = ["[Alt+Click] Clone Item", "[R Click] Delete", "[R] Rotate Ghost", "[Esc] Deselect All"]
+            lines = ["[Alt+Click] Clone Item", "[R Click] Delete", "[R] Rotate Ghost", "[Esc] Deselect All", "[Shift+Drag] Select Area", "[Arrows/R/Del] Move/Rotate/Delete Selection"]
+            if self.selected_deco_item:
+                num_rotations = len(self.app.data_manager.get_valid_rotations(self.selected_deco_item.get("base_id"), self.selected_deco_item.get("variant_id", "0")))
+                lines[2] = f"[R] Rotate Ghost ({num_rotations} views)"
             if self.selected_deco_item: lines.insert(0, "[L Click] Place Item")
             else: lines.insert(0, "[L Click] Select Item")
             return lines
@@ -210,9 +252,16 @@ class DecorationEditor:
         elif not is_walkable and not self.non_walkable_group_open: self.non_walkable_group_open = True
     def rotate_ghost_to_next_valid(self):
         base_id, variant_id = self.selected_deco_item.get("base_id"), self.selected_deco_item.get("variant_id", "0")
+        self.ghost_rotation = self.get_next_valid_rotation(base_id, variant_id, self.ghost_rotation)
+    def get_next_valid_rotation(self, base_id, variant_id, rotation):
+        valid_rotations = self.app.data_manager.get_valid_rotations(base_id, variant_id)
         for i in range(1, 5):
-            next_rotation_idx = (self.ghost_rotation + i) % 4
-            if self.app.renderer.get_rendered_image_and_offset(base_id, variant_id, next_rotation_idx)[0]: self.ghost_rotation = next_rotation_idx; return
+            next_rotation_idx = (rotation + i) % 4
+            if next_rotation_idx in valid_rotations: return next_rotation_idx
+        return rotation
+    def get_first_valid_rotation(self, item):
+        valid_rotations = self.app.data_manager.get_valid_rotations(item.get("base_id"), item.get("variant_id", "0"))
+        return min(valid_rotations) if valid_rotations else 0
     def perform_search(self): self.active_search_term = self.search_input.text.lower().strip(); self.catalog_scroll_y = 0
     def clamp_catalog_scroll(self):
         content_visible_h = self.catalog_panel_rect.height - (self.search_input.rect.height if self.search_input else 0) - 20
@@ -228,7 +277,7 @@ class DecorationEditor:
                 if elem_type == 'main_cat':
                     if elem_id in self.open_main_cat_indices: self.open_main_cat_indices.remove(elem_id)
                     else: self.open_main_cat_indices.add(elem_id)
-                elif elem_type == 'item': self.selected_deco_item = elem_id; self.ghost_rotation = 0
+                elif elem_type == 'item': self.selected_deco_item = elem_id; self.ghost_rotation = self.get_first_valid_rotation(elem_id)
                 return
     def handle_room_objects_click(self, mouse_pos):
         local_x, local_y = mouse_pos[0] - self.room_objects_panel_rect.x, mouse_pos[1] - (self.room_objects_panel_rect.y + 30) + self.room_objects_scroll_y
@@ -249,11 +298,10 @@ class DecorationEditor:
         if self.current_step == self.STEP_LAYER_SELECT and self.hovered_layer is not None and self.app.current_room:
             overlay_surf = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
             color = LAYER_DATA[self.hovered_layer]['color']
-            for pos, layer_id in self.app.current_room.layer_map.items():
-                if layer_id == self.hovered_layer:
-                    screen_pos = grid_to_screen(pos[0], pos[1], self.app.camera.offset, self.app.camera.zoom)
-                    p = self.app.renderer._get_tile_points(screen_pos, self.app.camera.zoom)
-                    pygame.draw.polygon(overlay_surf, color, [p['top'], p['right'], p['bottom'], p['left']])
+            for pos in self.app.current_room.get_layer_tiles(self.hovered_layer):
+                screen_pos = grid_to_screen(pos[0], pos[1], self.app.camera.offset, self.app.camera.zoom)
+                p = self.app.renderer._get_tile_points(screen_pos, self.app.camera.zoom)
+                pygame.draw.polygon(overlay_surf, color, [p['top'], p['right'], p['bottom'], p['left']])
             surface.blit(overlay_surf, (0,0))
         if self.hover_grid_pos:
             p = self.app.renderer._get_tile_points(grid_to_screen(*self.hover_grid_pos, self.app.camera.offset, self.app.camera.zoom), self.app.camera.zoom)
@@ -264,21 +312,20 @@ class DecorationEditor:
                 if pos := selected_deco.get("grid_pos"):
                     p = self.app.renderer._get_tile_points(grid_to_screen(*pos, self.app.camera.offset, self.app.camera.zoom), self.app.camera.zoom)
                     pygame.draw.polygon(surface, COLOR_ANCHOR, [p['top'], p['right'], p['bottom'], p['left']], 2)
-                render_details = self.app.renderer.get_decoration_render_details(selected_deco, self.app.camera.offset, self.app.camera.zoom)
-                if render_details and render_details[0]: self.draw_sprite_outline(surface, render_details[0], render_details[1], COLOR_ANCHOR, 2)
+                self.draw_decoration_outline(surface, selected_deco, COLOR_ANCHOR, 2)
+        if self.marquee_selection:
+            for deco in self.get_selected_decorations(): self.draw_decoration_outline(surface, deco, COLOR_ANCHOR, 2)
+        if self.marquee_start and self.marquee_end:
+            (x1, y1), (x2, y2) = self.marquee_start, self.marquee_end
+            pygame.draw.rect(surface, COLOR_HOVER_BORDER, (min(x1, x2), min(y1, y2), abs(x2 - x1), abs(y2 - y1)), 1)
         if self.selected_deco_item and self.app.current_room and self.hover_grid_pos:
             ghost_data = {"base_id": self.selected_deco_item.get("base_id"), "variant_id": self.selected_deco_item.get("variant_id", "0"), "grid_pos": self.ghost_pos, "rotation": self.ghost_rotation}
-            is_occupied = False
-            if self.app.current_room.occupied_layer_tiles.get(tuple(self.ghost_pos)):
-                if self.selected_layer in self.app.current_room.occupied_layer_tiles[tuple(self.ghost_pos)]:
-                    is_occupied = True
+            is_occupied = not self.app.current_room.is_footprint_free(ghost_data["base_id"], self.ghost_pos, self.ghost_rotation, self.selected_layer)
             self.app.renderer._draw_decoration(surface, ghost_data, self.app.camera.offset, self.app.camera.zoom, is_ghost=True, is_occupied=is_occupied)
-    def draw_sprite_outline(self, surface, image, pos, color, thickness):
-        mask = pygame.mask.from_surface(image)
-        outline_points = mask.outline()
-        if len(outline_points) > 1:
-            offset_points = [(p[0] + pos[0], p[1] + pos[1]) for p in outline_points]
-            pygame.draw.lines(surface, color, True, offset_points, thickness)
+    def draw_decoration_outline(self, surface, deco, color, thickness):
+        # The outline is cached per sprite and zoom by the renderer, so it is only translated here.
+        outline_points = self.app.renderer.get_decoration_outline(deco, self.app.camera.offset, self.app.camera.zoom)
+        if len(outline_points) > 1: pygame.draw.lines(surface, color, True, outline_points, thickness)
     def draw_ui_on_panel(self, screen):
         pygame.draw.rect(screen, COLOR_PANEL_BG, self.panel_rect)
         self.draw_stepper_bar(screen)
@@ -308,6 +355,7 @@ class DecorationEditor:
         content_y = self.panel_rect.y + 35 + 15
         screen.blit(title_surf, (self.panel_rect.x + 15, content_y)); content_y += 30
         self.layer_list_buttons.clear()
+        layer_counts = self.app.current_room.get_layer_counts() if self.app.current_room else {}
         for layer_id, data in sorted(LAYER_DATA.items()):
             rect = pygame.Rect(self.panel_rect.x + 15, content_y, self.panel_rect.width - 30, 35)
             self.layer_list_buttons[layer_id] = rect
@@ -315,6 +363,8 @@ class DecorationEditor:
             pygame.draw.rect(screen, COLOR_BUTTON_HOVER if is_hovered else COLOR_BUTTON, rect, border_radius=5)
             text_surf = self.font_ui.render(data['name'], True, COLOR_TEXT)
             screen.blit(text_surf, (rect.x + 10, rect.centery - text_surf.get_height()//2))
+            count_surf = self.font_desc.render(f"{layer_counts.get(layer_id, 0)} tiles", True, COLOR_INFO_TEXT)
+            screen.blit(count_surf, (rect.right - 10 - count_surf.get_width(), rect.centery - count_surf.get_height()//2))
             content_y += rect.height + 8
     def draw_catalog_section(self, screen):
         self.draw_catalog_content()
@@ -353,6 +403,8 @@ class DecorationEditor:
         all_decos = self.app.current_room.get_decorations_sorted_for_render()
         filtered_decos = [d for d in all_decos if d.get('layer', DEFAULT_LAYER) == self.selected_layer]
         filtered_decos.reverse()
+        marquee_ids = {id(d) for d in self.marquee_selection}
+        walkability = self.app.current_room.walkability
         walkable_decos, non_walkable_decos = [], []
         for deco in filtered_decos:
             if self.app.current_room.walkable_map.get(tuple(deco.get("grid_pos", ())), 0) == 1: walkable_decos.append(deco)
@@ -371,10 +423,12 @@ class DecorationEditor:
                 for deco in decos:
                     item_name = "Unknown"; data = self.app.data_manager.get_furni_data(deco.get("base_id"))
                     if data: item_name = data.get("name", deco.get("base_id"))
+                    if walkability.is_decoration_unreachable(deco): item_name += " (unreachable)"
                     rect = pygame.Rect(margin + 10, y_pos, content_w - 10, line_h)
                     if self.selected_room_object_uid == id(deco):
                         pygame.draw.rect(self.room_objects_content_surface, COLOR_BUTTON_ACTIVE, rect, border_radius=3)
                         self.scroll_to_y_target = rect.centery
+                    elif id(deco) in marquee_ids: pygame.draw.rect(self.room_objects_content_surface, COLOR_BUTTON_ACTIVE, rect, border_radius=3)
                     self.clickable_room_objects.append({'rect': rect, 'type': 'item', 'uid': id(deco)})
                     text_surf = self.font_desc.render(item_name, True, COLOR_TEXT); self.room_objects_content_surface.blit(text_surf, (rect.x+5, rect.centery-text_surf.get_height()//2)); y_pos += line_h
         draw_group("Walkable Area", walkable_decos, self.walkable_group_open)
@@ -410,10 +464,8 @@ class DecorationEditor:
         for k, item in enumerate(items):
             item_rect = pygame.Rect(start_x + (k % cols) * (icon_size + padding), start_y + (k // cols) * (icon_size + text_h + padding), icon_size, icon_size)
             self.clickable_elements.append({'rect': pygame.Rect(item_rect.x, item_rect.y, icon_size, icon_size + text_h), 'type': 'item', 'id': item})
-            if img := self.app.data_manager.get_image(item['base_id'], item['icon_path']):
+            if final_img := self.app.renderer.get_catalog_icon(item['base_id'], item['icon_path'], icon_size - 8):
                 pygame.draw.rect(self.catalog_content_surface, COLOR_EDITOR_BG, item_rect, border_radius=5)
-                max_s = icon_size - 8; w,h = img.get_size(); final_img = img
-                if w > max_s or h > max_s: final_img = pygame.transform.smoothscale(img, (int(w*min(max_s/w,max_s/h)), int(h*min(max_s/w,max_s/h))))
                 self.catalog_content_surface.blit(final_img, final_img.get_rect(center=item_rect.center))
             is_sel = self.selected_deco_item and self.selected_deco_item['id'] == item['id']
             pygame.draw.rect(self.catalog_content_surface, COLOR_HOVER_BORDER if is_sel else COLOR_BORDER, item_rect, 2 if is_sel else 1, border_radius=5)
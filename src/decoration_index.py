@@ -0,0 +1,63 @@
+# src/decoration_index.py
+
+class DecorationSpatialIndex:
+    """
+    Uniform grid over world space (zoom 1.0 pixels) that maps each cell to the decorations whose
+    sprite bounds overlap it, so picking only looks at the few sprites under the cursor.
+    Bounds come from a provider function (deco -> (x, y, w, h)) set by the editor, since
+    only the renderer knows sprite sizes.
+    """
+    CELL_SIZE = 128
+    PADDING = 4 # World pixels added around each sprite: scaled sprites are rounded to whole pixels at every zoom
+
+    def __init__(self, bounds_provider=None):
+        self.bounds_provider = bounds_provider
+        self.cells = {} # Key: (cx, cy), Value: set of id(deco)
+        self.entries = {} # Key: id(deco), Value: (deco, (x, y, w, h), list of cells)
+
+    def _cells_for(self, rect):
+        x, y, w, h = rect; p = self.PADDING; size = self.CELL_SIZE
+        return [(cx, cy) for cy in range(int((y - p) // size), int((y + h + p) // size) + 1) for cx in range(int((x - p) // size), int((x + w + p) // size) + 1)]
+
+    def insert(self, deco):
+        if self.bounds_provider is None: return
+        rect = self.bounds_provider(deco)
+        if rect is None: return
+        cells = self._cells_for(rect)
+        for cell in cells: self.cells.setdefault(cell, set()).add(id(deco))
+        self.entries[id(deco)] = (deco, rect, cells)
+
+    def remove(self, deco):
+        entry = self.entries.pop(id(deco), None)
+        if entry is None: return
+        for cell in entry[2]:
+            bucket = self.cells.get(cell)
+            if bucket is None: continue
+            bucket.discard(id(deco))
+            if not bucket: del self.cells[cell]
+
+    def rebuild(self, decorations):
+        self.cells.clear(); self.entries.clear()
+        for deco in decorations: self.insert(deco)
+
+    def query_rect(self, world_rect):
+        """Returns the decorations whose sprite bounds intersect a world rectangle (x, y, w, h), in no particular order."""
+        rx, ry, rw, rh = world_rect; size = self.CELL_SIZE
+        hits = {}
+        for cy in range(int(ry // size), int((ry + rh) // size) + 1):
+            for cx in range(int(rx // size), int((rx + rw) // size) + 1):
+                for deco_id in self.cells.get((cx, cy), ()):
+                    if deco_id in hits: continue
+                    deco, (x, y, w, h), _ = self.entries[deco_id]
+                    if x < rx + rw and rx < x + w and y < ry + rh and ry < y + h: hits[deco_id] = deco
+        return list(hits.values())
+
+    def query_point(self, world_pos):
+        """Returns the decorations whose (padded) sprite bounds contain a world position, in no particular order."""
+        wx, wy = world_pos; p = self.PADDING
+        bucket = self.cells.get((int(wx // self.CELL_SIZE), int(wy // self.CELL_SIZE)), ())
+        hits = []
+        for deco_id in bucket:
+            deco, (x, y, w, h), _ = self.entries[deco_id]
+            if x - p <= wx < x + w + p and y - p <= wy < y + h + p: hits.append(deco)
+        return hits
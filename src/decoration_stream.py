@@ -0,0 +1,106 @@
+# src/decoration_stream.py
+import os
+import json
+
+class DecorationSetReader:
+    """
+    Incremental reader for decoration set files (decorations.json). The keys of the set are decoded
+    as they come, and the "decorations" array one record at a time, so a huge set is never held in
+    memory as a whole text or parsed in one go. The file stays plain JSON, as json.dump writes it.
+    Usage: read_header() for the keys before the array, then iter_batches() for the decorations;
+    keys that come after the array are added to 'header' once the batches run out.
+    """
+    BLOCK_SIZE = 1 << 16 # Characters read from the file at a time
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.file = open(filepath, 'r', encoding='utf-8')
+        self.file_size = max(1, os.path.getsize(filepath))
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""; self.pos = 0; self.eof = False
+        self.chars_read = 0
+        self.header = {} # Every key of the set except "decorations"
+        self.has_decorations = False # The object has a "decorations" array
+        self.in_decorations = False # True while positioned inside the "decorations" array
+        self.num_read = 0 # Decorations returned so far
+        self.done = False
+
+    # --- Buffer ---
+    def _fill(self):
+        """Reads the next block, dropping the text already consumed. Returns False at the end of the file."""
+        if self.eof: return False
+        block = self.file.read(self.BLOCK_SIZE)
+        if not block: self.eof = True; return False
+        self.chars_read += len(block)
+        self.buffer = self.buffer[self.pos:] + block; self.pos = 0
+        return True
+
+    def _peek(self):
+        """Skips whitespace and returns the next character, or '' at the end of the file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n": self.pos += 1
+            if self.pos < len(self.buffer): return self.buffer[self.pos]
+            if not self._fill(): return ""
+
+    def _expect(self, chars):
+        char = self._peek()
+        if not char or char not in chars: raise ValueError(f"Invalid decoration set file '{self.filepath}': expected {' or '.join(repr(c) for c in chars)} near character {self.chars_read - len(self.buffer) + self.pos}.")
+        self.pos += 1
+        return char
+
+    def _decode_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A value that runs to the end of the buffer (e.g. a number) may continue in the next block.
+                if end < len(self.buffer) or self.eof: self.pos = end; return value
+            except json.JSONDecodeError as e:
+                if self.eof: raise ValueError(f"Invalid decoration set file '{self.filepath}': {e}") from e
+            self._fill()
+
+    # --- Reading ---
+    def read_header(self):
+        """Reads the set's keys up to the start of the "decorations" array (or the whole object if it has none)."""
+        self._expect("{")
+        if self._peek() == "}": self.pos += 1; self.done = True; return self.header
+        self._read_members()
+        return self.header
+
+    def _read_members(self):
+        """Reads key/value pairs until the object ends or the "decorations" array starts."""
+        while True:
+            key = self._decode_value(); self._expect(":")
+            if key == "decorations" and self._peek() == "[":
+                self.pos += 1; self.has_decorations = self.in_decorations = True
+                if self._peek() == "]": self.pos += 1; self._end_decorations()
+                return
+            self.header[key] = self._decode_value()
+            if self._expect(",}") == "}": self.done = True; return
+
+    def _end_decorations(self):
+        self.in_decorations = False
+        if self._expect(",}") == "}": self.done = True
+        else: self._read_members()
+
+    def iter_batches(self, batch_size=500):
+        """Yields lists of up to batch_size decorations in file order. Raises ValueError if the file is damaged."""
+        while self.in_decorations:
+            batch = []
+            while self.in_decorations and len(batch) < batch_size:
+                batch.append(self._decode_value())
+                if self._expect(",]") == "]": self._end_decorations()
+            self.num_read += len(batch)
+            yield batch
+
+    def read_all(self):
+        """The rest of the file; with read_header first, the whole object as json.load would return it."""
+        decorations = [deco for batch in self.iter_batches() for deco in batch]
+        return dict(self.header, decorations=decorations) if self.has_decorations else dict(self.header)
+
+    def get_progress(self):
+        """Fraction of the file read so far (by characters against the size in bytes, so roughly)."""
+        return min(1.0, self.chars_read / self.file_size)
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,88 @@
+# src/edit_journal.py
+import os
+import json
+
+class EditJournal:
+    """
+    Append-only, crash-safe record of the edits made to a room.
+    The file holds one JSON object per line: the first is a snapshot of the room (structure
+    and decoration set), every following line is one operation emitted by a Room mutation.
+    Recording an edit only appends a short line, so autosaving costs O(edit); the journal
+    is rewritten as a fresh snapshot (compacted) once it holds too many operations.
+    """
+    SNAPSHOT_OP = "snapshot"
+
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.file = None
+        self.num_ops = 0 # Operations appended since the last snapshot
+        self.pending_sync = False
+
+    @staticmethod
+    def read(journal_path):
+        """
+        Reads a journal. Returns (snapshot, ops), or (None, []) if there is no usable journal.
+        A last line cut short by a crash is ignored.
+        """
+        if not os.path.exists(journal_path): return None, []
+        snapshot, ops = None, []
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try: entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"[WARN] Ignoring a damaged entry at the end of the edit journal '{journal_path}'.")
+                        break
+                    if snapshot is None:
+                        if entry.get("op") != EditJournal.SNAPSHOT_OP: return None, []
+                        snapshot = entry
+                    else: ops.append(entry)
+        except OSError as e:
+            print(f"Error reading edit journal '{journal_path}': {e}")
+            return None, []
+        return snapshot, ops
+
+    @staticmethod
+    def has_unsaved_edits(journal_path):
+        snapshot, ops = EditJournal.read(journal_path)
+        return snapshot is not None and (bool(ops) or snapshot.get("unsaved", False))
+
+    def start(self, structure_data, decoration_set_data, unsaved=False):
+        """
+        Begins the journal with a snapshot of the room, replacing any previous content.
+        'unsaved' records that the snapshot itself holds edits that are not in the project files.
+        """
+        self.close()
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        snapshot = {"op": self.SNAPSHOT_OP, "unsaved": unsaved, "structure": structure_data, "decorations": decoration_set_data}
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot, separators=(',', ':')) + "\n")
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self.file = open(self.journal_path, 'a', encoding='utf-8')
+        self.num_ops = 0
+        self.pending_sync = False
+
+    def append(self, op):
+        """Records one operation. It reaches the disk on the next sync()."""
+        if self.file is None: return
+        self.file.write(json.dumps(op, separators=(',', ':')) + "\n")
+        self.num_ops += 1
+        self.pending_sync = True
+
+    def sync(self):
+        """Flushes the appended operations to disk. Cheap when nothing was recorded since the last call."""
+        if self.file is None or not self.pending_sync: return
+        self.file.flush(); os.fsync(self.file.fileno())
+        self.pending_sync = False
+
+    def close(self):
+        if self.file is None: return
+        self.sync(); self.file.close()
+        self.file = None
+
+    def discard(self):
+        """Closes and deletes the journal, e.g. when the room has no unsaved edits left."""
+        self.close()
+        if os.path.exists(self.journal_path): os.remove(self.journal_path)
@@ -3,10 +3,111 @@ import pygame
 import os
 from common.constants import *
 from common.utils import grid_to_screen, screen_to_grid
+from sprite_atlas import SpriteAtlas
 
 class RoomRenderer:
     def __init__(self, data_manager):
         self.data_manager = data_manager
+        self.atlases = {} # Key: zoom level, Value: SpriteAtlas with the furni sprites pre-scaled to that zoom
+        self.icon_atlas = SpriteAtlas() # Catalog icons, pre-fitted to the catalog's icon box
+        self.missing_sprites = set() # Sprite keys that have no image, so they are not looked up every frame
+        self.sprite_masks = {} # Key: (sprite key, zoom), Value: pygame.Mask of the scaled sprite, for hit-testing
+        self.sprite_outlines = {} # Key: (sprite key, zoom), Value: outline points of that mask, relative to the sprite
+
+    def clear_atlases(self):
+        """Drops all packed sprites, e.g. when another room is loaded."""
+        self.atlases.clear(); self.missing_sprites.clear(); self.sprite_masks.clear(); self.sprite_outlines.clear()
+
+    def build_room_atlas(self, room, zoom=1.0):
+        """Packs the sprites of every furni used in the room into the atlas for the given zoom."""
+        if not room: return
+        keys = {(d.get("base_id"), str(d.get("variant_id", "0")), str(d.get("rotation", 0))) for d in room.decorations}
+        atlas = self.atlases.get(zoom)
+        if atlas is None: atlas = self.atlases[zoom] = SpriteAtlas()
+        sprites = []
+        for key in keys:
+            if key in atlas or key in self.missing_sprites: continue
+            render_path, offset = self.get_render_path_and_offset(*key)
+            scaled_image = self.data_manager.get_scaled_image(key[0], render_path, zoom) if render_path else None
+            if not scaled_image: self.missing_sprites.add(key); continue
+            sprites.append((scaled_image.get_height(), key, scaled_image, (offset[0] * zoom, offset[1] * zoom)))
+        # Packing the tallest sprites first gives much better shelf usage.
+        for _, key, scaled_image, scaled_offset in sorted(sprites, key=lambda s: s[0], reverse=True):
+            atlas.add(key, scaled_image, scaled_offset)
+            self.sprite_masks[(key, zoom)] = pygame.mask.from_surface(scaled_image)
+        self.data_manager.sprite_cache.save_index()
+
+    def get_atlas_sprite(self, base_id, variant_id, rotation, zoom=1.0):
+        """Returns (atlas_page, rect, scaled_offset) for a furni render, packing it on first use."""
+        key = (base_id, str(variant_id), str(rotation))
+        if key in self.missing_sprites: return None, None, None
+        atlas = self.atlases.get(zoom)
+        if atlas is None: atlas = self.atlases[zoom] = SpriteAtlas()
+        if key not in atlas:
+            render_path, offset = self.get_render_path_and_offset(base_id, variant_id, rotation)
+            if not render_path: self.missing_sprites.add(key); return None, None, None
+            scaled_image = self.data_manager.get_scaled_image(base_id, render_path, zoom)
+            if not scaled_image: self.missing_sprites.add(key); return None, None, None
+            atlas.add(key, scaled_image, (offset[0] * zoom, offset[1] * zoom))
+        return atlas.get(key)
+
+    def get_sprite_mask(self, base_id, variant_id, rotation, zoom=1.0):
+        """Returns the cached pixel mask of a scaled furni sprite (built when the sprite is packed), or None."""
+        key = (base_id, str(variant_id), str(rotation))
+        mask = self.sprite_masks.get((key, zoom))
+        if mask is None:
+            page, rect, _ = self.get_atlas_sprite(base_id, variant_id, rotation, zoom)
+            if not page: return None
+            mask = self.sprite_masks[(key, zoom)] = pygame.mask.from_surface(page.subsurface(rect))
+        return mask
+
+    def get_sprite_outline(self, base_id, variant_id, rotation, zoom=1.0):
+        """Returns the cached outline polyline of a scaled furni sprite, relative to its top-left corner."""
+        cache_key = ((base_id, str(variant_id), str(rotation)), zoom)
+        outline = self.sprite_outlines.get(cache_key)
+        if outline is None:
+            mask = self.get_sprite_mask(base_id, variant_id, rotation, zoom)
+            if mask is None: return []
+            outline = self.sprite_outlines[cache_key] = mask.outline()
+        return outline
+
+    def get_decoration_outline(self, deco_data, camera_offset, zoom=1.0):
+        """Returns the outline of a decoration's sprite in screen coordinates; only a translation per call."""
+        page, _, draw_pos = self.get_decoration_atlas_details(deco_data, camera_offset, zoom)
+        if not page: return []
+        outline = self.get_sprite_outline(deco_data.get("base_id"), deco_data.get("variant_id", "0"), deco_data.get("rotation", 0), zoom)
+        draw_x, draw_y = draw_pos
+        return [(x + draw_x, y + draw_y) for x, y in outline]
+
+    def get_decoration_world_rect(self, deco_data):
+        """World-space (zoom 1.0) bounds of a decoration's sprite as (x, y, w, h), for the room's spatial index."""
+        page, rect, draw_pos = self.get_decoration_atlas_details(deco_data, (0, 0), 1.0)
+        if page: return (draw_pos[0], draw_pos[1], rect.w, rect.h)
+        if not deco_data.get("grid_pos"): return None
+        screen_pos = grid_to_screen(deco_data["grid_pos"][0], deco_data["grid_pos"][1], (0, 0), 1.0)
+        return (screen_pos[0], screen_pos[1], TILE_WIDTH, TILE_HEIGHT)
+
+    def decoration_hit_test(self, deco_data, screen_pos, camera_offset, zoom=1.0):
+        """True if screen_pos is on a non-transparent pixel of the decoration's sprite."""
+        page, rect, draw_pos = self.get_decoration_atlas_details(deco_data, camera_offset, zoom)
+        if not page: return False
+        local_x, local_y = int(screen_pos[0] - draw_pos[0]), int(screen_pos[1] - draw_pos[1])
+        if not (0 <= local_x < rect.w and 0 <= local_y < rect.h): return False
+        mask = self.get_sprite_mask(deco_data.get("base_id"), deco_data.get("variant_id", "0"), deco_data.get("rotation", 0), zoom)
+        return bool(mask and mask.get_at((local_x, local_y)))
+
+    def get_catalog_icon(self, base_id, icon_path, max_size):
+        """Returns a catalog icon fitted into a max_size box, served from the icon atlas."""
+        key = (base_id, icon_path, max_size)
+        if key not in self.icon_atlas:
+            img = self.data_manager.get_image(base_id, icon_path)
+            if not img: return None
+            w, h = img.get_size()
+            if w > max_size or h > max_size:
+                scale = min(max_size / w, max_size / h)
+                img = pygame.transform.smoothscale(img, (max(1, int(w * scale)), max(1, int(h * scale))))
+            self.icon_atlas.add(key, img)
+        return self.icon_atlas.get_subsurface(key)
 
     def draw_room_on_surface(self, surface, room, camera_offset, zoom=1.0, is_editor_view=True, 
                              draw_walkable_overlay=False, draw_layer_overlay=False, draw_decorations=True, 
@@ -27,17 +128,11 @@ class RoomRenderer:
                 tiles_to_draw = room.tiles.keys()
             # Other layers only show tiles assigned to them.
             else:
-                for pos, layer_id in room.layer_map.items():
-                    if layer_id == filter_by_layer and pos in room.tiles:
-                        tiles_to_draw.append(pos)
+                tiles_to_draw = [pos for pos in room.get_layer_tiles(filter_by_layer) if pos in room.tiles]
         else:
             tiles_to_draw = room.tiles.keys()
         
-        sorted_tiles = sorted(tiles_to_draw, key=lambda k: (k[1] + k[0], k[1] - k[0]))
-
-        for gx, gy in sorted_tiles:
-            screen_pos = grid_to_screen(gx, gy, camera_offset, zoom)
-            self._draw_tile_shape(surface, screen_pos, room.tiles[(gx, gy)], COLOR_TILE, COLOR_TILE_BORDER, zoom)
+        self._draw_tiles(surface, room, tiles_to_draw, camera_offset, zoom)
 
         if is_editor_view and (draw_walkable_overlay or draw_layer_overlay):
             overlay_surface = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
@@ -48,20 +143,21 @@ class RoomRenderer:
                     points = self._get_tile_points_from_type(screen_pos, tile_type, zoom)
                     if points: pygame.draw.polygon(overlay_surface, LAYER_DATA[layer_id]['color'], points)
             elif draw_walkable_overlay:
+                unreachable = room.walkability.get_unreachable_tiles()
                 for (gx, gy), tile_type in room.tiles.items():
                     screen_pos = grid_to_screen(gx, gy, camera_offset, zoom)
                     points = self._get_tile_points_from_type(screen_pos, tile_type, zoom)
                     if points:
-                        color = COLOR_WALKABLE_OVERLAY if room.walkable_map.get((gx, gy), 0) else COLOR_NON_WALKABLE_OVERLAY
+                        if (gx, gy) in unreachable: color = COLOR_UNREACHABLE_OVERLAY
+                        else: color = COLOR_WALKABLE_OVERLAY if room.walkable_map.get((gx, gy), 0) else COLOR_NON_WALKABLE_OVERLAY
                         pygame.draw.polygon(overlay_surface, color, points)
             surface.blit(overlay_surface, (0, 0))
+            if draw_walkable_overlay and room.door_pos:
+                p = self._get_tile_points(grid_to_screen(*room.door_pos, camera_offset, zoom), zoom)
+                pygame.draw.polygon(surface, COLOR_DOOR, [p['top'], p['right'], p['bottom'], p['left']], 3)
 
         if filter_by_layer is None or filter_by_layer == LAYER_WALL:
-            for gx, gy in sorted(room.tiles.keys(), key=lambda k: (k[1] + k[0], k[1] - k[0])):
-                for pos, edge in room.walls:
-                    if pos == (gx, gy):
-                        screen_pos = grid_to_screen(gx, gy, camera_offset, zoom)
-                        self._draw_wall(surface, screen_pos, edge, zoom)
+            self._draw_walls(surface, room, camera_offset, zoom)
         
         if draw_decorations:
             for deco in room.get_decorations_sorted_for_render():
@@ -84,6 +180,52 @@ class RoomRenderer:
             preview_bounds_rect = pygame.Rect(anchor_pos[0] - scaled_pw / 2, anchor_pos[1] - scaled_ph / 2, scaled_pw, scaled_ph)
             pygame.draw.rect(surface, COLOR_PREVIEW_OUTLINE, preview_bounds_rect, 1)
 
+    def _draw_tiles(self, surface, room, positions, camera_offset, zoom=1.0):
+        for gx, gy in sorted(positions, key=lambda k: (k[1] + k[0], k[1] - k[0])):
+            screen_pos = grid_to_screen(gx, gy, camera_offset, zoom)
+            self._draw_tile_shape(surface, screen_pos, room.tiles[(gx, gy)], COLOR_TILE, COLOR_TILE_BORDER, zoom)
+
+    def _draw_walls(self, surface, room, camera_offset, zoom=1.0):
+        for (gx, gy), edge in sorted((wall for wall in room.walls if wall[0] in room.tiles), key=lambda w: (w[0][1] + w[0][0], w[0][1] - w[0][0])):
+            self._draw_wall(surface, grid_to_screen(gx, gy, camera_offset, zoom), edge, zoom)
+
+    def bake_static_scene(self, room, bake_decorations=True):
+        """
+        Renders what never moves at runtime (tiles, walls and, with bake_decorations, the decorations up to
+        BAKED_DECORATION_MAX_LAYER) onto one transparent surface at zoom 1.0, and lists the remaining decorations
+        with their sprite and draw position. Positions are relative to the renderAnchor, so a game draws the room
+        as one blit of the background plus one blit per draw list entry, in list order.
+        Returns (surface or None if there is nothing to bake, draw list dict).
+        """
+        anchor = room.structure_data.get("renderAnchor", {}); anchor_x, anchor_y = anchor.get("x", 0), anchor.get("y", 0)
+        baked, sprites, missing = [], [], 0
+        for deco in room.get_decorations_sorted_for_render():
+            page, rect, draw_pos = self.get_decoration_atlas_details(deco, (0, 0), 1.0)
+            if not page: missing += 1; continue
+            if bake_decorations and deco.get('layer', DEFAULT_LAYER) <= BAKED_DECORATION_MAX_LAYER: baked.append((page, rect, draw_pos)); continue
+            base_id, variant_id, rotation = deco.get("base_id"), str(deco.get("variant_id", "0")), deco.get("rotation", 0)
+            render_path, _ = self.get_render_path_and_offset(base_id, variant_id, rotation)
+            sprites.append({"base_id": base_id, "variant_id": variant_id, "rotation": rotation, "layer": deco.get('layer', DEFAULT_LAYER),
+                            "grid_pos": list(deco["grid_pos"]), "image": f"furnis/{base_id}/{render_path}",
+                            "offset": [round(draw_pos[0] - anchor_x), round(draw_pos[1] - anchor_y)], "size": [rect.w, rect.h]})
+        if missing: print(f"[WARN] {missing} decoration(s) have no sprite and were left out of the baked scene.")
+
+        # World-space bounds of everything baked: tile diamonds, walls rising above them, and baked sprites.
+        bounds = [pygame.Rect(*grid_to_screen(gx, gy, (0, 0)), TILE_WIDTH + 1, TILE_HEIGHT + 1) for gx, gy in room.tiles]
+        bounds += [pygame.Rect(grid_to_screen(gx, gy, (0, 0))[0] - 1, grid_to_screen(gx, gy, (0, 0))[1] - WALL_HEIGHT - 1, TILE_WIDTH + 3, TILE_HEIGHT + WALL_HEIGHT + 3) for (gx, gy), _ in room.walls if (gx, gy) in room.tiles]
+        bounds += [pygame.Rect(int(draw_pos[0]), int(draw_pos[1]), rect.w + 1, rect.h + 1) for _, rect, draw_pos in baked]
+        draw_list = {"background": None, "sprites": sprites}
+        if not bounds: return None, draw_list
+        area = bounds[0].unionall(bounds[1:])
+        surface = pygame.Surface(area.size, pygame.SRCALPHA)
+        camera_offset = (-area.x, -area.y)
+        self._draw_tiles(surface, room, room.tiles.keys(), camera_offset)
+        self._draw_walls(surface, room, camera_offset)
+        for page, rect, draw_pos in baked: surface.blit(page, (draw_pos[0] + camera_offset[0], draw_pos[1] + camera_offset[1]), rect)
+        draw_list["background"] = {"image": BAKED_BACKGROUND_FILENAME, "offset": [round(area.x - anchor_x), round(area.y - anchor_y)], "size": list(area.size),
+                                   "baked_decorations": len(baked)}
+        return surface, draw_list
+
     def _draw_iso_grid_on_surface(self, surface, view_rect, offset, zoom=1.0):
         if not view_rect.w or not view_rect.h: return
         corners_grid = [screen_to_grid(0, 0, offset, zoom), screen_to_grid(view_rect.w, 0, offset, zoom), screen_to_grid(view_rect.w, view_rect.h, offset, zoom), screen_to_grid(0, view_rect.h, offset, zoom)]
@@ -118,6 +260,16 @@ class RoomRenderer:
             wall_points = [p1, p2, (p2[0], p2[1] - scaled_wall_h), (p1[0], p1[1] - scaled_wall_h)]
             pygame.draw.polygon(surf, COLOR_WALL, wall_points); pygame.draw.polygon(surf, COLOR_WALL_BORDER, wall_points, 2)
 
+    def get_render_path_and_offset(self, base_id, variant_id, rotation):
+        """Looks up a render's image path and offset in the furni data without loading the image."""
+        if not all((base_id, variant_id, rotation is not None)): return None, None
+        furni_data = self.data_manager.get_furni_data(base_id)
+        if not furni_data: return None, None
+        try:
+            render_info = furni_data["variants"][str(variant_id)]["renders"][str(rotation)]
+            return render_info["path"], (render_info["offset"]['x'], render_info["offset"]['y'])
+        except KeyError: return None, None
+
     def get_rendered_image_and_offset(self, base_id, variant_id, rotation):
         if not all((base_id, variant_id, rotation is not None)): return None, None
         furni_data = self.data_manager.get_furni_data(base_id)
@@ -129,30 +281,36 @@ class RoomRenderer:
         except KeyError: pass
         return None, None
         
-    def get_decoration_render_details(self, deco_data, camera_offset, zoom=1.0):
+    def get_decoration_atlas_details(self, deco_data, camera_offset, zoom=1.0):
+        """Returns (atlas_page, rect, (draw_x, draw_y)) for a decoration, or (None, None, None)."""
         base_id, variant_id = deco_data.get("base_id"), deco_data.get("variant_id", "0")
         grid_pos, rotation = deco_data.get("grid_pos"), deco_data.get("rotation", 0)
-        image, offset = self.get_rendered_image_and_offset(base_id, variant_id, rotation)
-        if not image or not offset or not grid_pos: return None, None
+        if not grid_pos or not all((base_id, variant_id, rotation is not None)): return None, None, None
+        page, rect, scaled_offset = self.get_atlas_sprite(base_id, variant_id, rotation, zoom)
+        if not page: return None, None, None
         screen_pos = grid_to_screen(grid_pos[0], grid_pos[1], camera_offset, zoom)
-        img_w, img_h = image.get_size()
-        scaled_size = (int(img_w * zoom), int(img_h * zoom))
-        if scaled_size[0] <= 0 or scaled_size[1] <= 0: return None, None
-        final_image = pygame.transform.scale(image, scaled_size)
-        scaled_offset = (offset[0] * zoom, offset[1] * zoom)
         anchor_x = screen_pos[0] + (TILE_WIDTH_HALF * zoom); anchor_y = screen_pos[1] + (TILE_HEIGHT_HALF * zoom)
         draw_x = anchor_x - scaled_offset[0]; draw_y = anchor_y - scaled_offset[1]
-        return final_image, (draw_x, draw_y)
+        return page, rect, (draw_x, draw_y)
+
+    def get_decoration_render_details(self, deco_data, camera_offset, zoom=1.0):
+        page, rect, draw_pos = self.get_decoration_atlas_details(deco_data, camera_offset, zoom)
+        if not page: return None, None
+        return page.subsurface(rect), draw_pos
 
     def _draw_decoration(self, surface, deco_data, camera_offset, zoom=1.0, is_ghost=False, is_occupied=False, custom_opacity_ratio=None):
-        render_details = self.get_decoration_render_details(deco_data, camera_offset, zoom)
-        if not render_details or not render_details[0]:
+        page, rect, draw_pos = self.get_decoration_atlas_details(deco_data, camera_offset, zoom)
+        if not page:
             if grid_pos := deco_data.get("grid_pos"):
                 screen_pos = grid_to_screen(grid_pos[0], grid_pos[1], camera_offset, zoom)
                 center_x, center_y = screen_pos[0] + (TILE_WIDTH_HALF * zoom), screen_pos[1] + (TILE_HEIGHT_HALF * zoom)
                 pygame.draw.circle(surface, (255, 0, 255), (center_x, center_y), 8)
             return
-        final_image, (draw_x, draw_y) = render_details
+        draw_x, draw_y = draw_pos
+        if not is_ghost and custom_opacity_ratio is None:
+            # Fast path: blit straight from the atlas page, no intermediate surface.
+            surface.blit(page, (draw_x, draw_y), rect); return
+        final_image = page.subsurface(rect)
         if is_ghost:
             ghost_image = final_image.copy()
             alpha = 100 if is_occupied else 150
@@ -164,6 +322,4 @@ class RoomRenderer:
         elif custom_opacity_ratio is not None:
             faded_image = final_image.copy()
             faded_image.set_alpha(int(255 * custom_opacity_ratio))
-            surface.blit(faded_image, (draw_x, draw_y))
-        else:
-            surface.blit(final_image, (draw_x, draw_y))
\ No newline at end of file
+            surface.blit(faded_image, (draw_x, draw_y))
\ No newline at end of file
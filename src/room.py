@@ -1,169 +1,681 @@
 # src/room.py
 
+from bisect import bisect_right
+from collections import Counter
+from itertools import repeat
 from common.constants import *
+from decoration_index import DecorationSpatialIndex
+from walkability import WalkabilityGraph
+from structure_format import iter_structure_chunks, write_structure_grids
+
+UNCHANGED = object() # Returned by the Room._put_* helpers when a cell already has the requested value
+
+class GridBounds:
+    """
+    Bounding box of a set of grid positions, kept up to date as positions are added and removed.
+    Per-column and per-row counts let the box shrink when the last position on an edge goes away,
+    so queries are O(1) and updates only walk over empty rows/columns at the edge.
+    """
+    def __init__(self):
+        self.col_counts = Counter(); self.row_counts = Counter()
+        self.min_x = self.max_x = self.min_y = self.max_y = None
+
+    def clear(self):
+        self.col_counts.clear(); self.row_counts.clear()
+        self.min_x = self.max_x = self.min_y = self.max_y = None
+
+    def add(self, pos):
+        x, y = pos
+        self.col_counts[x] += 1; self.row_counts[y] += 1
+        if self.min_x is None: self.min_x = self.max_x = x; self.min_y = self.max_y = y; return
+        if x < self.min_x: self.min_x = x
+        elif x > self.max_x: self.max_x = x
+        if y < self.min_y: self.min_y = y
+        elif y > self.max_y: self.max_y = y
+
+    def remove(self, pos):
+        x, y = pos
+        self.col_counts[x] -= 1; self.row_counts[y] -= 1
+        if self.col_counts[x] <= 0: del self.col_counts[x]
+        if self.row_counts[y] <= 0: del self.row_counts[y]
+        if not self.col_counts: self.clear(); return
+        while self.min_x not in self.col_counts: self.min_x += 1
+        while self.max_x not in self.col_counts: self.max_x -= 1
+        while self.min_y not in self.row_counts: self.min_y += 1
+        while self.max_y not in self.row_counts: self.max_y -= 1
+
+    def get(self):
+        """Returns (min_x, min_y, max_x, max_y), or None if there are no positions."""
+        if self.min_x is None: return None
+        return self.min_x, self.min_y, self.max_x, self.max_y
 
 class Room:
-    def __init__(self, structure_data, decoration_set_data):
+    def __init__(self, structure_data, decoration_set_data, footprint_provider=None):
         self.structure_data = structure_data
         self.decoration_set_data = decoration_set_data
         
         self.tiles = {}
+        self.door_pos = None # Tile where characters enter the room; walkability is measured from it
         self.walls = set()
         self.walkable_map = {}
         self.layer_map = {}
+        self.layer_tiles = {} # Key: layer_id, Value: set of positions with that layer in layer_map; changed only through _assign_layer
+        # Automatic Wall layer bookkeeping, so walls can be added and removed in O(1).
+        self.walls_by_tile = {} # Key: (gx, gy), Value: set of edges with a wall on that tile
+        self.wall_layer_sources = {} # Key: tile behind a wall, Value: set of walls that put it on the Wall layer
+        self.covered_layers = {} # Key: tile on the Wall layer, Value: its painted layer underneath (None if it has none)
+        self.tile_bounds = GridBounds()
+        self.wall_layer_bounds = GridBounds() # Positions on the Wall layer, which can lie outside the tiles
         self.decorations = []
-        self.occupied_layer_tiles = {} # Key: (gx, gy), Value: set of layer_id
+        # Function (base_id, rotation) -> (width, depth) in tiles; without one every decoration covers only its tile.
+        self.footprint_provider = footprint_provider
+        self.layer_occupancy = {} # Key: layer_id, Value: dict of (gx, gy) -> decoration covering that tile
+        self.overlapped_occupancy = {} # Key: (layer_id, (gx, gy)), Value: list of the other decorations covering a tile (overlaps in loaded files)
+        self.used_furni_counts = Counter() # Key: base_id, Value: number of decorations using it
+        self.decoration_index = DecorationSpatialIndex() # Sprite bounds, for picking; needs set_decoration_bounds_provider
+        self._sorted_decorations = None # Render order cache, valid while the decorations revision is _sorted_revision
+        self._sorted_revision = None
+        self._sorted_keys = None # Sort keys of _sorted_decorations, built when a streamed batch is first merged into it
+
+        # Dirty tracking: every mutation bumps the revision of the part it touches.
+        self.revisions = {part: 0 for part in ROOM_PARTS}
+        self.saved_revisions = dict(self.revisions)
+        # Called with every operation applied to the room (e.g. by the edit journal). See apply_op for the format.
+        self.op_listeners = []
+        self._batch_ops = None # Operations collected while a batch is open (see begin_batch)
+        self._batch_depth = 0
         
         self.populate_internal_data()
+        self.walkability = WalkabilityGraph(self) # Follows the room through op_listeners
+
+    def mark_changed(self, part):
+        self.revisions[part] += 1
+
+    def is_dirty(self, part):
+        return self.revisions[part] != self.saved_revisions[part]
+
+    def get_dirty_parts(self):
+        return {part for part in ROOM_PARTS if self.is_dirty(part)}
+
+    def mark_saved(self, revisions):
+        """Records the revisions that were written by a save (edits made while saving stay dirty)."""
+        self.saved_revisions = dict(revisions)
+
+    def _record(self, op):
+        if self._batch_ops is not None: self._batch_ops.append(op); return
+        for listener in self.op_listeners: listener(op)
+
+    def begin_batch(self):
+        """Operations until the matching end_batch() reach the listeners as a single 'batch' operation."""
+        self._batch_depth += 1
+        if self._batch_depth == 1: self._batch_ops = []
 
-    def _calculate_automatic_layers(self):
+    def end_batch(self):
+        self._batch_depth -= 1
+        if self._batch_depth > 0: return
+        ops, self._batch_ops = self._batch_ops, None
+        if ops: self._record(ops[0] if len(ops) == 1 else {"op": "batch", "ops": ops})
+
+    def apply_op(self, op):
+        """Re-applies an operation recorded by one of the mutation methods, e.g. when replaying the edit journal."""
+        kind = op["op"]
+        pos = tuple(op["pos"]) if "pos" in op else None
+        if kind == "batch":
+            self.begin_batch()
+            try:
+                for sub_op in op["ops"]: self.apply_op(sub_op)
+            finally: self.end_batch()
+        elif kind == "cells": self.set_cells(op["field"], zip(op["cells"][0::2], op["cells"][1::2]), op["values"])
+        elif kind == "tile": self.set_tile(pos, op["type"])
+        elif kind == "erase": self.remove_tile(pos)
+        elif kind == "restore": self.restore_tile(pos, op["type"], op["walkable"], op["layer"], op["walls"])
+        elif kind == "wall": self.toggle_wall(pos, op["edge"])
+        elif kind == "walk": self.set_walkable(pos, op["value"])
+        elif kind == "layer": self.paint_layer(pos, op["layer"])
+        elif kind == "anchor": self.set_render_anchor(op["x"], op["y"])
+        elif kind == "door": self.set_door(op["door"])
+        elif kind == "deco_add": self.add_decoration(op["base_id"], op["variant_id"], pos, op["rotation"], op["layer"])
+        elif kind == "deco_del": self.remove_decoration_at(pos, op["layer"])
+        elif kind in ("deco_move", "deco_rotate"):
+            decos = [self._find_decoration(item) for item in op["items"]]
+            if None in decos: print(f"[WARN] Room operation '{kind}' refers to a missing decoration, ignored."); return
+            if kind == "deco_move": self.move_decorations(decos, op["dx"], op["dy"])
+            else: self.rotate_decorations(decos, op["rotations"])
+        else: print(f"[WARN] Unknown room operation '{kind}' ignored.")
+
+    @staticmethod
+    def invert_op(op):
+        """Returns the operation that undoes 'op'. Every operation carries the values it replaced for this."""
+        kind = op["op"]
+        if kind == "batch": return {"op": "batch", "ops": [Room.invert_op(sub_op) for sub_op in reversed(op["ops"])]}
+        if kind == "cells": return {"op": "cells", "field": op["field"], "cells": op["cells"], "values": op["old"], "old": op["values"]}
+        if kind == "tile":
+            if op.get("old_type") is None: return {"op": "erase", "pos": op["pos"]}
+            return {"op": "tile", "pos": op["pos"], "type": op["old_type"], "old_type": op["type"]}
+        if kind == "erase": return {"op": "restore", "pos": op["pos"], "type": op["type"], "walkable": op["walkable"], "layer": op["layer"], "walls": op["walls"]}
+        if kind == "restore": return {"op": "erase", "pos": op["pos"], "type": op["type"], "walkable": op["walkable"], "layer": op["layer"], "walls": op["walls"]}
+        if kind == "wall": return dict(op) # A toggle is its own inverse
+        if kind in ("walk", "layer"):
+            value_key = "value" if kind == "walk" else "layer"
+            return {"op": kind, "pos": op["pos"], value_key: op["old"], "old": op[value_key]}
+        if kind == "anchor": return {"op": "anchor", "x": op["old_x"], "y": op["old_y"], "old_x": op["x"], "old_y": op["y"]}
+        if kind == "door": return {"op": "door", "door": op["old"], "old": op["door"]}
+        if kind == "deco_add": return dict(op, op="deco_del")
+        if kind == "deco_del": return dict(op, op="deco_add")
+        if kind == "deco_move": return {"op": "deco_move", "items": [[x + op["dx"], y + op["dy"], layer] for x, y, layer in op["items"]], "dx": -op["dx"], "dy": -op["dy"]}
+        if kind == "deco_rotate": return {"op": "deco_rotate", "items": op["items"], "rotations": op["old"], "old": op["rotations"]}
+        raise ValueError(f"Cannot invert room operation '{kind}'")
+
+    @staticmethod
+    def _get_behind_pos(pos, edge):
+        """The tile behind an NE or NW wall, which is assigned the automatic WALL layer. None for other edges."""
+        if edge == EDGE_NE: return (pos[0], pos[1] - 1)
+        if edge == EDGE_NW: return (pos[0] - 1, pos[1])
+        return None
+
+    def _add_wall(self, wall):
         """
-        Automatically assigns special layers based on room structure.
-        - The WALL layer is assigned to tiles behind NE and NW walls.
-        This overrides any manually painted layer on those specific tiles.
+        Adds a wall and puts the tile behind it on the WALL layer, overriding its painted layer
+        until the last wall covering it is removed. Only the affected tile is touched.
         """
-        for pos, edge in self.walls:
-            behind_pos = None
-            if edge == EDGE_NE:
-                behind_pos = (pos[0], pos[1] - 1)
-            elif edge == EDGE_NW:
-                behind_pos = (pos[0] - 1, pos[1])
-            
-            if behind_pos:
-                self.layer_map[behind_pos] = LAYER_WALL
-                # Note: We don't need to add this to self.tiles if it doesn't exist.
-                # The renderer will handle drawing the layer overlay on non-tile positions.
+        pos, edge = wall
+        self.walls.add(wall)
+        self.walls_by_tile.setdefault(pos, set()).add(edge)
+        behind_pos = self._get_behind_pos(pos, edge)
+        if behind_pos is None: return
+        sources = self.wall_layer_sources.setdefault(behind_pos, set())
+        if not sources:
+            self.wall_layer_bounds.add(behind_pos)
+            self.covered_layers[behind_pos] = self.layer_map.get(behind_pos)
+            # Note: The position does not need to be a tile. The renderer draws the layer overlay on non-tile positions too.
+            self._assign_layer(behind_pos, LAYER_WALL)
+        sources.add(wall)
+
+    def _remove_wall(self, wall):
+        """Removes a wall; the tile behind it gets its painted layer back once no other wall covers it."""
+        pos, edge = wall
+        self.walls.discard(wall)
+        if (edges := self.walls_by_tile.get(pos)) is not None:
+            edges.discard(edge)
+            if not edges: del self.walls_by_tile[pos]
+        behind_pos = self._get_behind_pos(pos, edge)
+        sources = self.wall_layer_sources.get(behind_pos)
+        if not sources or wall not in sources: return
+        sources.discard(wall)
+        if sources: return
+        del self.wall_layer_sources[behind_pos]
+        self.wall_layer_bounds.remove(behind_pos)
+        painted_layer = self.covered_layers.pop(behind_pos, None)
+        if painted_layer is None and behind_pos in self.tiles: painted_layer = DEFAULT_LAYER
+        self._assign_layer(behind_pos, painted_layer)
+
+    def get_painted_layer(self, grid_pos):
+        """The layer painted on a tile, also when the automatic WALL layer currently covers it."""
+        if grid_pos in self.wall_layer_sources: return self.covered_layers.get(grid_pos)
+        return self.layer_map.get(grid_pos)
+
+    def _set_painted_layer(self, grid_pos, layer_id):
+        if grid_pos in self.wall_layer_sources: self.covered_layers[grid_pos] = layer_id
+        else: self._assign_layer(grid_pos, layer_id)
+
+    def _assign_layer(self, grid_pos, layer_id):
+        """Sets the layer of a position in layer_map (None removes it) and keeps the per-layer index in step."""
+        old_layer = self.layer_map.get(grid_pos)
+        if old_layer == layer_id: return
+        if old_layer is not None:
+            positions = self.layer_tiles[old_layer]
+            positions.discard(grid_pos)
+            if not positions: del self.layer_tiles[old_layer]
+        if layer_id is None: del self.layer_map[grid_pos]
+        else:
+            self.layer_map[grid_pos] = layer_id
+            self.layer_tiles.setdefault(layer_id, set()).add(grid_pos)
+
+    def get_layer_tiles(self, layer_id):
+        """The positions currently on a layer (including Wall layer positions without a tile). Do not modify the returned set."""
+        return self.layer_tiles.get(layer_id, frozenset())
+
+    def get_layer_counts(self):
+        """Number of positions on each layer, e.g. for layer stats. O(number of layers)."""
+        return {layer_id: len(positions) for layer_id, positions in self.layer_tiles.items()}
 
     def populate_internal_data(self):
         """Populates internal dictionaries and sets from JSON data."""
         self.tiles.clear(); self.walls.clear(); self.decorations.clear()
-        self.walkable_map.clear(); self.layer_map.clear(); self.occupied_layer_tiles.clear()
+        self.walkable_map.clear(); self.layer_map.clear(); self.layer_tiles.clear(); self.layer_occupancy.clear(); self.overlapped_occupancy.clear(); self.used_furni_counts.clear()
+        self.walls_by_tile.clear(); self.wall_layer_sources.clear(); self.covered_layers.clear()
+        self.tile_bounds.clear(); self.wall_layer_bounds.clear()
         
-        dims = self.structure_data.get('dimensions', {})
-        ox, oy = dims.get('origin_x', 0), dims.get('origin_y', 0)
-        
-        for y, row in enumerate(self.structure_data.get('tiles', [])):
-            for x, char_val in enumerate(row):
+        door = self.structure_data.get('door')
+        self.door_pos = tuple(door) if door else None
+        # Dense and chunked structure files are both read chunk by chunk, see structure_format.py.
+        for ox, oy, tile_rows, walkable_rows, layer_rows in iter_structure_chunks(self.structure_data):
+            self._load_structure_chunk(ox, oy, tile_rows, walkable_rows, layer_rows)
+
+        # Walls are added after the painted layers, so the automatic Wall layer covers them.
+        for wall_data in self.structure_data.get('walls', []):
+            self._add_wall((tuple(wall_data['grid_pos']), wall_data['edge']))
+            
+        self.decorations = self.decoration_set_data.setdefault("decorations", [])
+        self.decoration_index.rebuild(())
+        self.warn_overlapping_decorations(self._index_loaded_decorations(self.decorations))
+        self._sorted_revision = None
+
+    def _index_loaded_decorations(self, decos):
+        """Occupancy, furni counts and spatial index of decorations read from a file. Returns how many overlap others."""
+        num_overlapping = 0
+        for deco in decos:
+            if not self._occupy(deco): num_overlapping += 1
+            self.used_furni_counts[deco.get("base_id")] += 1
+            self.decoration_index.insert(deco)
+        return num_overlapping
+
+    @staticmethod
+    def warn_overlapping_decorations(num_overlapping):
+        if num_overlapping: print(f"[WARN] {num_overlapping} decoration(s) overlap others on their layer; their tiles stay assigned to the first one.")
+
+    def append_loaded_decorations(self, decos):
+        """
+        Adds a batch of decorations streamed in from the decorations file, indexing them as they arrive.
+        Like populate_internal_data this is loading, not editing: nothing is recorded or marked dirty.
+        Returns how many of them overlap decorations already in the room.
+        """
+        self.decorations.extend(decos)
+        if self._sorted_revision == self.revisions[PART_DECORATIONS]: self._merge_into_render_order(decos)
+        return self._index_loaded_decorations(decos)
+
+    def _merge_into_render_order(self, decos):
+        """
+        Merges decorations appended to self.decorations into the cached render order, so a streamed load
+        does not re-sort every decoration after each batch. Gives the same order as sorting from scratch.
+        """
+        merged, start = [], 0
+        old = self._sorted_decorations
+        if self._sorted_keys is None: self._sorted_keys = [self.render_sort_key(deco) for deco in old]
+        old_keys, merged_keys = self._sorted_keys, []
+        for key, deco in sorted(((self.render_sort_key(deco), deco) for deco in decos), key=lambda pair: pair[0]):
+            # After any equal keys: they come earlier in self.decorations, and the full sort is stable.
+            end = bisect_right(old_keys, key, start)
+            merged += old[start:end]; merged.append(deco)
+            merged_keys += old_keys[start:end]; merged_keys.append(key)
+            start = end
+        merged += old[start:]; merged_keys += old_keys[start:]
+        self._sorted_decorations, self._sorted_keys = merged, merged_keys
+
+    def _load_structure_chunk(self, ox, oy, tile_rows, walkable_rows, layer_rows):
+        chunk_tiles = []
+        for y, row in enumerate(tile_rows, oy):
+            for x, char_val in enumerate(row, ox):
                 if char_val != '0':
-                    self.tiles[(x + ox, y + oy)] = int(char_val)
-        
-        for y, row in enumerate(self.structure_data.get('walkable', [])):
-            for x, char_val in enumerate(row):
-                if char_val in ('0', '1'):
-                    grid_pos = (x + ox, y + oy)
-                    if grid_pos in self.tiles:
-                        self.walkable_map[grid_pos] = int(char_val)
-
-        for y, row in enumerate(self.structure_data.get('layers', [])):
-            for x, char_val in enumerate(row):
-                grid_pos = (x + ox, y + oy)
+                    self.tiles[(x, y)] = int(char_val)
+                    self.tile_bounds.add((x, y)); chunk_tiles.append((x, y))
+        if not chunk_tiles: return
+
+        for y, row in enumerate(walkable_rows, oy):
+            for x, char_val in enumerate(row, ox):
+                if char_val in ('0', '1') and (x, y) in self.tiles: self.walkable_map[(x, y)] = int(char_val)
+
+        for y, row in enumerate(layer_rows, oy):
+            for x, char_val in enumerate(row, ox):
                 layer_id = LAYER_CHARS_TO_ID.get(char_val)
-                if layer_id is not None and grid_pos in self.tiles:
-                    # We only load manually paintable layers. Wall layer is calculated.
-                    if layer_id not in [LAYER_WALL, LAYER_FLOOR]:
-                        self.layer_map[grid_pos] = layer_id
+                # We only load manually paintable layers. Wall layer is calculated.
+                if layer_id is not None and layer_id not in [LAYER_WALL, LAYER_FLOOR] and (x, y) in self.tiles:
+                    self._assign_layer((x, y), layer_id)
 
-        for pos in self.tiles:
-            if pos not in self.layer_map: self.layer_map[pos] = DEFAULT_LAYER
+        for pos in chunk_tiles:
+            if pos not in self.layer_map: self._assign_layer(pos, DEFAULT_LAYER)
 
-        for wall_data in self.structure_data.get('walls', []):
-            self.walls.add((tuple(wall_data['grid_pos']), wall_data['edge']))
-        
-        # After loading all structure, calculate automatic layers
-        self._calculate_automatic_layers()
-            
-        self.decorations = self.decoration_set_data.get("decorations", [])
-        for deco in self.decorations:
-            pos_tuple = tuple(deco["grid_pos"])
-            layer_id = deco.get("layer", DEFAULT_LAYER)
-            if pos_tuple not in self.occupied_layer_tiles:
-                self.occupied_layer_tiles[pos_tuple] = set()
-            self.occupied_layer_tiles[pos_tuple].add(layer_id)
+    def set_decoration_bounds_provider(self, bounds_provider):
+        """Sets the function giving a decoration's world-space sprite bounds and indexes all decorations with it."""
+        self.decoration_index.bounds_provider = bounds_provider
+        self.decoration_index.rebuild(self.decorations)
+
+    # --- Structure mutations ---
+    # Editors change the structure only through these methods, so dirty tracking stays correct.
+    # The _put_* helpers change one cell without recording anything and return the previous value, or UNCHANGED.
+    def _put_tile(self, grid_pos, tile_type):
+        """Places or changes a tile; None removes it (only used to undo the creation of a tile)."""
+        old_type = self.tiles.get(grid_pos)
+        if old_type == tile_type: return UNCHANGED
+        if tile_type is None: self._discard_tile(grid_pos); return old_type
+        self.tiles[grid_pos] = tile_type
+        if old_type is None: self.tile_bounds.add(grid_pos)
+        if grid_pos not in self.walkable_map: self.walkable_map[grid_pos] = 0
+        if self.get_painted_layer(grid_pos) is None: self._set_painted_layer(grid_pos, DEFAULT_LAYER)
+        return old_type
+
+    def _put_walkable(self, grid_pos, value):
+        old_value = self.walkable_map.get(grid_pos, 0)
+        if grid_pos not in self.tiles or old_value == value: return UNCHANGED
+        self.walkable_map[grid_pos] = value
+        return old_value
+
+    def _put_layer(self, grid_pos, layer_id):
+        """Tiles on the automatic Wall layer are left untouched."""
+        old_layer = self.layer_map.get(grid_pos)
+        if grid_pos not in self.tiles or old_layer in (LAYER_WALL, layer_id): return UNCHANGED
+        self._assign_layer(grid_pos, layer_id)
+        return old_layer
+
+    def _discard_tile(self, grid_pos):
+        """Removes a tile with its walkable flag, painted layer and walls. Returns what was removed."""
+        tile_type = self.tiles.pop(grid_pos)
+        self.tile_bounds.remove(grid_pos)
+        walkable = self.walkable_map.pop(grid_pos, 0)
+        layer_id = self.get_painted_layer(grid_pos) or DEFAULT_LAYER
+        self._set_painted_layer(grid_pos, None)
+        removed_edges = sorted(self.walls_by_tile.get(grid_pos, ()))
+        for edge in removed_edges: self._remove_wall((grid_pos, edge))
+        return tile_type, walkable, layer_id, removed_edges
+
+    def set_tile(self, grid_pos, tile_type):
+        """Places or changes a tile. New tiles start non-walkable on the default layer."""
+        old_type = self._put_tile(grid_pos, tile_type)
+        if old_type is UNCHANGED: return False
+        self.mark_changed(PART_STRUCTURE)
+        self._record({"op": "tile", "pos": list(grid_pos), "type": tile_type, "old_type": old_type})
+        return True
+
+    def remove_tile(self, grid_pos):
+        """Deletes a tile together with its walkable flag, painted layer and walls."""
+        if grid_pos not in self.tiles: return False
+        tile_type, walkable, layer_id, removed_edges = self._discard_tile(grid_pos)
+        self.mark_changed(PART_STRUCTURE)
+        # The removed values are recorded so the erase can be undone.
+        self._record({"op": "erase", "pos": list(grid_pos), "type": tile_type, "walkable": walkable, "layer": layer_id, "walls": removed_edges})
+        return True
+
+    def restore_tile(self, grid_pos, tile_type, walkable, layer_id, wall_edges):
+        """Puts back a tile removed by remove_tile, with its walkable flag, layer and walls."""
+        if grid_pos in self.tiles: return False
+        self.tiles[grid_pos] = tile_type
+        self.tile_bounds.add(grid_pos)
+        self.walkable_map[grid_pos] = walkable
+        self._set_painted_layer(grid_pos, layer_id)
+        for edge in wall_edges: self._add_wall((grid_pos, edge))
+        self.mark_changed(PART_STRUCTURE)
+        self._record({"op": "restore", "pos": list(grid_pos), "type": tile_type, "walkable": walkable, "layer": layer_id, "walls": list(wall_edges)})
+        return True
+
+    def toggle_wall(self, grid_pos, edge):
+        wall_tuple = (grid_pos, edge)
+        if wall_tuple in self.walls: self._remove_wall(wall_tuple)
+        else: self._add_wall(wall_tuple)
+        self.mark_changed(PART_STRUCTURE)
+        self._record({"op": "wall", "pos": list(grid_pos), "edge": edge})
+
+    def set_walkable(self, grid_pos, value):
+        old_value = self._put_walkable(grid_pos, value)
+        if old_value is UNCHANGED: return False
+        self.mark_changed(PART_STRUCTURE)
+        self._record({"op": "walk", "pos": list(grid_pos), "value": value, "old": old_value})
+        return True
+
+    def paint_layer(self, grid_pos, layer_id):
+        """Paints a layer onto an existing tile. Tiles on the automatic Wall layer are left untouched."""
+        old_layer = self._put_layer(grid_pos, layer_id)
+        if old_layer is UNCHANGED: return False
+        self.mark_changed(PART_STRUCTURE)
+        self._record({"op": "layer", "pos": list(grid_pos), "layer": layer_id, "old": old_layer})
+        return True
+
+    # --- Bulk mutations (drag strokes, rectangle/line/flood fill tools) ---
+    def set_cells(self, field, positions, values):
+        """
+        Sets the tile type ('tile'), walkable flag ('walk') or painted layer ('layer') of many cells
+        in one pass. The changes are recorded as a single compact 'cells' operation with flat lists
+        instead of one dict per cell, so a 200x200 fill stays cheap to journal and to keep for undo.
+        Returns how many cells actually changed.
+        """
+        put = {"tile": self._put_tile, "walk": self._put_walkable, "layer": self._put_layer}[field]
+        flat_cells, new_values, old_values = [], [], []
+        for pos, value in zip(positions, values):
+            old_value = put(pos, value)
+            if old_value is UNCHANGED: continue
+            flat_cells += pos; new_values.append(value); old_values.append(old_value)
+        if new_values:
+            self.mark_changed(PART_STRUCTURE)
+            self._record({"op": "cells", "field": field, "cells": flat_cells, "values": new_values, "old": old_values})
+        return len(new_values)
+
+    def remove_tiles(self, positions):
+        """Erases many tiles as one 'batch' operation (each erase keeps its walls for undo)."""
+        self.begin_batch()
+        try: return sum(self.remove_tile(pos) for pos in positions)
+        finally: self.end_batch()
+
+    def set_tiles(self, positions, tile_type): return self.set_cells("tile", positions, repeat(tile_type))
+    def set_walkables(self, positions, value): return self.set_cells("walk", positions, repeat(value))
+    def paint_layers(self, positions, layer_id): return self.set_cells("layer", positions, repeat(layer_id))
+
+    def set_render_anchor(self, x, y):
+        anchor = self.structure_data["renderAnchor"]
+        old_x, old_y = anchor["x"], anchor["y"]
+        anchor["x"], anchor["y"] = x, y
+        self.mark_changed(PART_STRUCTURE)
+        self._record({"op": "anchor", "x": x, "y": y, "old_x": old_x, "old_y": old_y})
+
+    def set_door(self, grid_pos):
+        """Sets the door tile (None clears it)."""
+        grid_pos = tuple(grid_pos) if grid_pos is not None else None
+        if grid_pos == self.door_pos: return False
+        old_pos, self.door_pos = self.door_pos, grid_pos
+        self.mark_changed(PART_STRUCTURE)
+        self._record({"op": "door", "door": list(grid_pos) if grid_pos else None, "old": list(old_pos) if old_pos else None})
+        return True
+
+    def _track_furni_usage(self, base_id, delta):
+        self.used_furni_counts[base_id] += delta
+        if self.used_furni_counts[base_id] <= 0:
+            del self.used_furni_counts[base_id]
+            self.mark_changed(PART_ASSETS)
+        elif delta > 0 and self.used_furni_counts[base_id] == 1:
+            self.mark_changed(PART_ASSETS)
+
+    # --- Decoration footprints ---
+    def get_footprint_cells(self, base_id, grid_pos, rotation):
+        """The tiles a furni covers when its anchor (the footprint's min x, min y corner) is at grid_pos."""
+        width, depth = self.footprint_provider(base_id, rotation) if self.footprint_provider else (1, 1)
+        gx, gy = grid_pos
+        return [(gx + dx, gy + dy) for dy in range(depth) for dx in range(width)]
+
+    def is_footprint_free(self, base_id, grid_pos, rotation, layer):
+        """True if no decoration covers any tile of the footprint on that layer. O(footprint size)."""
+        occupancy = self.layer_occupancy.get(layer)
+        if not occupancy: return True
+        return not any(cell in occupancy for cell in self.get_footprint_cells(base_id, grid_pos, rotation))
+
+    def get_decoration_at(self, grid_pos, layer):
+        """The decoration whose footprint covers a tile on a layer, or None."""
+        return self.layer_occupancy.get(layer, {}).get(tuple(grid_pos))
+
+    def _occupy(self, deco):
+        """
+        Marks the footprint of a decoration as occupied. Tiles already taken are left to their owner, and the
+        decoration is kept as a further occupant there (see _vacate); returns False if there were any.
+        """
+        layer = deco.get("layer", DEFAULT_LAYER)
+        occupancy = self.layer_occupancy.setdefault(layer, {})
+        is_free = True
+        for cell in self.get_footprint_cells(deco.get("base_id"), deco["grid_pos"], deco.get("rotation", 0)):
+            if cell in occupancy:
+                is_free = False
+                self.overlapped_occupancy.setdefault((layer, cell), []).append(deco)
+            else: occupancy[cell] = deco
+        return is_free
+
+    def _vacate(self, deco):
+        """Frees the footprint of a decoration. A tile another decoration still covers passes to that one."""
+        layer = deco.get("layer", DEFAULT_LAYER)
+        occupancy = self.layer_occupancy.get(layer)
+        if occupancy is None: return
+        for cell in self.get_footprint_cells(deco.get("base_id"), deco["grid_pos"], deco.get("rotation", 0)):
+            others = self.overlapped_occupancy.get((layer, cell))
+            if occupancy.get(cell) is deco:
+                if others: occupancy[cell] = others.pop(0)
+                else: del occupancy[cell]
+            elif others:
+                for i, other in enumerate(others):
+                    if other is deco: del others[i]; break
+            if others == []: del self.overlapped_occupancy[(layer, cell)]
+        if not occupancy: del self.layer_occupancy[layer]
 
     def add_decoration(self, base_id, variant_id, grid_pos, rotation, layer):
-        """Adds a decoration if the specific layer on the tile is not occupied."""
+        """Adds a decoration if none of the tiles of its footprint is occupied on that layer."""
         grid_pos_tuple = tuple(grid_pos)
 
-        if self.occupied_layer_tiles.get(grid_pos_tuple) and layer in self.occupied_layer_tiles[grid_pos_tuple]:
-            print(f"[WARN] Cannot place item: tile {grid_pos_tuple} is already occupied on layer {layer}.")
+        if not self.is_footprint_free(base_id, grid_pos_tuple, rotation, layer):
+            print(f"[WARN] Cannot place item: its footprint at {grid_pos_tuple} is already occupied on layer {layer}.")
             return False
         
-        self.decorations.append({
+        new_deco = {
             "base_id": base_id, "variant_id": variant_id,
             "grid_pos": list(grid_pos), "rotation": rotation, "layer": layer
-        })
-        
-        if grid_pos_tuple not in self.occupied_layer_tiles:
-            self.occupied_layer_tiles[grid_pos_tuple] = set()
-        self.occupied_layer_tiles[grid_pos_tuple].add(layer)
+        }
+        self.decorations.append(new_deco)
+        self.decoration_index.insert(new_deco)
+        self._occupy(new_deco)
+        self._track_furni_usage(base_id, 1)
+        self.mark_changed(PART_DECORATIONS)
+        self._record({"op": "deco_add", "base_id": base_id, "variant_id": variant_id, "pos": list(grid_pos), "rotation": rotation, "layer": layer})
         
         print(f"[LOG] Placing '{base_id}' at {grid_pos_tuple} on layer {layer}")
         return True
 
     def remove_decoration_at(self, grid_pos, layer):
-        """Removes the decoration at the given grid position on a specific layer."""
-        grid_pos_tuple = tuple(grid_pos)
+        """Removes the decoration whose footprint covers the given grid position on a specific layer."""
+        deco = self.get_decoration_at(grid_pos, layer)
+        if deco is None: return False
+        anchor = tuple(deco["grid_pos"])
+        del self.decorations[next(i for i, d in enumerate(self.decorations) if d is deco)] # By identity: equal copies can exist
+        self.decoration_index.remove(deco)
+        self._vacate(deco)
+        self._track_furni_usage(deco.get("base_id"), -1)
+        self.mark_changed(PART_DECORATIONS)
+        # The anchor is recorded, not the clicked tile, so undo puts the decoration back where it was.
+        self._record({"op": "deco_del", "base_id": deco.get("base_id"), "variant_id": deco.get("variant_id"), "pos": list(anchor), "rotation": deco.get("rotation"), "layer": layer})
+        print(f"[LOG] Item '{deco.get('base_id')}' removed from position {anchor} on layer {layer}")
+        return True
+
+    # --- Bulk decoration mutations ---
+    # Decorations are referred to in operations as [x, y, layer] of their anchor, which their footprint always covers.
+    @staticmethod
+    def _decoration_item(deco):
+        return [deco["grid_pos"][0], deco["grid_pos"][1], deco.get("layer", DEFAULT_LAYER)]
+
+    def _find_decoration(self, item):
+        deco = self.get_decoration_at(item[:2], item[2])
+        return deco if deco is not None and tuple(deco["grid_pos"]) == tuple(item[:2]) else None
+
+    def get_decorations_in_rect(self, world_rect, layer=None):
+        """Decorations whose sprite bounds intersect a world (zoom 1.0) rectangle (x, y, w, h), optionally only on one layer."""
+        hits = self.decoration_index.query_rect(world_rect)
+        return hits if layer is None else [d for d in hits if d.get("layer", DEFAULT_LAYER) == layer]
+
+    def _reposition_decorations(self, decos, positions, rotations):
+        """Gives decorations new anchors and rotations all at once, if every new footprint is free. Returns True if applied."""
+        old = [(deco["grid_pos"], deco.get("rotation", 0)) for deco in decos]
+        for deco in decos: self._vacate(deco)
+        num_placed = 0
+        for deco, pos, rotation in zip(decos, positions, rotations):
+            if not self.is_footprint_free(deco.get("base_id"), pos, rotation, deco.get("layer", DEFAULT_LAYER)): break
+            deco["grid_pos"], deco["rotation"] = list(pos), rotation
+            self._occupy(deco); num_placed += 1
+        if num_placed < len(decos):
+            for deco in decos[:num_placed]: self._vacate(deco)
+            for deco, (pos, rotation) in zip(decos, old): deco["grid_pos"], deco["rotation"] = pos, rotation; self._occupy(deco)
+            return False
+        for deco in decos: self.decoration_index.remove(deco); self.decoration_index.insert(deco)
+        self.mark_changed(PART_DECORATIONS)
+        return True
+
+    def move_decorations(self, decos, dx, dy):
+        """Moves decorations by (dx, dy) tiles as one operation. Nothing moves if any of them would land on an occupied tile."""
+        decos = list(decos)
+        if not decos or (dx, dy) == (0, 0): return False
+        items = [self._decoration_item(deco) for deco in decos]
+        positions = [(deco["grid_pos"][0] + dx, deco["grid_pos"][1] + dy) for deco in decos]
+        if not self._reposition_decorations(decos, positions, [deco.get("rotation", 0) for deco in decos]):
+            print(f"[WARN] Cannot move {len(decos)} decoration(s) by ({dx}, {dy}): the destination is occupied.")
+            return False
+        self._record({"op": "deco_move", "items": items, "dx": dx, "dy": dy})
+        return True
+
+    def rotate_decorations(self, decos, rotations):
+        """Sets the rotation of each decoration (around its anchor) as one operation. Nothing changes if a rotated footprint collides."""
+        decos, rotations = list(decos), list(rotations)
+        if not decos: return False
+        items, old = [self._decoration_item(deco) for deco in decos], [deco.get("rotation", 0) for deco in decos]
+        if not self._reposition_decorations(decos, [tuple(deco["grid_pos"]) for deco in decos], rotations):
+            print(f"[WARN] Cannot rotate {len(decos)} decoration(s): a rotated footprint would overlap another decoration.")
+            return False
+        self._record({"op": "deco_rotate", "items": items, "rotations": rotations, "old": old})
+        return True
 
-        for deco in reversed(self.decorations):
-            if tuple(deco.get("grid_pos")) == grid_pos_tuple and deco.get("layer", DEFAULT_LAYER) == layer:
-                self.decorations.remove(deco)
-                if grid_pos_tuple in self.occupied_layer_tiles:
-                    self.occupied_layer_tiles[grid_pos_tuple].remove(layer)
-                    if not self.occupied_layer_tiles[grid_pos_tuple]:
-                        del self.occupied_layer_tiles[grid_pos_tuple]
-                print(f"[LOG] Item '{deco.get('base_id')}' removed from position {grid_pos_tuple} on layer {layer}")
-                return True
-        return False
+    def remove_decorations(self, decos):
+        """Removes several decorations with a single pass over the decoration list, recorded as one batch. Returns how many were removed."""
+        doomed_ids = {id(deco) for deco in decos}
+        removed, kept = [], []
+        for deco in self.decorations: (removed if id(deco) in doomed_ids else kept).append(deco)
+        if not removed: return 0
+        self.decorations[:] = kept # In place: the list is shared with decoration_set_data
+        self.begin_batch()
+        try:
+            for deco in removed:
+                self.decoration_index.remove(deco)
+                self._vacate(deco)
+                self._track_furni_usage(deco.get("base_id"), -1)
+                self._record({"op": "deco_del", "base_id": deco.get("base_id"), "variant_id": deco.get("variant_id"), "pos": list(deco["grid_pos"]), "rotation": deco.get("rotation"), "layer": deco.get("layer", DEFAULT_LAYER)})
+        finally: self.end_batch()
+        self.mark_changed(PART_DECORATIONS)
+        print(f"[LOG] Removed {len(removed)} decoration(s).")
+        return len(removed)
 
     def get_decorations_sorted_for_render(self):
         """
         Sorts decorations for correct rendering order.
         Primary sort key: Layer ID (lower layers are drawn first).
         Secondary sort key: Tile depth (decorations further back are drawn first).
+        The sorted list is cached until the decorations change, so a bulk edit costs one sort. Do not modify it.
         """
-        return sorted(self.decorations, key=lambda d: (
-            d.get('layer', DEFAULT_LAYER),
-            (d['grid_pos'][1] + d['grid_pos'][0], d['grid_pos'][1] - d['grid_pos'][0])
-        ))
+        revision = self.revisions[PART_DECORATIONS]
+        if self._sorted_revision != revision:
+            self._sorted_decorations = sorted(self.decorations, key=self.render_sort_key)
+            self._sorted_keys = None
+            self._sorted_revision = revision
+        return self._sorted_decorations
+
+    @staticmethod
+    def render_sort_key(deco):
+        return (deco.get('layer', DEFAULT_LAYER), (deco['grid_pos'][1] + deco['grid_pos'][0], deco['grid_pos'][1] - deco['grid_pos'][0]))
 
     def calculate_center_world_coords(self):
-        if not self.tiles: return (TILE_WIDTH_HALF, TILE_HEIGHT_HALF)
-        all_x = [p[0] for p in self.tiles.keys()]; all_y = [p[1] for p in self.tiles.keys()]
-        center_gx = (min(all_x) + max(all_x)) / 2; center_gy = (min(all_y) + max(all_y)) / 2
+        bounds = self.tile_bounds.get()
+        if not bounds: return (TILE_WIDTH_HALF, TILE_HEIGHT_HALF)
+        min_x, min_y, max_x, max_y = bounds
+        center_gx = (min_x + max_x) / 2; center_gy = (min_y + max_y) / 2
         center_wx = (center_gx - center_gy) * TILE_WIDTH_HALF; center_wy = (center_gx + center_gy) * TILE_HEIGHT_HALF
         return center_wx + TILE_WIDTH_HALF, center_wy + TILE_HEIGHT_HALF
 
-    def update_structure_data_from_internal(self):
-        all_coords = set(self.tiles.keys())
-        for pos, layer_id in self.layer_map.items():
-            if layer_id == LAYER_WALL: all_coords.add(pos)
-        
-        if not all_coords: min_x, min_y, max_x, max_y = 0, 0, -1, -1
-        else:
-            all_x = [p[0] for p in all_coords]; all_y = [p[1] for p in all_coords]
-            min_x, max_x = min(all_x), max(all_x); min_y, max_y = min(all_y), max(all_y)
-            
-        new_w = max_x - min_x + 1; new_d = max_y - min_y + 1
-        new_grid = [['0'] * new_w for _ in range(new_d)]
-        new_walkable_grid = [['x'] * new_w for _ in range(new_d)]
-        new_layer_grid = [['x'] * new_w for _ in range(new_d)]
-        
-        for (gx, gy), tile_type in self.tiles.items():
-            row, col = gy - min_y, gx - min_x
-            new_grid[row][col] = str(tile_type)
-            new_walkable_grid[row][col] = str(self.walkable_map.get((gx, gy), 0))
-
-        for (gx, gy), layer_id in self.layer_map.items():
-            if min_x <= gx <= max_x and min_y <= gy <= max_y:
-                # Do not save automatically calculated Wall layers. Only save painted layers.
-                if layer_id != LAYER_WALL:
-                    new_layer_grid[gy - min_y][gx - min_x] = LAYER_DATA[layer_id]['char']
-        
-        self.structure_data['dimensions'] = {'width': new_w, 'depth': new_d, 'origin_x': min_x, 'origin_y': min_y}
-        self.structure_data['tiles'] = ["".join(row) for row in new_grid]
-        self.structure_data['walkable'] = ["".join(row) for row in new_walkable_grid]
-        self.structure_data['layers'] = ["".join(row) for row in new_layer_grid]
+    def get_structure_bounds(self):
+        """Bounds of the tiles and the Wall layer positions as (min_x, min_y, max_x, max_y); (0, 0, -1, -1) if empty."""
+        bounds = [b for b in (self.tile_bounds.get(), self.wall_layer_bounds.get()) if b]
+        if not bounds: return 0, 0, -1, -1
+        return min(b[0] for b in bounds), min(b[1] for b in bounds), max(b[2] for b in bounds), max(b[3] for b in bounds)
+
+    def _iter_structure_cells(self):
+        for pos, tile_type in self.tiles.items():
+            # Do not save automatically calculated Wall layers. Only save painted layers (also those under a wall).
+            layer_id = self.get_painted_layer(pos)
+            layer_char = LAYER_DATA[layer_id]['char'] if layer_id is not None and layer_id != LAYER_WALL else 'x'
+            yield pos, str(tile_type), str(self.walkable_map.get(pos, 0)), layer_char
+
+    def update_structure_data_from_internal(self, structure_format=None):
+        """Writes the room into structure_data; the grids are dense or chunked (None uses STRUCTURE_SAVE_FORMAT)."""
+        write_structure_grids(self.structure_data, self._iter_structure_cells(), self.get_structure_bounds(), structure_format or STRUCTURE_SAVE_FORMAT)
         self.structure_data['walls'] = [{"grid_pos": list(pos), "edge": edge} for pos, edge in sorted(list(self.walls))]
+        self.structure_data['door'] = list(self.door_pos) if self.door_pos else None
+        self.structure_data['navigation'] = self.walkability.export()
     
     def update_decoration_set_data_from_internal(self):
         self.decoration_set_data["decorations"] = self.decorations
\ No newline at end of file
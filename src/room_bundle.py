@@ -0,0 +1,168 @@
+# src/room_bundle.py
+"""
+Compact binary export of a room for game clients ("room bundle").
+
+All numbers are little-endian. After the header come, in this order:
+  header       4s magic, H version, H flags (which optional grids/sections are present)
+  strings      I count, then per string: H byte length + UTF-8; walls and decorations refer to these by index
+  meta         I byte length + UTF-8 JSON of the structure/decoration set keys not stored below (name, id, ...)
+  anchor       d x, d y (renderAnchor)
+  dimensions   i origin_x, i origin_y, I width, I depth
+  door         B has_door, i x, i y
+  grids        width * depth bytes each, row by row: tile types (0 = empty), walkable (0, 1, 255 = none)
+               and layer characters (as in structure.json, 'x' = none); the last two only if flagged
+  walls        I count, then per wall: i x, i y, H edge string
+  decorations  I count, then per decoration: I base_id string, I variant_id string, i x, i y, B rotation, B layer,
+               already in render order (layer, then depth), so clients can draw them as they come
+  navigation   only if flagged: B has_door, i x, i y (the door it was measured from), I regions, I count,
+               then per node: i x, i y, B open sides, I region, i distance (as in structure.json)
+
+Chunked structures (structure_format.py) are expanded to the dense grids above when written.
+The reader only needs the standard library, so game-side tools can use read_room_bundle as is.
+"""
+import json
+import struct
+
+MAGIC = b"IRMB"
+FORMAT_VERSION = 1
+FLAG_WALKABLE = 1
+FLAG_LAYERS = 2
+FLAG_NAVIGATION = 4
+
+# Structure and decoration set keys stored in their own sections; everything else goes to the meta JSON.
+STRUCTURE_KEYS = {"renderAnchor", "dimensions", "door", "tiles", "walkable", "layers", "walls", "navigation", "format", "chunk_size", "chunks"}
+DECORATION_SET_KEYS = {"decorations"}
+DEFAULT_DECORATION_LAYER = 3 # The editor's DEFAULT_LAYER, for decorations saved without one
+
+_TILE_TO_BYTE = bytes.maketrans(b"0123456789", bytes(range(10)))
+_BYTE_TO_TILE = bytes.maketrans(bytes(range(10)), b"0123456789")
+_WALKABLE_TO_BYTE = bytes(0 if c == ord("0") else 1 if c == ord("1") else 255 for c in range(256))
+_BYTE_TO_WALKABLE = bytes(ord("0") if c == 0 else ord("1") if c == 1 else ord("x") for c in range(256))
+
+def _pack_grid(rows, width, depth, fill):
+    """Joins a list of row strings into width * depth bytes, padding short or missing rows with 'fill'."""
+    rows = list(rows or [])[:depth] + [""] * max(0, depth - len(rows or []))
+    return b"".join(row[:width].ljust(width, fill).encode("ascii") for row in rows)
+
+def _unpack_grid(data, width):
+    if width == 0: return []
+    return [data[i:i + width].decode("ascii") for i in range(0, len(data), width)]
+
+class _StringTable:
+    def __init__(self):
+        self.index = {}
+    def intern(self, value):
+        return self.index.setdefault(str(value), len(self.index))
+    def pack(self):
+        parts = [struct.pack("<I", len(self.index))]
+        for value in self.index:
+            encoded = value.encode("utf-8")
+            parts.append(struct.pack("<H", len(encoded)) + encoded)
+        return b"".join(parts)
+
+def write_room_bundle(structure_data, decoration_set_data, sort_key=None):
+    """Encodes a room (its structure.json and decorations.json data) as a bundle. 'sort_key' orders the decorations for rendering."""
+    from structure_format import to_dense_structure # Only the writer needs it, so the reader stays standalone
+    structure_data = to_dense_structure(structure_data)
+    strings = _StringTable()
+    dims = structure_data.get("dimensions", {})
+    width, depth = dims.get("width", 0), dims.get("depth", 0)
+    anchor = structure_data.get("renderAnchor", {})
+    door = structure_data.get("door")
+    navigation = structure_data.get("navigation")
+    flags = (FLAG_WALKABLE if "walkable" in structure_data else 0) | (FLAG_LAYERS if "layers" in structure_data else 0) | (FLAG_NAVIGATION if navigation else 0)
+
+    body = [struct.pack("<dd", anchor.get("x", 0.0), anchor.get("y", 0.0)),
+            struct.pack("<iiII", dims.get("origin_x", 0), dims.get("origin_y", 0), width, depth),
+            struct.pack("<Bii", door is not None, *(door or (0, 0))),
+            _pack_grid(structure_data.get("tiles"), width, depth, "0").translate(_TILE_TO_BYTE)]
+    if flags & FLAG_WALKABLE: body.append(_pack_grid(structure_data["walkable"], width, depth, "x").translate(_WALKABLE_TO_BYTE))
+    if flags & FLAG_LAYERS: body.append(_pack_grid(structure_data["layers"], width, depth, "x"))
+
+    walls = structure_data.get("walls", [])
+    body.append(struct.pack("<I", len(walls)))
+    body.extend(struct.pack("<iiH", wall["grid_pos"][0], wall["grid_pos"][1], strings.intern(wall["edge"])) for wall in walls)
+
+    decorations = decoration_set_data.get("decorations", [])
+    if sort_key: decorations = sorted(decorations, key=sort_key)
+    body.append(struct.pack("<I", len(decorations)))
+    body.extend(struct.pack("<IIiiBB", strings.intern(deco["base_id"]), strings.intern(deco.get("variant_id", "0")),
+                            deco["grid_pos"][0], deco["grid_pos"][1], deco.get("rotation", 0), deco.get("layer", DEFAULT_DECORATION_LAYER)) for deco in decorations)
+
+    if navigation:
+        nav_door = navigation.get("door")
+        body.append(struct.pack("<BiiII", nav_door is not None, *(nav_door or (0, 0)), navigation.get("regions", 0), len(navigation["nodes"])))
+        body.extend(struct.pack("<iiBIi", *node) for node in navigation["nodes"])
+
+    meta = {"structure": {k: v for k, v in structure_data.items() if k not in STRUCTURE_KEYS},
+            "decoration_set": {k: v for k, v in decoration_set_data.items() if k not in DECORATION_SET_KEYS}}
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    header = struct.pack("<4sHH", MAGIC, FORMAT_VERSION, flags) + strings.pack() + struct.pack("<I", len(meta_bytes)) + meta_bytes
+    return header + b"".join(body)
+
+class RoomBundle:
+    """A decoded room bundle. Grids are width * depth byte strings (index = (y - origin_y) * width + (x - origin_x))."""
+    def __init__(self):
+        self.version = FORMAT_VERSION; self.meta = {}
+        self.anchor = (0.0, 0.0); self.origin = (0, 0); self.width = 0; self.depth = 0; self.door = None
+        self.tiles = b""; self.walkable = None; self.layers = None
+        self.walls = [] # (x, y, edge)
+        self.decorations = [] # (base_id, variant_id, x, y, rotation, layer), in render order
+        self.navigation = None # {"door": (x, y) or None, "regions": n, "nodes": [(x, y, sides, region, distance), ...]}
+
+    def to_json_data(self):
+        """Rebuilds the (structure_data, decoration_set_data) dicts of the JSON format."""
+        structure = dict(self.meta.get("structure", {}))
+        structure["dimensions"] = {"width": self.width, "depth": self.depth, "origin_x": self.origin[0], "origin_y": self.origin[1]}
+        structure["renderAnchor"] = {"x": self.anchor[0], "y": self.anchor[1]}
+        structure["tiles"] = _unpack_grid(self.tiles.translate(_BYTE_TO_TILE), self.width)
+        if self.walkable is not None: structure["walkable"] = _unpack_grid(self.walkable.translate(_BYTE_TO_WALKABLE), self.width)
+        if self.layers is not None: structure["layers"] = _unpack_grid(self.layers, self.width)
+        structure["walls"] = [{"grid_pos": [x, y], "edge": edge} for x, y, edge in self.walls]
+        structure["door"] = list(self.door) if self.door else None
+        if self.navigation is not None:
+            nav_door = self.navigation["door"]
+            structure["navigation"] = {"door": list(nav_door) if nav_door else None, "regions": self.navigation["regions"], "nodes": [list(node) for node in self.navigation["nodes"]]}
+        decoration_set = dict(self.meta.get("decoration_set", {}))
+        decoration_set["decorations"] = [{"base_id": base_id, "variant_id": variant_id, "grid_pos": [x, y], "rotation": rotation, "layer": layer}
+                                         for base_id, variant_id, x, y, rotation, layer in self.decorations]
+        return structure, decoration_set
+
+def read_room_bundle(data):
+    """Decodes the bytes of a room bundle into a RoomBundle. Raises ValueError if they are not a supported bundle."""
+    offset = 0
+    def take(fmt):
+        nonlocal offset
+        values = struct.unpack_from(fmt, data, offset); offset += struct.calcsize(fmt)
+        return values
+    def take_bytes(size):
+        nonlocal offset
+        if offset + size > len(data): raise ValueError("Room bundle is truncated.")
+        chunk = bytes(data[offset:offset + size]); offset += size
+        return chunk
+
+    try:
+        magic, version, flags = take("<4sHH")
+        if magic != MAGIC: raise ValueError("Not a room bundle.")
+        if version > FORMAT_VERSION: raise ValueError(f"Room bundle version {version} is newer than this reader ({FORMAT_VERSION}).")
+        bundle = RoomBundle(); bundle.version = version
+        strings = [take_bytes(take("<H")[0]).decode("utf-8") for _ in range(take("<I")[0])]
+        bundle.meta = json.loads(take_bytes(take("<I")[0]).decode("utf-8"))
+        bundle.anchor = take("<dd")
+        origin_x, origin_y, bundle.width, bundle.depth = take("<iiII"); bundle.origin = (origin_x, origin_y)
+        has_door, door_x, door_y = take("<Bii"); bundle.door = (door_x, door_y) if has_door else None
+        grid_size = bundle.width * bundle.depth
+        bundle.tiles = take_bytes(grid_size)
+        if flags & FLAG_WALKABLE: bundle.walkable = take_bytes(grid_size)
+        if flags & FLAG_LAYERS: bundle.layers = take_bytes(grid_size)
+        for _ in range(take("<I")[0]):
+            x, y, edge = take("<iiH"); bundle.walls.append((x, y, strings[edge]))
+        for _ in range(take("<I")[0]):
+            base_id, variant_id, x, y, rotation, layer = take("<IIiiBB")
+            bundle.decorations.append((strings[base_id], strings[variant_id], x, y, rotation, layer))
+        if flags & FLAG_NAVIGATION:
+            has_nav_door, nav_door_x, nav_door_y, regions, num_nodes = take("<BiiII")
+            bundle.navigation = {"door": (nav_door_x, nav_door_y) if has_nav_door else None, "regions": regions, "nodes": list(struct.iter_unpack("<iiBIi", take_bytes(num_nodes * struct.calcsize("<iiBIi"))))}
+    except (struct.error, IndexError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Room bundle is damaged: {e}") from e
+    return bundle
@@ -0,0 +1,79 @@
+# src/sprite_atlas.py
+import pygame
+
+class SpriteAtlas:
+    """
+    Packs many small sprites into a few large surfaces ("pages") with a simple
+    shelf packer. Sprites are looked up by key and drawn as a sub-rect of their page,
+    which keeps the surface count low and lets callers blit with an area rect.
+    """
+    PAGE_SIZE = 2048
+    PADDING = 1
+
+    def __init__(self, page_size=PAGE_SIZE):
+        self.page_size = page_size
+        self.pages = []
+        self.entries = {} # Key: sprite key, Value: (page_index, pygame.Rect, user data)
+        self._shelves = [] # Per page: list of [shelf_y, shelf_height, next_x]
+        self._next_shelf_y = [] # Per page: y position where the next shelf would start
+
+    def __contains__(self, key): return key in self.entries
+    def __len__(self): return len(self.entries)
+
+    def add(self, key, image, data=None):
+        """Copies 'image' into a free spot of the atlas and returns its (page_index, rect, data) entry."""
+        if key in self.entries: return self.entries[key]
+        w, h = image.get_size()
+        page_index, rect = self._allocate(w, h)
+        # BLEND_RGBA_MAX on a fully transparent page is an exact pixel copy (no alpha pre-multiplication).
+        self.pages[page_index].blit(image, rect.topleft, special_flags=pygame.BLEND_RGBA_MAX)
+        self.entries[key] = (page_index, rect, data)
+        return self.entries[key]
+
+    def get(self, key):
+        """Returns (page_surface, rect, data) for a key, or (None, None, None) if it is not packed."""
+        entry = self.entries.get(key)
+        if entry is None: return None, None, None
+        return self.pages[entry[0]], entry[1], entry[2]
+
+    def get_subsurface(self, key):
+        page, rect, _ = self.get(key)
+        return page.subsurface(rect) if page else None
+
+    def clear(self):
+        self.pages.clear(); self.entries.clear(); self._shelves.clear(); self._next_shelf_y.clear()
+
+    def _new_page(self, w, h):
+        self.pages.append(pygame.Surface((w, h), pygame.SRCALPHA))
+        self._shelves.append([])
+        self._next_shelf_y.append(0)
+        return len(self.pages) - 1
+
+    def _allocate(self, w, h):
+        padded_w, padded_h = w + self.PADDING, h + self.PADDING
+        if padded_w > self.page_size or padded_h > self.page_size:
+            # Oversized sprites get a dedicated page that is immediately marked as full.
+            page_index = self._new_page(w, h)
+            self._next_shelf_y[page_index] = h
+            return page_index, pygame.Rect(0, 0, w, h)
+
+        for page_index, shelves in enumerate(self._shelves):
+            page_w, page_h = self.pages[page_index].get_size()
+            # 1. Reuse an existing shelf that is tall enough and still has room
+            for shelf in shelves:
+                shelf_y, shelf_h, next_x = shelf
+                if padded_h <= shelf_h and next_x + padded_w <= page_w:
+                    shelf[2] += padded_w
+                    return page_index, pygame.Rect(next_x, shelf_y, w, h)
+            # 2. Open a new shelf at the bottom of this page
+            shelf_y = self._next_shelf_y[page_index]
+            if shelf_y + padded_h <= page_h and padded_w <= page_w:
+                shelves.append([shelf_y, padded_h, padded_w])
+                self._next_shelf_y[page_index] = shelf_y + padded_h
+                return page_index, pygame.Rect(0, shelf_y, w, h)
+
+        # 3. Every page is full: start a new one
+        page_index = self._new_page(self.page_size, self.page_size)
+        self._shelves[page_index].append([0, padded_h, padded_w])
+        self._next_shelf_y[page_index] = padded_h
+        return page_index, pygame.Rect(0, 0, w, h)
@@ -0,0 +1,150 @@
+# src/sprite_cache.py
+import os
+import json
+import mmap
+import pygame
+
+class SpriteDiskCache:
+    """
+    On-disk cache of furni sprites already decoded and scaled to every zoom level.
+    Pixels are stored as raw RGBA in one append-only data file; a JSON index maps
+    each (sprite, zoom) to its offset and size, plus the source PNG's mtime and size
+    so entries are ignored automatically once the source image changes.
+    Replaced entries leave dead bytes in the data file; compact() rewrites it with only
+    the live ones, which happens on its own once enough space is dead.
+    At runtime the data file is memory-mapped and wrapped with pygame.image.frombuffer,
+    so a cache hit needs neither PNG decoding nor scaling.
+    """
+    VERSION = 1
+    DATA_FILENAME = "sprites.bin"
+    INDEX_FILENAME = "sprites_index.json"
+    # Compact once dead bytes are at least this many and this fraction of the data file.
+    COMPACT_MIN_DEAD_BYTES = 32 * 1024 * 1024
+    COMPACT_DEAD_FRACTION = 0.25
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.data_path = os.path.join(cache_dir, self.DATA_FILENAME)
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILENAME)
+        self.entries = {} # Key: "base_id/relative_path@zoom", Value: dict with offset, w, h, src_mtime, src_size
+        self.is_dirty = False
+        self.dead_bytes = 0 # Bytes of the data file no entry points to
+        self._mmap = None
+        self._old_mmaps = [] # Kept alive while surfaces created from them may still be in use
+        self._load_index()
+        self.compact_if_needed() # No surface uses the data file yet
+
+    @staticmethod
+    def make_key(base_id, relative_path, zoom):
+        return f"{base_id}/{relative_path}@{zoom}"
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path) or not os.path.exists(self.data_path): return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index_data = json.load(f)
+            data_size = os.path.getsize(self.data_path)
+            # A data file smaller than the index expects was replaced or truncated after the index was written.
+            if index_data.get("version") == self.VERSION and data_size >= index_data.get("data_size", 0):
+                self.entries = index_data.get("entries", {})
+                self.dead_bytes = data_size - sum(self._entry_length(entry) for entry in self.entries.values())
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read sprite cache index, it will be rebuilt. Error: {e}")
+            self.entries = {}
+
+    @staticmethod
+    def _entry_length(entry):
+        return entry["w"] * entry["h"] * 4
+
+    def _ensure_mapped(self, end_offset):
+        """Memory-maps the data file, re-mapping it if entries were appended past the current mapping."""
+        if self._mmap is not None and end_offset <= len(self._mmap): return True
+        if not os.path.exists(self.data_path) or os.path.getsize(self.data_path) < end_offset: return False
+        if self._mmap is not None: self._old_mmaps.append(self._mmap)
+        with open(self.data_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return True
+
+    def get(self, base_id, relative_path, zoom, source_path):
+        """Returns the cached scaled sprite as a surface backed by the mapped file, or None on a miss."""
+        entry = self.entries.get(self.make_key(base_id, relative_path, zoom))
+        if entry is None: return None
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return None
+        if entry["src_mtime"] != stat.st_mtime_ns or entry["src_size"] != stat.st_size: return None # Stale
+        length = self._entry_length(entry)
+        if not self._ensure_mapped(entry["offset"] + length): return None
+        buffer = memoryview(self._mmap)[entry["offset"]:entry["offset"] + length]
+        return pygame.image.frombuffer(buffer, (entry["w"], entry["h"]), "RGBA")
+
+    def put(self, base_id, relative_path, zoom, source_path, surface):
+        """Appends a scaled sprite to the data file and records it in the index."""
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        pixels = pygame.image.tostring(surface, "RGBA")
+        with open(self.data_path, 'ab') as f:
+            offset = f.tell()
+            f.write(pixels)
+        w, h = surface.get_size()
+        key = self.make_key(base_id, relative_path, zoom)
+        if key in self.entries: self.dead_bytes += self._entry_length(self.entries[key])
+        self.entries[key] = {"offset": offset, "w": w, "h": h, "src_mtime": stat.st_mtime_ns, "src_size": stat.st_size}
+        self.is_dirty = True
+
+    def save_index(self):
+        if not self.is_dirty: return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.VERSION, "data_size": data_size, "entries": self.entries}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+        self.is_dirty = False
+
+    def compact_if_needed(self):
+        if self.dead_bytes < self.COMPACT_MIN_DEAD_BYTES: return 0
+        if self.dead_bytes < os.path.getsize(self.data_path) * self.COMPACT_DEAD_FRACTION: return 0
+        return self.compact()
+
+    def compact(self):
+        """
+        Rewrites the data file with only the live entries (to a temporary file, then os.replace) and saves
+        the index with their new offsets. Surfaces made from the old file stay valid. Returns the bytes reclaimed.
+        """
+        if not os.path.exists(self.data_path): return 0
+        old_size = os.path.getsize(self.data_path)
+        tmp_path = self.data_path + ".tmp"
+        new_entries = {}
+        try:
+            with open(self.data_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                for key, entry in sorted(self.entries.items(), key=lambda item: item[1]["offset"]):
+                    src.seek(entry["offset"]); pixels = src.read(self._entry_length(entry))
+                    if len(pixels) != self._entry_length(entry): continue # Lost with a truncated data file
+                    new_entries[key] = dict(entry, offset=dst.tell())
+                    dst.write(pixels)
+                dst.flush(); os.fsync(dst.fileno())
+            if self._mmap is not None: self._old_mmaps.append(self._mmap); self._mmap = None
+            os.replace(tmp_path, self.data_path)
+        except OSError as e:
+            # E.g. on Windows, where a memory-mapped file cannot be replaced.
+            print(f"Warning: Could not compact the sprite cache. Error: {e}")
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            return 0
+        # Until the new index is written, the old one expects a larger data file and is rejected on load.
+        self.entries = new_entries; self.dead_bytes = 0; self.is_dirty = True
+        self.save_index()
+        reclaimed = old_size - os.path.getsize(self.data_path)
+        print(f"[LOG] Sprite cache compacted: {reclaimed / (1024 * 1024):.1f} MB reclaimed.")
+        return reclaimed
+
+    def clear(self):
+        """Deletes all cached data. Only safe when no surface from this cache is still in use."""
+        self._mmap = None; self._old_mmaps.clear(); self.entries.clear(); self.dead_bytes = 0
+        for path in (self.data_path, self.index_path):
+            if os.path.exists(path): os.remove(path)
+        self.is_dirty = False
@@ -4,7 +4,7 @@ import pygame
 import math
 from common.constants import *
 from common.ui import Button, ToggleSwitch
-from common.utils import grid_to_screen, screen_to_grid
+from common.utils import grid_to_screen, screen_to_grid, grid_line, grid_rect, flood_fill
 
 class StructureEditor:
     def __init__(self, app_ref):
@@ -14,6 +14,9 @@ class StructureEditor:
         self.selected_layer = DEFAULT_LAYER
         self.is_painting = False
         self.is_erasing = False
+        self.stroke_last_pos = None # Last cell of the drag stroke in progress
+        self.tool = TOOL_BRUSH
+        self.shape_start = None; self.shape_end = None; self.shape_button = None # Line/rectangle being dragged
         self.hover_grid_pos = None
         self.hover_wall_edge = None
         self.buttons = {}
@@ -76,8 +79,7 @@ class StructureEditor:
         elif self.buttons['mode_layers'].is_clicked(event): self.edit_mode = MODE_LAYERS; self.setup_ui()
         elif self.buttons['center_anchor'].is_clicked(event) and self.app.current_room:
             center_wx, center_wy = self.app.current_room.calculate_center_world_coords()
-            self.app.current_room.structure_data['renderAnchor']['x'] = center_wx
-            self.app.current_room.structure_data['renderAnchor']['y'] = center_wy
+            self.app.current_room.set_render_anchor(center_wx, center_wy)
             self.app.update_anchor_offset_inputs()
 
         if self.edit_mode == MODE_LAYERS:
@@ -93,69 +95,133 @@ class StructureEditor:
             self.hover_grid_pos = screen_to_grid(local_mouse_pos[0], local_mouse_pos[1], self.app.camera.offset, self.app.camera.zoom)
             if self.edit_mode == MODE_WALLS: self.hover_wall_edge = self.get_hovered_edge(self.hover_grid_pos, local_mouse_pos)
 
-        if event.type == pygame.MOUSEBUTTONDOWN and self.hover_grid_pos and self.app.current_room:
+        if event.type == pygame.KEYDOWN and not event.mod & pygame.KMOD_CTRL and not self.app.is_text_input_active():
+            tool_keys = {pygame.K_b: TOOL_BRUSH, pygame.K_l: TOOL_LINE, pygame.K_r: TOOL_RECT, pygame.K_f: TOOL_FILL}
+            if event.key in tool_keys: self.tool = tool_keys[event.key]; self.shape_start = None
+            elif event.key == pygame.K_d and self.edit_mode == MODE_WALKABLE and self.app.current_room and self.hover_grid_pos in self.app.current_room.tiles:
+                room = self.app.current_room
+                room.set_door(None if room.door_pos == self.hover_grid_pos else self.hover_grid_pos)
+
+        uses_shape_tool = self.tool != TOOL_BRUSH and self.edit_mode != MODE_WALLS and not shift and not alt
+        if event.type == pygame.MOUSEBUTTONDOWN and self.hover_grid_pos and self.app.current_room and uses_shape_tool and event.button in (1, 3):
+            if self.tool == TOOL_FILL: self.apply_flood_fill(self.hover_grid_pos, event.button)
+            else: self.shape_start = self.shape_end = self.hover_grid_pos; self.shape_button = event.button
+        elif event.type == pygame.MOUSEBUTTONDOWN and self.hover_grid_pos and self.app.current_room:
             if event.button == 1:
                 if self.edit_mode == MODE_WALLS and self.hover_wall_edge:
-                    wall_tuple = (self.hover_wall_edge[0], self.hover_wall_edge[1])
-                    if wall_tuple in self.app.current_room.walls: self.app.current_room.walls.remove(wall_tuple)
-                    else: self.app.current_room.walls.add(wall_tuple)
-                    self.app.current_room._calculate_automatic_layers() # Recalculate after changing walls
+                    self.app.current_room.toggle_wall(self.hover_wall_edge[0], self.hover_wall_edge[1])
                 elif self.edit_mode == MODE_WALKABLE and self.hover_grid_pos in self.app.current_room.tiles:
                     current_status = self.app.current_room.walkable_map.get(self.hover_grid_pos, 0)
-                    self.app.current_room.walkable_map[self.hover_grid_pos] = 1 - current_status
+                    self.app.current_room.set_walkable(self.hover_grid_pos, 1 - current_status)
                 elif self.edit_mode == MODE_LAYERS:
-                    self.is_painting = True
+                    self.is_painting = True; self.stroke_last_pos = self.hover_grid_pos
                     self.paint_layer(self.hover_grid_pos)
                 elif self.edit_mode == MODE_TILES:
                     if shift:
                         w_mouse_x = (local_mouse_pos[0] - self.app.camera.offset[0]) / self.app.camera.zoom
                         w_mouse_y = (local_mouse_pos[1] - self.app.camera.offset[1]) / self.app.camera.zoom
-                        self.app.current_room.structure_data["renderAnchor"]["x"], self.app.current_room.structure_data["renderAnchor"]["y"] = w_mouse_x, w_mouse_y
+                        self.app.current_room.set_render_anchor(w_mouse_x, w_mouse_y)
                         self.app.update_anchor_offset_inputs()
                     elif alt:
-                        self.app.current_room.tiles[self.hover_grid_pos] = TILE_TYPES[(TILE_TYPES.index(self.app.current_room.tiles.get(self.hover_grid_pos, TILE_TYPE_FULL)) + 1) % len(TILE_TYPES)]
+                        self.app.current_room.set_tile(self.hover_grid_pos, TILE_TYPES[(TILE_TYPES.index(self.app.current_room.tiles.get(self.hover_grid_pos, TILE_TYPE_FULL)) + 1) % len(TILE_TYPES)])
                         self.app.update_anchor_offset_inputs()
                     else:
-                        self.is_painting = True
-                        self.app.current_room.tiles[self.hover_grid_pos] = TILE_TYPE_FULL
-                        if self.hover_grid_pos not in self.app.current_room.walkable_map: self.app.current_room.walkable_map[self.hover_grid_pos] = 0
-                        if self.hover_grid_pos not in self.app.current_room.layer_map: self.app.current_room.layer_map[self.hover_grid_pos] = DEFAULT_LAYER
+                        self.is_painting = True; self.stroke_last_pos = self.hover_grid_pos
+                        self.app.current_room.set_tile(self.hover_grid_pos, TILE_TYPE_FULL)
                         self.app.update_anchor_offset_inputs()
             elif event.button == 3:
-                if self.edit_mode == MODE_TILES: self.is_erasing = True; self.delete_tile(self.hover_grid_pos)
+                if self.edit_mode == MODE_TILES: self.is_erasing = True; self.stroke_last_pos = self.hover_grid_pos; self.delete_tile(self.hover_grid_pos)
                 elif self.edit_mode == MODE_LAYERS and self.hover_grid_pos in self.app.current_room.tiles:
-                    if self.app.current_room.layer_map.get(self.hover_grid_pos) != LAYER_WALL:
-                        self.app.current_room.layer_map[self.hover_grid_pos] = DEFAULT_LAYER
+                    if self.app.current_room.paint_layer(self.hover_grid_pos, DEFAULT_LAYER):
                         print(f"Reset layer to Default on tile {self.hover_grid_pos}")
 
-        if event.type == pygame.MOUSEBUTTONUP: self.is_painting = False; self.is_erasing = False
+        if event.type == pygame.MOUSEBUTTONUP:
+            if self.shape_start and event.button == self.shape_button: self.apply_shape(self.shape_start, self.hover_grid_pos or self.shape_end, self.shape_button)
+            self.is_painting = False; self.is_erasing = False; self.stroke_last_pos = None
+        if event.type == pygame.MOUSEMOTION and self.shape_start and self.hover_grid_pos: self.shape_end = self.hover_grid_pos
         if event.type == pygame.MOUSEMOTION:
-             if self.hover_grid_pos and self.app.current_room:
-                if self.edit_mode == MODE_TILES and not shift and not alt:
-                    if self.is_painting: 
-                        self.app.current_room.tiles[self.hover_grid_pos] = TILE_TYPE_FULL
-                        if self.hover_grid_pos not in self.app.current_room.walkable_map: self.app.current_room.walkable_map[self.hover_grid_pos] = 0
-                        if self.hover_grid_pos not in self.app.current_room.layer_map: self.app.current_room.layer_map[self.hover_grid_pos] = DEFAULT_LAYER
-                        self.app.update_anchor_offset_inputs()
-                    elif self.is_erasing: self.delete_tile(self.hover_grid_pos)
-                elif self.edit_mode == MODE_LAYERS and self.is_painting: self.paint_layer(self.hover_grid_pos)
+             if self.hover_grid_pos and self.app.current_room and (self.is_painting or self.is_erasing):
+                if self.edit_mode == MODE_TILES and not shift and not alt: self.apply_stroke(self.hover_grid_pos)
+                elif self.edit_mode == MODE_LAYERS and self.is_painting: self.apply_stroke(self.hover_grid_pos)
+
+    def apply_stroke(self, grid_pos):
+        """
+        Extends the drag stroke to grid_pos. Motion events are coalesced per frame, so the cells
+        between the previous and the current position are rasterised and applied as one batch.
+        """
+        cells = grid_line(self.stroke_last_pos, grid_pos)[1:] if self.stroke_last_pos else [grid_pos]
+        self.stroke_last_pos = grid_pos
+        if not cells: return
+        room = self.app.current_room
+        if self.edit_mode == MODE_LAYERS: room.paint_layers(cells, self.selected_layer)
+        elif self.is_painting and room.set_tiles(cells, TILE_TYPE_FULL): self.app.update_anchor_offset_inputs()
+        elif self.is_erasing and room.remove_tiles(cells): self.app.update_anchor_offset_inputs()
+
+    def get_shape_cells(self, start, end):
+        return grid_line(start, end) if self.tool == TOOL_LINE else grid_rect(start, end)
+
+    def apply_shape(self, start, end, button):
+        """Applies the line or rectangle tool to all its cells at once."""
+        self.shape_start = None
+        if self.app.current_room: self.apply_bulk(self.get_shape_cells(start, end), button)
+
+    def apply_flood_fill(self, grid_pos, button):
+        """
+        Fills the region connected to grid_pos. In the Tiles mode a left click fills the empty area
+        enclosed by tiles and a right click erases the connected tiles; in the Walkable and Layers
+        modes the connected tiles that share the clicked tile's value are changed.
+        """
+        room = self.app.current_room
+        if self.edit_mode == MODE_TILES and button == 1:
+            if grid_pos in room.tiles: return
+            # Only an area enclosed by tiles can be filled; anything reaching the room's bounds (or outside them) is open.
+            min_x, min_y, max_x, max_y = room.get_structure_bounds()
+            region = flood_fill(grid_pos, lambda p: p not in room.tiles and min_x <= p[0] <= max_x and min_y <= p[1] <= max_y, FLOOD_FILL_MAX_CELLS)
+            if not region or any(p[0] in (min_x, max_x) or p[1] in (min_y, max_y) for p in region):
+                print("[WARN] Flood fill: the area is not enclosed by tiles."); return
+        elif grid_pos not in room.tiles: return
+        elif self.edit_mode == MODE_TILES: region = flood_fill(grid_pos, lambda p: p in room.tiles, FLOOD_FILL_MAX_CELLS)
+        elif self.edit_mode == MODE_WALKABLE:
+            value = room.walkable_map.get(grid_pos, 0)
+            region = flood_fill(grid_pos, lambda p: p in room.tiles and room.walkable_map.get(p, 0) == value, FLOOD_FILL_MAX_CELLS)
+        else:
+            layer_id = room.layer_map.get(grid_pos)
+            region = flood_fill(grid_pos, lambda p: p in room.tiles and room.layer_map.get(p) == layer_id, FLOOD_FILL_MAX_CELLS)
+        if region is None: print(f"[WARN] Flood fill: region larger than {FLOOD_FILL_MAX_CELLS} cells."); return
+        self.apply_bulk(region, button)
+
+    def apply_bulk(self, cells, button):
+        """Applies the current mode to many cells as one bulk room operation (one undo step, one anchor refresh)."""
+        room = self.app.current_room
+        if self.edit_mode == MODE_TILES:
+            changed = room.set_tiles(cells, TILE_TYPE_FULL) if button == 1 else room.remove_tiles(cells)
+            if changed: self.app.update_anchor_offset_inputs()
+        elif self.edit_mode == MODE_WALKABLE: changed = room.set_walkables(cells, 1 if button == 1 else 0)
+        elif self.edit_mode == MODE_LAYERS: changed = room.paint_layers(cells, self.selected_layer if button == 1 else DEFAULT_LAYER)
+        else: return
+        print(f"[LOG] {TOOL_NAMES[self.tool]}: {changed} of {len(cells)} cells changed")
 
     def paint_layer(self, grid_pos):
-        """Paints the selected layer onto an existing tile."""
-        if grid_pos in self.app.current_room.tiles:
-            # Prevent overwriting an automatic Wall layer
-            if self.app.current_room.layer_map.get(grid_pos) != LAYER_WALL:
-                self.app.current_room.layer_map[grid_pos] = self.selected_layer
+        """Paints the selected layer onto an existing tile (the automatic Wall layer is never overwritten)."""
+        self.app.current_room.paint_layer(grid_pos, self.selected_layer)
 
     def get_info_lines(self):
-        if self.edit_mode == MODE_TILES: return ["[L Click] Paint Tile", "[R Click] Erase Tile", "[Alt+Click] Cycle Corner"]
+        tool_lines = [f"Tool: {TOOL_NAMES[self.tool]}", "[B/L/R/F] Brush/Line/Rect/Fill"]
+        if self.edit_mode == MODE_TILES: return ["[L Click] Paint Tile", "[R Click] Erase Tile", "[Alt+Click] Cycle Corner"] + tool_lines
         elif self.edit_mode == MODE_WALLS: return ["[Click Edge] Toggle Wall"]
-        elif self.edit_mode == MODE_WALKABLE: return ["[Click Tile] Toggle Walkable"]
-        elif self.edit_mode == MODE_LAYERS: return ["[Click] Paint Layer", "[R Click] Reset Layer"]
+        elif self.edit_mode == MODE_WALKABLE:
+            door_lines = ["[D] Set/Clear Door Tile"]
+            if self.app.current_room and (num_unreachable := len(self.app.current_room.walkability.get_unreachable_tiles())):
+                door_lines.append(f"{num_unreachable} walkable tile(s) unreachable from the door")
+            if self.tool == TOOL_BRUSH: return ["[Click Tile] Toggle Walkable"] + tool_lines + door_lines
+            return ["[L Click] Set Walkable", "[R Click] Set Not Walkable"] + tool_lines + door_lines
+        elif self.edit_mode == MODE_LAYERS: return ["[Click] Paint Layer", "[R Click] Reset Layer"] + tool_lines
         return []
     
     # ... (the rest of the methods in StructureEditor are unchanged) ...
     def draw_on_editor(self, surface):
+        if self.shape_start and self.shape_end:
+            self.draw_shape_preview(surface)
         if (self.edit_mode in [MODE_TILES, MODE_WALKABLE, MODE_LAYERS]) and self.hover_grid_pos:
             hover_screen_pos = grid_to_screen(*self.hover_grid_pos, self.app.camera.offset, self.app.camera.zoom)
             p = self.app.renderer._get_tile_points(hover_screen_pos, self.app.camera.zoom)
@@ -167,6 +233,18 @@ class StructureEditor:
             edge_points = { EDGE_NE: (p['top'], p['right']), EDGE_SE: (p['right'], p['bottom']), EDGE_SW: (p['bottom'], p['left']), EDGE_NW: (p['left'], p['top']), EDGE_DIAG_SW_NE: (p['bottom'], p['top']), EDGE_DIAG_NW_SE: (p['left'], p['right']) }
             p1, p2 = edge_points.get(edge, (None, None))
             if p1 and p2: pygame.draw.line(surface, COLOR_HOVER_BORDER, p1, p2, 4)
+    def draw_shape_preview(self, surface):
+        offset, zoom = self.app.camera.offset, self.app.camera.zoom
+        if self.tool == TOOL_RECT:
+            # Only the outline of the rectangle, whatever its size.
+            (x0, x1), (y0, y1) = sorted((self.shape_start[0], self.shape_end[0])), sorted((self.shape_start[1], self.shape_end[1]))
+            corners = [self.app.renderer._get_tile_points(grid_to_screen(x, y, offset, zoom), zoom)[key] for x, y, key in ((x0, y0, 'top'), (x1, y0, 'right'), (x1, y1, 'bottom'), (x0, y1, 'left'))]
+            pygame.draw.polygon(surface, COLOR_HOVER_BORDER, corners, 2)
+        else:
+            for cell in grid_line(self.shape_start, self.shape_end):
+                p = self.app.renderer._get_tile_points(grid_to_screen(*cell, offset, zoom), zoom)
+                pygame.draw.polygon(surface, COLOR_HOVER_BORDER, [p['top'], p['right'], p['bottom'], p['left']], 1)
+
     def draw_ui_on_panel(self, screen):
         for name, btn in self.buttons.items():
             if name.startswith('mode_'):
@@ -205,10 +283,5 @@ class StructureEditor:
                 if (dist := self.point_to_line_segment_dist(screen_mouse_pos, *data['seg'])) < min_dist: min_dist = dist; best_edge = (grid_pos, edge_name)
         return best_edge
     def delete_tile(self, grid_pos):
-        if not self.app.current_room or not grid_pos or grid_pos not in self.app.current_room.tiles: return
-        self.app.current_room.tiles.pop(grid_pos, None)
-        self.app.current_room.walkable_map.pop(grid_pos, None)
-        self.app.current_room.layer_map.pop(grid_pos, None)
-        self.app.current_room.walls = {wall for wall in self.app.current_room.walls if wall[0] != grid_pos}
-        self.app.current_room._calculate_automatic_layers() # Recalculate after deleting tile/walls
-        self.app.update_anchor_offset_inputs()
\ No newline at end of file
+        if not self.app.current_room or not grid_pos: return
+        if self.app.current_room.remove_tile(grid_pos): self.app.update_anchor_offset_inputs()
\ No newline at end of file
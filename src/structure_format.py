@@ -0,0 +1,104 @@
+# src/structure_format.py
+"""
+Encodings of the tile grids of structure.json ('tiles', 'walkable' and 'layers').
+
+Dense (the original format): one string per row of the bounding box, with '0' (tiles) or 'x'
+(walkable, layers) where there is no tile. Files without a "format" key are dense.
+
+Chunked: the grid is cut into chunk_size x chunk_size chunks aligned to multiples of chunk_size,
+and only the chunks holding tiles are stored, so islands of tiles far apart do not pay for the
+empty space between them:
+    "format": "chunked", "chunk_size": 16,
+    "chunks": [{"origin": [x, y], "tiles": [row, ...], "walkable": [row, ...], "layers": [row, ...]}, ...]
+A row is a comma-separated list of runs, "<count>*<char>" or just "<char>" for a single cell.
+Empty cells at the end of a row, and empty rows at the end of a chunk, are left out.
+"""
+from itertools import groupby
+from common.constants import *
+
+GRID_KEYS = ("tiles", "walkable", "layers")
+GRID_FILL = {"tiles": "0", "walkable": "x", "layers": "x"} # Character of a cell without a tile in each grid
+
+def encode_rle_row(row, fill):
+    return ",".join(char if count == 1 else f"{count}*{char}" for char, count in ((char, len(list(run))) for char, run in groupby(row.rstrip(fill))))
+
+def decode_rle_row(text, width, fill):
+    if not text: return fill * width
+    parts = []
+    for run in text.split(","):
+        count, _, char = run.rpartition("*")
+        if len(char) != 1 or (count and not count.isdigit()): raise ValueError(f"Invalid run '{run}' in a chunked structure row.")
+        parts.append(char * int(count) if count else char)
+    return "".join(parts).ljust(width, fill)
+
+def write_structure_grids(structure_data, cells, bounds, structure_format=STRUCTURE_FORMAT_DENSE):
+    """
+    Stores cells, an iterable of ((x, y), tile char, walkable char, layer char), in structure_data with
+    the dimensions of bounds (min_x, min_y, max_x, max_y), dense or chunked. The keys of the other format are removed.
+    """
+    min_x, min_y, max_x, max_y = bounds
+    width, depth = max_x - min_x + 1, max_y - min_y + 1
+    structure_data['dimensions'] = {'width': width, 'depth': depth, 'origin_x': min_x, 'origin_y': min_y}
+    for key in ("format", "chunk_size", "chunks", *GRID_KEYS): structure_data.pop(key, None)
+
+    if structure_format == STRUCTURE_FORMAT_DENSE:
+        grids = {key: [[GRID_FILL[key]] * width for _ in range(depth)] for key in GRID_KEYS}
+        for (gx, gy), *chars in cells:
+            for key, char in zip(GRID_KEYS, chars): grids[key][gy - min_y][gx - min_x] = char
+        for key in GRID_KEYS: structure_data[key] = ["".join(row) for row in grids[key]]
+    elif structure_format == STRUCTURE_FORMAT_CHUNKED:
+        size = STRUCTURE_CHUNK_SIZE
+        chunk_grids = {}
+        for (gx, gy), *chars in cells:
+            grids = chunk_grids.get((gx // size, gy // size))
+            if grids is None: grids = chunk_grids[(gx // size, gy // size)] = {key: [[GRID_FILL[key]] * size for _ in range(size)] for key in GRID_KEYS}
+            for key, char in zip(GRID_KEYS, chars): grids[key][gy % size][gx % size] = char
+        chunks = []
+        for (cx, cy), grids in sorted(chunk_grids.items(), key=lambda item: (item[0][1], item[0][0])):
+            chunk = {"origin": [cx * size, cy * size]}
+            for key in GRID_KEYS:
+                rows = [encode_rle_row("".join(row), GRID_FILL[key]) for row in grids[key]]
+                while rows and not rows[-1]: rows.pop()
+                chunk[key] = rows
+            chunks.append(chunk)
+        structure_data.update({"format": STRUCTURE_FORMAT_CHUNKED, "chunk_size": size, "chunks": chunks})
+    else: raise ValueError(f"Unknown structure format '{structure_format}'.")
+
+def iter_structure_chunks(structure_data):
+    """
+    Streams the tile grids of structure_data in either format, one chunk at a time, as
+    (origin_x, origin_y, tiles rows, walkable rows, layers rows). Rows are plain grid strings relative
+    to the chunk origin; the walkable and layers lists can be shorter or empty where the file has no data.
+    Dense files come in bands of STRUCTURE_CHUNK_SIZE rows. Raises ValueError for an unknown format.
+    """
+    structure_format = structure_data.get("format", STRUCTURE_FORMAT_DENSE)
+    if structure_format == STRUCTURE_FORMAT_CHUNKED:
+        size = structure_data.get("chunk_size", STRUCTURE_CHUNK_SIZE)
+        for chunk in structure_data.get("chunks", []):
+            ox, oy = chunk["origin"]
+            yield (ox, oy, *([decode_rle_row(row, size, GRID_FILL[key]) for row in chunk.get(key, [])] for key in GRID_KEYS))
+    elif structure_format == STRUCTURE_FORMAT_DENSE:
+        dims = structure_data.get('dimensions', {})
+        ox, oy = dims.get('origin_x', 0), dims.get('origin_y', 0)
+        grids = [structure_data.get(key) or [] for key in GRID_KEYS]
+        band = STRUCTURE_CHUNK_SIZE
+        for start in range(0, max(len(grid) for grid in grids), band):
+            yield (ox, oy + start, *(grid[start:start + band] for grid in grids))
+    else: raise ValueError(f"Unknown structure format '{structure_format}'.")
+
+def to_dense_structure(structure_data):
+    """Returns structure_data itself if it is dense, else a copy with the chunks expanded to dense grids."""
+    if structure_data.get("format", STRUCTURE_FORMAT_DENSE) == STRUCTURE_FORMAT_DENSE: return structure_data
+    dims = structure_data.get('dimensions', {})
+    width, depth, min_x, min_y = dims.get('width', 0), dims.get('depth', 0), dims.get('origin_x', 0), dims.get('origin_y', 0)
+    grids = {key: [[GRID_FILL[key]] * width for _ in range(depth)] for key in GRID_KEYS}
+    for ox, oy, *chunk_rows in iter_structure_chunks(structure_data):
+        for key, rows in zip(GRID_KEYS, chunk_rows):
+            fill = GRID_FILL[key]
+            for y, row in enumerate(rows, oy - min_y):
+                if not 0 <= y < depth: continue
+                for x, char in enumerate(row, ox - min_x):
+                    if char != fill and 0 <= x < width: grids[key][y][x] = char
+    dense = {k: v for k, v in structure_data.items() if k not in ("format", "chunk_size", "chunks")}
+    for key in GRID_KEYS: dense[key] = ["".join(row) for row in grids[key]]
+    return dense
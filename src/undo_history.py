@@ -0,0 +1,116 @@
+# src/undo_history.py
+import sys
+from collections import deque
+
+class UndoHistory:
+    """
+    Undo/redo stack built from the operations a Room emits. Each entry is the list of
+    operations of one user gesture (e.g. a whole drag-paint stroke), and every operation
+    carries the values it replaced, so undoing applies the inverse operations instead of
+    restoring a snapshot. The memory used by the entries is estimated and the oldest ones
+    are dropped once it goes over 'memory_limit' bytes.
+    """
+    # Operations that set a value: several of them on the same target within one gesture are merged into one.
+    COALESCE_KEYS = {"tile": "type", "walk": "value", "layer": "layer", "anchor": None}
+    OLD_VALUE_KEYS = {"tile": ("old_type",), "walk": ("old",), "layer": ("old",), "anchor": ("old_x", "old_y")}
+
+    def __init__(self, memory_limit):
+        self.memory_limit = memory_limit
+        self.undo_stack = deque() # Entries: {"ops": [...], "size": estimated bytes, "index": {target: op index}}
+        self.redo_stack = []
+        self.memory_used = 0
+        self.current_entry = None # Entry of the gesture in progress
+        self.gesture_depth = 0
+        self.is_applying = False # Set while undoing/redoing, so the replayed operations are not recorded again
+
+    @staticmethod
+    def _estimate_size(value):
+        """Approximate bytes held by an operation, counting what its dicts and lists contain (getsizeof alone does not)."""
+        size = sys.getsizeof(value)
+        if isinstance(value, dict): size += sum(UndoHistory._estimate_size(item) for item in value.values())
+        elif isinstance(value, (list, tuple)) and value:
+            # Lists of plain values (e.g. the cells of a fill) are costed per element from the first one.
+            if isinstance(value[0], (dict, list, tuple)): size += sum(UndoHistory._estimate_size(item) for item in value)
+            else: size += len(value) * sys.getsizeof(value[0])
+        return size
+
+    @staticmethod
+    def _coalesce_target(op):
+        if op["op"] not in UndoHistory.COALESCE_KEYS: return None
+        return (op["op"], tuple(op["pos"])) if "pos" in op else (op["op"],)
+
+    def begin_gesture(self):
+        """Operations recorded until the matching end_gesture() are undone and redone together."""
+        self.gesture_depth += 1
+        if self.current_entry is None: self.current_entry = {"ops": [], "size": 0, "index": {}}
+
+    def end_gesture(self):
+        if self.gesture_depth == 0: return
+        self.gesture_depth -= 1
+        if self.gesture_depth == 0: self._commit_current_entry()
+
+    def _commit_current_entry(self):
+        entry, self.current_entry = self.current_entry, None
+        if not entry or not entry["ops"]: return
+        del entry["index"] # Only needed while the gesture is recording
+        self.undo_stack.append(entry)
+        self.memory_used += entry["size"]
+        while self.memory_used > self.memory_limit and len(self.undo_stack) > 1:
+            self.memory_used -= self.undo_stack.popleft()["size"]
+
+    def record(self, op):
+        """Room operation listener."""
+        if self.is_applying: return
+        if self.redo_stack: self.redo_stack.clear()
+        standalone = self.current_entry is None
+        if standalone: self.begin_gesture()
+        entry = self.current_entry
+        target = self._coalesce_target(op)
+        previous_index = entry["index"].get(target) if target else None
+        if previous_index is not None and previous_index == len(entry["ops"]) - 1:
+            # Same target as the previous operation: keep its original old value, take the new value.
+            previous = entry["ops"][previous_index]
+            merged = dict(op)
+            for key in self.OLD_VALUE_KEYS[op["op"]]: merged[key] = previous[key]
+            entry["ops"][previous_index] = merged
+        else:
+            entry["ops"].append(op)
+            entry["size"] += self._estimate_size(op)
+            if target: entry["index"][target] = len(entry["ops"]) - 1
+        if standalone: self.end_gesture()
+
+    def can_undo(self): return bool(self.undo_stack)
+    def can_redo(self): return bool(self.redo_stack)
+
+    def undo(self, room):
+        """Reverts the last gesture. Returns its operations (as applied, i.e. inverted), or None if there is nothing to undo."""
+        if self.current_entry is not None: self.gesture_depth = 1; self.end_gesture()
+        if not self.undo_stack: return None
+        entry = self.undo_stack.pop()
+        self.memory_used -= entry["size"]
+        applied = [room.invert_op(op) for op in reversed(entry["ops"])]
+        self._apply(room, applied)
+        self.redo_stack.append(entry)
+        return applied
+
+    def redo(self, room):
+        """Re-applies the last undone gesture. Returns its operations, or None if there is nothing to redo."""
+        if not self.redo_stack: return None
+        entry = self.redo_stack.pop()
+        self._apply(room, entry["ops"])
+        self.undo_stack.append(entry)
+        self.memory_used += entry["size"]
+        return entry["ops"]
+
+    def _apply(self, room, ops):
+        self.is_applying = True
+        room.begin_batch()
+        try:
+            for op in ops: room.apply_op(op)
+        finally:
+            room.end_batch()
+            self.is_applying = False
+
+    def clear(self):
+        self.undo_stack.clear(); self.redo_stack.clear()
+        self.memory_used = 0; self.current_entry = None; self.gesture_depth = 0
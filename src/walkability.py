@@ -0,0 +1,213 @@
+# src/walkability.py
+import heapq
+from collections import deque
+from common.constants import *
+
+# Grid offset of the neighbour across each side of a tile, and the side it sees back.
+SIDE_OFFSETS = {EDGE_NE: (0, -1), EDGE_SE: (1, 0), EDGE_SW: (0, 1), EDGE_NW: (-1, 0)}
+OPPOSITE_SIDES = {EDGE_NE: EDGE_SW, EDGE_SE: EDGE_NW, EDGE_SW: EDGE_NE, EDGE_NW: EDGE_SE}
+# Sides of each tile shape that can be walked through (a corner tile is closed on its cut sides).
+OPEN_SIDES = {tile_type: frozenset(edge for edge in edges if edge in SIDE_OFFSETS) for tile_type, edges in TILE_TYPE_EDGES.items()}
+
+class WalkabilityGraph:
+    """
+    Navigation graph of a room: walkable tiles are the nodes, and two neighbouring nodes are
+    linked when both tile shapes are open on the shared side and no wall stands on it.
+    Connected regions are kept in a union-find structure that follows the room's operations:
+    new links are unions, and removed links or nodes only relabel the regions they touched.
+    The BFS distance field from the door tile, and everything derived from it, is cached
+    until the graph changes.
+    """
+    def __init__(self, room):
+        self.room = room
+        self.links = {} # Key: walkable tile, Value: set of linked neighbour tiles
+        self.parent = {} # Union-find forest over the walkable tiles
+        self.rank = {}
+        self.version = 0 # Bumped whenever nodes, links or the door change
+        self._distances = None; self._distances_version = None
+        self._unreachable = None; self._unreachable_version = None
+        self.rebuild()
+        room.op_listeners.append(self.on_room_op)
+
+    # --- Graph ---
+    def is_node(self, pos):
+        return pos in self.room.tiles and self.room.walkable_map.get(pos, 0) == 1
+
+    def _compute_links(self, pos):
+        room = self.room; links = set()
+        for side in OPEN_SIDES.get(room.tiles[pos], ()):
+            dx, dy = SIDE_OFFSETS[side]; neighbour = (pos[0] + dx, pos[1] + dy)
+            if not self.is_node(neighbour) or OPPOSITE_SIDES[side] not in OPEN_SIDES.get(room.tiles[neighbour], ()): continue
+            if (pos, side) in room.walls or (neighbour, OPPOSITE_SIDES[side]) in room.walls: continue
+            links.add(neighbour)
+        return links
+
+    def rebuild(self):
+        """Builds the graph and its regions from scratch. O(tiles)."""
+        self.links = {pos: set() for pos in self.room.tiles if self.is_node(pos)}
+        for pos in self.links: self.links[pos] = self._compute_links(pos)
+        self.parent.clear(); self.rank.clear()
+        self._relabel(list(self.links))
+        self.version += 1
+
+    # --- Union-find ---
+    def find(self, pos):
+        root = pos
+        while self.parent[root] != root: root = self.parent[root]
+        while self.parent[pos] != root: self.parent[pos], pos = root, self.parent[pos]
+        return root
+
+    def _union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b: return
+        if self.rank[root_a] < self.rank[root_b]: root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        if self.rank[root_a] == self.rank[root_b]: self.rank[root_a] += 1
+
+    def _relabel(self, seeds):
+        """Gives every region reached from the seeds a fresh flat union-find tree (BFS). O(size of those regions)."""
+        visited = set()
+        for seed in seeds:
+            if seed in visited or seed not in self.links: continue
+            visited.add(seed); queue = deque([seed])
+            self.parent[seed] = seed; self.rank[seed] = 1
+            while queue:
+                for neighbour in self.links[queue.popleft()]:
+                    if neighbour in visited: continue
+                    visited.add(neighbour); queue.append(neighbour)
+                    self.parent[neighbour] = seed; self.rank[neighbour] = 0
+
+    # --- Incremental updates ---
+    def on_room_op(self, op):
+        """Room operation listener: updates the graph around the tiles the operation touched."""
+        positions = set()
+        self._collect_positions(op, positions)
+        if positions: self.version += 1; self.update(positions)
+
+    def _collect_positions(self, op, positions):
+        kind = op["op"]
+        if kind == "door": self.version += 1
+        elif kind == "batch":
+            for sub_op in op["ops"]: self._collect_positions(sub_op, positions)
+        elif kind == "cells":
+            if op["field"] in ("tile", "walk"): positions.update(zip(op["cells"][0::2], op["cells"][1::2]))
+        elif kind in ("tile", "erase", "restore", "wall", "walk"): positions.add(tuple(op["pos"]))
+
+    def update(self, positions):
+        """Brings nodes and links of the given tiles in line with the room, then fixes the regions they belonged to."""
+        split_seeds, new_links = [], []
+        # Node changes first, so links are only computed between nodes of the current room.
+        for pos in positions:
+            was_node, is_node = pos in self.links, self.is_node(pos)
+            if is_node and not was_node: self.links[pos] = set(); self.parent[pos] = pos; self.rank[pos] = 0
+            elif was_node and not is_node:
+                for neighbour in self.links.pop(pos): self.links[neighbour].discard(pos); split_seeds.append(neighbour)
+        for pos in positions:
+            if pos not in self.links: continue
+            old_links, links = self.links[pos], self._compute_links(pos)
+            if links == old_links: continue
+            for neighbour in old_links - links: self.links[neighbour].discard(pos); split_seeds.extend((pos, neighbour))
+            for neighbour in links - old_links: self.links[neighbour].add(pos); new_links.append((pos, neighbour))
+            self.links[pos] = links
+        # Every piece left of a region that lost a node or link holds one of its ends, so relabelling from those covers it.
+        if split_seeds: self._relabel(split_seeds)
+        for pos in positions:
+            if pos not in self.links: self.parent.pop(pos, None); self.rank.pop(pos, None)
+        for a, b in new_links: self._union(a, b)
+
+    # --- Queries ---
+    def get_door(self):
+        door = self.room.door_pos
+        return door if door is not None and door in self.links else None
+
+    def same_region(self, a, b):
+        return a in self.links and b in self.links and self.find(a) == self.find(b)
+
+    def get_regions(self):
+        """
+        Connected walkable regions as lists of tiles: the door's region first, then the largest ones.
+        Ties go by the topmost tile, so the order does not depend on how the graph was built. O(walkable tiles).
+        """
+        regions = {}
+        for pos in self.links: regions.setdefault(self.find(pos), []).append(pos)
+        door = self.get_door()
+        door_root = self.find(door) if door else None
+        return sorted(regions.values(), key=lambda tiles: (self.find(tiles[0]) != door_root, -len(tiles), min((y, x) for x, y in tiles)))
+
+    def get_distances(self):
+        """BFS step count from the door to every tile reachable from it. Cached until the graph changes."""
+        if self._distances_version != self.version:
+            distances = {}
+            if (door := self.get_door()) is not None:
+                distances[door] = 0; queue = deque([door])
+                while queue:
+                    pos = queue.popleft()
+                    for neighbour in self.links[pos]:
+                        if neighbour not in distances: distances[neighbour] = distances[pos] + 1; queue.append(neighbour)
+            self._distances, self._distances_version = distances, self.version
+        return self._distances
+
+    def get_unreachable_tiles(self):
+        """Walkable tiles that cannot be reached from the door (none while the room has no door). Cached."""
+        if self._unreachable_version != self.version:
+            door = self.get_door()
+            if door is None: self._unreachable = frozenset() if self.room.door_pos is None else frozenset(self.links)
+            else:
+                door_root = self.find(door)
+                self._unreachable = frozenset(pos for pos in self.links if self.find(pos) != door_root)
+            self._unreachable_version = self.version
+        return self._unreachable
+
+    def is_decoration_unreachable(self, deco):
+        """True if a decoration stands on walkable tiles only, none of them reachable from the door."""
+        cells = self.room.get_footprint_cells(deco.get("base_id"), deco["grid_pos"], deco.get("rotation", 0))
+        unreachable = self.get_unreachable_tiles()
+        return all(cell in unreachable for cell in cells)
+
+    def find_path(self, start, goal):
+        """Shortest list of tiles from start to goal (A*, Manhattan heuristic), or None. Different regions fail in O(1)."""
+        start, goal = tuple(start), tuple(goal)
+        if not self.same_region(start, goal): return None
+        if start == self.get_door(): return self.path_from_door(goal)
+        heuristic = lambda p: abs(p[0] - goal[0]) + abs(p[1] - goal[1])
+        came_from = {start: None}; cost = {start: 0}
+        open_heap = [(heuristic(start), 0, start)]
+        while open_heap:
+            _, steps, pos = heapq.heappop(open_heap)
+            if pos == goal: break
+            if steps > cost[pos]: continue
+            for neighbour in self.links[pos]:
+                if neighbour not in cost or steps + 1 < cost[neighbour]:
+                    cost[neighbour] = steps + 1; came_from[neighbour] = pos
+                    heapq.heappush(open_heap, (steps + 1 + heuristic(neighbour), steps + 1, neighbour))
+        path = [goal]
+        while came_from[path[-1]] is not None: path.append(came_from[path[-1]])
+        return path[::-1]
+
+    def path_from_door(self, goal):
+        """Shortest path from the door, read off the cached distance field. O(path length)."""
+        distances = self.get_distances(); goal = tuple(goal)
+        if goal not in distances: return None
+        path = [goal]
+        while distances[path[-1]] > 0:
+            path.append(next(n for n in self.links[path[-1]] if distances.get(n) == distances[path[-1]] - 1))
+        return path[::-1]
+
+    # --- Export ---
+    def export(self):
+        """
+        Precomputed navigation data saved with the room, so a game does not have to flood-fill it.
+        'nodes' rows are [x, y, open sides bitmask (NAV_SIDE_BITS), region index, steps from the door or -1].
+        Region 0 is the door's region when the room has a reachable door.
+        """
+        regions = self.get_regions(); distances = self.get_distances()
+        region_index = {pos: index for index, tiles in enumerate(regions) for pos in tiles}
+        nodes = []
+        for pos in sorted(self.links, key=lambda p: (p[1], p[0])):
+            sides = 0
+            for side, bit in NAV_SIDE_BITS.items():
+                dx, dy = SIDE_OFFSETS[side]
+                if (pos[0] + dx, pos[1] + dy) in self.links[pos]: sides |= bit
+            nodes.append([pos[0], pos[1], sides, region_index[pos], distances.get(pos, -1)])
+        door = self.get_door()
+        return {"door": list(door) if door else None, "regions": len(regions), "nodes": nodes}
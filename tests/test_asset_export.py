@@ -0,0 +1,71 @@
+# tests/test_asset_export.py
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+# --- PATH CONFIGURATION ---
+# The root of the 'isometric_room_editor' project
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "scripts"))
+
+from asset_export import export_referenced_files
+from build_catalog import build_index_entry
+
+# A data.json with fields the furni index leaves out (logic, visualization, color, z) and a rotations list.
+SOURCE_FURNI_DATA = {
+    "name": "Norja Chair", "category": "chairs", "dimensions": {"x": 1, "y": 1, "z": 1},
+    "logic": {"type": "furniture_chair"}, "visualization": {"layer_count": 2},
+    "variants": {
+        "0": {"id": "chair_norja_0", "color": "#ffffff", "icon_path": "icons/chair_norja_0.png", "rotations": [0, 2, 4],
+              "renders": {"0": {"path": "renders/chair_norja_0_0.png", "offset": {"x": 1, "y": 2}, "z": 0.5},
+                          "2": {"path": "renders/chair_norja_0_2.png", "offset": {"x": 3, "y": 4}, "z": 0.5},
+                          "4": {"path": "renders/chair_norja_0_4.png", "offset": {"x": 5, "y": 6}, "z": 0.5}}},
+        "1": {"id": "chair_norja_1", "color": "#000000", "icon_path": "icons/chair_norja_1.png", "rotations": [0],
+              "renders": {"0": {"path": "renders/chair_norja_1_0.png", "offset": {"x": 0, "y": 0}, "z": 0.5}}},
+    },
+}
+
+class ReferencedExportTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source_root = os.path.join(self.folder, "4_final_furni_data")
+        self.export_dir = os.path.join(self.folder, "furnis")
+        furni_dir = os.path.join(self.source_root, "chair_norja")
+        for variant in SOURCE_FURNI_DATA["variants"].values():
+            for rel_path in [variant["icon_path"]] + [info["path"] for info in variant["renders"].values()]:
+                os.makedirs(os.path.dirname(os.path.join(furni_dir, rel_path)), exist_ok=True)
+                with open(os.path.join(furni_dir, rel_path), 'wb') as f: f.write(b"\x89PNG" + rel_path.encode())
+        with open(os.path.join(furni_dir, "data.json"), 'w', encoding='utf-8') as f: json.dump(SOURCE_FURNI_DATA, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_trimmed_data_keeps_source_fields(self):
+        decorations = [{"base_id": "chair_norja", "variant_id": "0", "grid_pos": [0, 0], "rotation": 2}]
+        stats = export_referenced_files(decorations, self.source_root, self.export_dir)
+        self.assertEqual(stats["errors"], 0)
+        with open(os.path.join(self.export_dir, "chair_norja", "data.json"), 'r', encoding='utf-8') as f: exported = json.load(f)
+
+        expected = json.loads(json.dumps(SOURCE_FURNI_DATA))
+        del expected["variants"]["1"]
+        variant = expected["variants"]["0"]
+        variant["renders"] = {"2": variant["renders"]["2"]}
+        variant["rotations"] = [2]
+        self.assertEqual(exported, expected)
+        # The editor's furni index (build_catalog.py) drops these fields, so it must not be what gets exported.
+        index_entry = build_index_entry(SOURCE_FURNI_DATA)
+        self.assertNotIn("logic", index_entry); self.assertIn("logic", exported)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.export_dir, "chair_norja", "renders"))), ["chair_norja_0_2.png"])
+
+    def test_unchanged_export_writes_nothing(self):
+        decorations = [{"base_id": "chair_norja", "variant_id": "1", "grid_pos": [0, 0], "rotation": 0}]
+        export_referenced_files(decorations, self.source_root, self.export_dir)
+        stats = export_referenced_files(decorations, self.source_root, self.export_dir)
+        self.assertEqual((stats["data_files_written"], stats["copied"] + stats["linked"] + stats["reflinked"]), (0, 0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# tests/test_room_bundle.py
+import os
+import sys
+import json
+import random
+import argparse
+import unittest
+
+# --- PATH CONFIGURATION ---
+# The root of the 'isometric_room_editor' project
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+from common.constants import *
+from room import Room
+from room_bundle import write_room_bundle, read_room_bundle
+from structure_format import to_dense_structure
+
+def normalize_decorations(decoration_set_data):
+    """The bundle stores variant ids as strings and decorations in render order."""
+    decorations = [dict(deco, variant_id=str(deco.get("variant_id", "0")), grid_pos=list(deco["grid_pos"])) for deco in decoration_set_data.get("decorations", [])]
+    return dict(decoration_set_data, decorations=sorted(decorations, key=Room.render_sort_key))
+
+def compare_room(name, structure_data, decoration_set_data, bundle_bytes):
+    """Returns the list of differences between the JSON data and what the bundle decodes to."""
+    bundle_structure, bundle_decorations = read_room_bundle(bundle_bytes).to_json_data()
+    errors = []
+    # Bundles always hold dense grids, whatever format the structure file uses.
+    expected_structure = dict(to_dense_structure(structure_data), door=structure_data.get("door"))
+    for key in sorted(set(expected_structure) | set(bundle_structure)):
+        if expected_structure.get(key) != bundle_structure.get(key): errors.append(f"{name}: structure '{key}' differs")
+    expected_decorations = normalize_decorations(decoration_set_data)
+    if [tuple(sorted(d.items())) for d in expected_decorations["decorations"]] != [tuple(sorted(d.items())) for d in bundle_decorations["decorations"]]:
+        errors.append(f"{name}: decorations differ (content or render order)")
+    if {k: v for k, v in expected_decorations.items() if k != "decorations"} != {k: v for k, v in bundle_decorations.items() if k != "decorations"}:
+        errors.append(f"{name}: decoration set metadata differs")
+    return errors
+
+def check_project_folder(folder):
+    with open(os.path.join(folder, "structure.json"), 'r', encoding='utf-8') as f: structure_data = json.load(f)
+    with open(os.path.join(folder, "decorations.json"), 'r', encoding='utf-8') as f: decoration_set_data = json.load(f)
+    errors = compare_room(f"{folder} (fresh encode)", structure_data, decoration_set_data, write_room_bundle(structure_data, decoration_set_data, Room.render_sort_key))
+    bundle_path = os.path.join(folder, ROOM_BUNDLE_FILENAME)
+    if os.path.exists(bundle_path):
+        with open(bundle_path, 'rb') as f: errors += compare_room(bundle_path, structure_data, decoration_set_data, f.read())
+    else: print(f"[WARN] {bundle_path} not found, only the fresh encoding was checked.")
+    return errors
+
+def make_random_room(seed, size=24, islands=1):
+    """
+    A random room as the editor saves it: corner tiles, walls, painted layers, a door and decorations.
+    With several islands, the tiles are spread over far-apart areas, and the structure is saved chunked.
+    """
+    rng = random.Random(seed)
+    room = Room({"name": "Random Room", "id": f"random_{seed}", "renderAnchor": {"x": rng.uniform(-50, 50), "y": rng.uniform(-50, 50)}, "tiles": []},
+                {"decoration_set_name": "Random Decorations", "structure_id": f"random_{seed}", "decorations": []})
+    for _ in range(size * size):
+        spread = rng.randrange(islands) * size * 5
+        pos = (rng.randrange(-size // 2, size) + spread, rng.randrange(-size // 2, size) - spread)
+        room.set_tile(pos, rng.choice(TILE_TYPES)); room.set_walkable(pos, rng.randint(0, 1))
+        if rng.random() < 0.3: room.paint_layer(pos, rng.choice([LAYER_BACKGROUND, LAYER_MAIN, LAYER_FOREGROUND]))
+        if rng.random() < 0.1: room.toggle_wall(pos, rng.choice(TILE_TYPE_EDGES[room.tiles[pos]]))
+    room.set_door(rng.choice(sorted(room.tiles)))
+    room.update_structure_data_from_internal(STRUCTURE_FORMAT_CHUNKED if islands > 1 else STRUCTURE_FORMAT_DENSE)
+    decorations = [{"base_id": f"furni_{rng.randrange(20)}", "variant_id": rng.choice(["0", "1", "2"]), "grid_pos": list(rng.choice(sorted(room.tiles))),
+                    "rotation": rng.randrange(4), "layer": rng.choice([LAYER_BACKGROUND, LAYER_MAIN, LAYER_FOREGROUND])} for _ in range(size * 4)]
+    return room.structure_data, dict(room.decoration_set_data, decorations=decorations)
+
+def make_saved_room(seed):
+    """A random room passed through JSON, as the saved files would be."""
+    structure_data, decoration_set_data = make_random_room(seed, islands=1 + seed % 3)
+    return json.loads(json.dumps(structure_data)), json.loads(json.dumps(decoration_set_data))
+
+class RoomBundleTest(unittest.TestCase):
+    NUM_RANDOM_ROOMS = 20
+
+    def test_random_rooms_round_trip(self):
+        for seed in range(self.NUM_RANDOM_ROOMS):
+            with self.subTest(seed=seed):
+                structure_data, decoration_set_data = make_saved_room(seed)
+                bundle = write_room_bundle(structure_data, decoration_set_data, Room.render_sort_key)
+                self.assertEqual(compare_room(f"random room {seed}", structure_data, decoration_set_data, bundle), [])
+
+    def test_structure_is_saved_dense_by_default(self):
+        structure_data, _ = make_random_room(1, islands=3)
+        room = Room(structure_data, {"decorations": []}); room.update_structure_data_from_internal()
+        self.assertNotIn("format", room.structure_data)
+        self.assertEqual(len(room.structure_data["tiles"]), room.structure_data["dimensions"]["depth"])
+
+    def test_bundle_is_smaller_than_json(self):
+        structure_data, decoration_set_data = make_saved_room(0)
+        json_size = len(json.dumps(structure_data, indent=2)) + len(json.dumps(decoration_set_data, indent=2))
+        self.assertLess(len(write_room_bundle(structure_data, decoration_set_data, Room.render_sort_key)), json_size)
+
+    def test_saved_structure_reloads_unchanged(self):
+        """Loading the saved structure again must give back the same file, in either format."""
+        for seed in range(self.NUM_RANDOM_ROOMS):
+            with self.subTest(seed=seed):
+                structure_data, _ = make_saved_room(seed)
+                reloaded = Room(json.loads(json.dumps(structure_data)), {"decorations": []})
+                reloaded.update_structure_data_from_internal(structure_data.get("format", STRUCTURE_FORMAT_DENSE))
+                self.assertEqual(reloaded.structure_data, structure_data)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checks that room bundles decode to the same room as the JSON files (structure.json + decorations.json).")
+    parser.add_argument("folders", nargs="*", help="Saved project folders to check. Without any, the unit tests on random rooms are run.")
+    args = parser.parse_args()
+    if not args.folders: unittest.main(argv=sys.argv[:1])
+    errors = [error for folder in args.folders for error in check_project_folder(folder)]
+    for error in errors: print(f"Error: {error}")
+    print("Room bundle round-trip OK." if not errors else f"{len(errors)} difference(s) found.")
+    sys.exit(1 if errors else 0)
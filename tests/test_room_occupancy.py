@@ -0,0 +1,37 @@
+# tests/test_room_occupancy.py
+import os
+import sys
+import unittest
+
+# --- PATH CONFIGURATION ---
+# The root of the 'isometric_room_editor' project
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+from common.constants import *
+from room import Room
+
+def make_room(decorations):
+    """A 4x4 room whose 'table' furni covers 2x2 tiles, loaded with the given (possibly overlapping) decorations."""
+    structure_data = {"name": "Test Room", "id": "test", "renderAnchor": {"x": 0, "y": 0},
+                      "dimensions": {"width": 4, "depth": 4, "origin_x": 0, "origin_y": 0}, "tiles": ["1111"] * 4}
+    decoration_set_data = {"decorations": [{"base_id": base_id, "variant_id": "0", "grid_pos": list(pos), "rotation": 0, "layer": LAYER_MAIN} for base_id, pos in decorations]}
+    return Room(structure_data, decoration_set_data, footprint_provider=lambda base_id, rotation: (2, 2) if base_id == "table" else (1, 1))
+
+class OverlapOccupancyTest(unittest.TestCase):
+    def test_removing_first_owner_keeps_shared_tiles_occupied(self):
+        room = make_room([("table", (0, 0)), ("table", (1, 1))])
+        room.remove_decoration_at((0, 0), LAYER_MAIN)
+        # (1, 1) is still covered by the second table, so nothing can be placed there.
+        self.assertIs(room.get_decoration_at((1, 1), LAYER_MAIN), room.decorations[0])
+        self.assertFalse(room.add_decoration("chair", "0", (1, 1), 0, LAYER_MAIN))
+        self.assertTrue(room.add_decoration("chair", "0", (0, 0), 0, LAYER_MAIN))
+
+    def test_removing_all_overlapping_decorations_frees_every_tile(self):
+        room = make_room([("table", (0, 0)), ("table", (1, 1)), ("chair", (1, 1))])
+        self.assertEqual(room.remove_decorations(list(room.decorations)), 3)
+        self.assertEqual(room.layer_occupancy, {})
+        self.assertEqual(room.overlapped_occupancy, {})
+
+if __name__ == "__main__":
+    unittest.main()